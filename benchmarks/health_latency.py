@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Load test: /health latency while a large batch is being scored
+
+Start the API first (python run_api.py), then run:
+
+    python benchmarks/health_latency.py --url http://localhost:8000 --rows 10000
+
+The script measures /health latency at idle, then again while a single
+/predict/batch request with --rows patients is in flight, and prints p50/p99
+for both phases. Inference runs in the executor, so /health keeps answering
+while the batch is scored. If the batch blocked the event loop instead,
+/health would stall for the whole scoring time. JSON parsing, request
+validation and response serialization of the batch still run on the loop.
+They account for most of the remaining tail.
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / "data" / "diabetes_data.csv"
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def wait_until_ready(session: requests.Session, url: str, timeout: float = 120.0):
+    """Block until /health/ready reports the model loaded and warmed up"""
+    deadline = time.monotonic() + timeout
+    while session.get(f"{url}/health/ready", timeout=30).status_code != 200:
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Model not ready after {timeout:.0f}s")
+        time.sleep(0.5)
+
+
+def probe_health(session, url, stop, samples, interval):
+    """Hit /health repeatedly until `stop` is set, recording latency in ms"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        session.get(f"{url}/health", timeout=30).raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running API")
+    parser.add_argument("--rows", type=int, default=10000, help="Patients in the background batch")
+    parser.add_argument("--idle-seconds", type=float, default=3.0, help="Duration of the idle baseline")
+    parser.add_argument("--interval", type=float, default=0.005, help="Pause between /health probes")
+    parser.add_argument("--max-p99-ms", type=float, default=150.0,
+                        help="Fail if /health p99 under load exceeds this many milliseconds")
+    args = parser.parse_args()
+
+    data = pd.read_csv(DATA_PATH).drop(columns=["diabetes"])
+    patients = data.sample(args.rows, replace=len(data) < args.rows, random_state=0).to_dict("records")
+
+    session = requests.Session()
+    wait_until_ready(session, args.url)
+
+    # Idle baseline
+    idle_samples = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe_health, args=(session, args.url, stop, idle_samples, args.interval))
+    prober.start()
+    time.sleep(args.idle_seconds)
+    stop.set()
+    prober.join()
+
+    # Same probe while the batch is scored
+    loaded_samples = []
+    stop = threading.Event()
+    prober = threading.Thread(
+        target=probe_health, args=(requests.Session(), args.url, stop, loaded_samples, args.interval)
+    )
+    prober.start()
+    start = time.perf_counter()
+    response = session.post(f"{args.url}/predict/batch", json={"patients": patients}, timeout=600)
+    batch_seconds = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    response.raise_for_status()
+
+    idle_p99 = percentile(idle_samples, 99)
+    loaded_p99 = percentile(loaded_samples, 99)
+    print(f"Batch of {args.rows} rows scored in {batch_seconds:.2f}s")
+    print(f"/health idle:   n={len(idle_samples)} p50={statistics.median(idle_samples):.2f}ms p99={idle_p99:.2f}ms")
+    print(f"/health loaded: n={len(loaded_samples)} p50={statistics.median(loaded_samples):.2f}ms p99={loaded_p99:.2f}ms")
+
+    if loaded_p99 > args.max_p99_ms:
+        print(f"FAIL: /health p99 under load is above {args.max_p99_ms}ms")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the inference hot path, with stored baselines
+
+Runs in-process against ModelService (no API needed):
+
+    python benchmarks/hot_path.py                 # print results
+    python benchmarks/hot_path.py --save          # store them as the baseline
+    python benchmarks/hot_path.py --compare       # fail on regressions
+
+Times `_preprocess_input` and `predict` (one call per row) and the batch
+paths `_preprocess_batch`, `predict_batch`, `predict_columns` and
+`predict_encoded` on rows sampled from data/diabetes_data.csv, for each
+batch size. Each timing is the best of --repeat runs of enough loops to
+last --min-time, as with timeit. Model load time and peak RSS are measured
+in fresh processes: one that only loads the model, and one that also scores
+the largest batch with `predict_batch`.
+
+The baseline is a JSON file, by default
+benchmarks/baselines/hot_path_<engine>_<storage>.json. With --compare, a
+metric regresses when it exceeds its baseline value by more than
+--tolerance (timings) or --memory-tolerance (RSS), as a fraction. Baselines
+are only comparable on the same machine and library versions; a mismatch
+is reported as a warning.
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import math
+import multiprocessing
+import platform
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / "data" / "diabetes_data.csv"
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from model_service import INFERENCE_ENGINES, MODEL_STORAGES, ModelService  # noqa: E402
+from preprocessing import FEATURE_ORDER  # noqa: E402
+
+# Keep model loading quiet between result lines
+logging.getLogger("model_service").setLevel(logging.WARNING)
+
+DEFAULT_SIZES = (1, 8, 64, 1000, 10000)
+
+# Paths taking one patient per call; a batch of n rows is n calls
+ROW_PATHS = ("preprocess_input", "predict")
+BATCH_PATHS = ("preprocess_batch", "predict_batch", "predict_columns", "predict_encoded")
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_load(engine: str, storage: str, patients=None) -> dict:
+    """
+    Load the model in this (fresh) process and report time and peak RSS
+
+    With `patients`, also score them with `predict_batch` and report the
+    peak RSS afterwards.
+    """
+    service = ModelService(inference_engine=engine, model_storage=storage)
+    result = {"load_seconds": service.load_seconds, "peak_rss_bytes": peak_rss_bytes()}
+    if patients is not None:
+        service.predict_batch(patients)
+        result["peak_rss_bytes"] = peak_rss_bytes()
+    return result
+
+
+def in_fresh_process(fn, *args):
+    """Run `fn(*args)` in a newly spawned interpreter and return its result"""
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def best_time(fn, repeat: int, min_time: float) -> float:
+    """
+    Best seconds per call of `fn` over `repeat` runs
+
+    A first call warms up and calibrates how many loops make one run last at
+    least `min_time`.
+    """
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    number = max(1, math.ceil(min_time / first)) if first > 0 else 1000
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def encode_matrix(service: ModelService, frame: pd.DataFrame) -> np.ndarray:
+    """Rows as the label-encoded float matrix taken by `predict_encoded`"""
+    columns = []
+    for name in FEATURE_ORDER:
+        if name in service.label_encoders:
+            columns.append(service.label_encoders[name].transform(frame[name].astype(str)))
+        else:
+            columns.append(frame[name].to_numpy())
+    return np.column_stack(columns).astype(np.float64)
+
+
+def benchmark_paths(service: ModelService, data: pd.DataFrame, args) -> dict:
+    """Seconds per batch of each path at each batch size"""
+    metrics = {}
+    for size in args.sizes:
+        frame = data.sample(size, replace=len(data) < size, random_state=args.seed).reset_index(drop=True)
+        patients = frame.to_dict("records")
+        columns = {name: frame[name].tolist() for name in FEATURE_ORDER}
+        matrix = encode_matrix(service, frame)
+
+        calls = {
+            "preprocess_batch": lambda: service._preprocess_batch(patients),
+            "predict_batch": lambda: service.predict_batch(patients),
+            "predict_columns": lambda: service.predict_columns(columns),
+            "predict_encoded": lambda: service.predict_encoded(matrix),
+        }
+        if size <= args.max_loop_rows:
+            calls["preprocess_input"] = lambda: [service._preprocess_input(patient) for patient in patients]
+            calls["predict"] = lambda: [service.predict(patient) for patient in patients]
+
+        for path in ROW_PATHS + BATCH_PATHS:
+            if path not in calls:
+                continue
+            seconds = best_time(calls[path], args.repeat, args.min_time)
+            metrics[f"{path}[{size}]"] = {"value": seconds, "unit": "s"}
+            print(f"{path + '[' + str(size) + ']':<26} {seconds * 1000:>12.4f} ms  {seconds / size * 1e6:>10.2f} us/row")
+    return metrics
+
+
+def environment() -> dict:
+    """What a baseline's numbers depend on besides the code"""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def run(args) -> dict:
+    """Run every benchmark and return the results document"""
+    data = pd.read_csv(DATA_PATH).drop(columns=["diabetes"])
+    largest = data.sample(max(args.sizes), replace=len(data) < max(args.sizes), random_state=args.seed)
+
+    metrics = {}
+    loads = [in_fresh_process(measure_load, args.engine, args.storage) for _ in range(args.load_repeat)]
+    metrics["model_load"] = {"value": statistics.median(load["load_seconds"] for load in loads), "unit": "s"}
+    metrics["peak_rss_after_load"] = {
+        "value": statistics.median(load["peak_rss_bytes"] for load in loads), "unit": "bytes"
+    }
+    scored = in_fresh_process(measure_load, args.engine, args.storage, largest.to_dict("records"))
+    metrics[f"peak_rss_after_predict_batch[{max(args.sizes)}]"] = {"value": scored["peak_rss_bytes"], "unit": "bytes"}
+    print(f"{'model_load':<26} {metrics['model_load']['value']:>12.4f} s")
+    print(f"{'peak_rss_after_load':<26} {metrics['peak_rss_after_load']['value'] / 2**20:>12.1f} MiB")
+    print(f"{'peak_rss_after_predict_batch':<26} {scored['peak_rss_bytes'] / 2**20:>12.1f} MiB")
+
+    service = ModelService(inference_engine=args.engine, model_storage=args.storage)
+    metrics.update(benchmark_paths(service, data, args))
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "engine": args.engine,
+            "storage": args.storage,
+            "sizes": list(args.sizes),
+            "seed": args.seed,
+            "model_version": service.model_version,
+        },
+        "environment": environment(),
+        "metrics": metrics,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, memory_tolerance: float) -> list:
+    """
+    Print each metric against its baseline and return the regressed ones
+
+    Lower is better for every metric; a metric regresses when
+    current > baseline * (1 + tolerance). Metrics missing on either side are
+    listed but never fail.
+    """
+    for section in ("config", "environment"):
+        for key, value in baseline.get(section, {}).items():
+            if results[section].get(key) != value:
+                print(f"WARNING: {section} {key} is {results[section].get(key)!r}, baseline has {value!r}")
+
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    names = list(baseline["metrics"]) + [name for name in results["metrics"] if name not in baseline["metrics"]]
+    for name in names:
+        old = baseline["metrics"].get(name)
+        new = results["metrics"].get(name)
+        if old is None or new is None:
+            print(f"{name:<40} {'new metric' if old is None else 'not measured':>35}")
+            continue
+        limit = memory_tolerance if new["unit"] == "bytes" else tolerance
+        change = new["value"] / old["value"] - 1 if old["value"] else 0.0
+        status = ""
+        if change > limit:
+            status = "REGRESSED"
+            regressions.append(name)
+        elif change < -limit:
+            status = "improved"
+        print(f"{name:<40} {old['value']:>12.6g} {new['value']:>12.6g} {change:>+8.1%} {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default="sklearn", choices=INFERENCE_ENGINES, help="Inference engine")
+    parser.add_argument("--storage", default="pickle", choices=MODEL_STORAGES, help="Model storage")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Batch sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per timing; the best is kept")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per run")
+    parser.add_argument("--max-loop-rows", type=int, default=1000,
+                        help="Largest batch size timed with one call per row")
+    parser.add_argument("--load-repeat", type=int, default=3, help="Fresh processes timing the model load")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the row sample")
+    parser.add_argument("--baseline", type=Path,
+                        help="Baseline file (default: benchmarks/baselines/hot_path_<engine>_<storage>.json)")
+    parser.add_argument("--save", action="store_true", help="Write the results to the baseline file")
+    parser.add_argument("--compare", action="store_true", help="Compare with the baseline file, fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown of a timing before it fails, as a fraction")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="Allowed growth of peak RSS before it fails, as a fraction")
+    args = parser.parse_args()
+
+    baseline_path = args.baseline or BASELINE_DIR / f"hot_path_{args.engine}_{args.storage}.json"
+    baseline = None
+    if args.compare:
+        if not baseline_path.exists():
+            raise SystemExit(f"Baseline not found: {baseline_path}. Create it with --save")
+        baseline = json.loads(baseline_path.read_text())
+
+    results = run(args)
+
+    status = 0
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+        if regressions:
+            print(f"FAIL: {len(regressions)} metric(s) regressed: {', '.join(regressions)}")
+            status = 1
+        else:
+            print("OK")
+    if args.save:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
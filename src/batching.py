@@ -0,0 +1,234 @@
+"""
+Micro-batching of concurrent single-patient predictions
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from metrics import RequestTimings, current_timings
+
+logger = logging.getLogger(__name__)
+
+PredictBatchFn = Callable[[List[Dict]], Awaitable[List[Tuple]]]
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent `/predict` calls into one vectorized model call
+
+    Requests are queued on the event loop. A single worker takes the first
+    queued request, keeps collecting for up to `max_wait_ms` or until
+    `max_batch_size` requests are waiting, scores them with one batch call and
+    resolves each caller's future with its own result. Batches are scored in
+    the background, so the next batch is collected while earlier ones run.
+    """
+
+    def __init__(
+        self,
+        predict_batch: PredictBatchFn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        """
+        Initialize the micro-batcher
+
+        Args:
+            predict_batch: Coroutine function scoring a list of patients, e.g.
+                `InferenceExecutor.predict_batch`
+            max_batch_size: Largest number of requests scored together
+            max_wait_ms: Longest time the first request of a batch waits for others
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+        # Metrics
+        self._bucket_bounds = self._histogram_bounds(max_batch_size)
+        self._batch_size_counts = [0] * len(self._bucket_bounds)
+        self._batches = 0
+        self._requests = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @staticmethod
+    def _histogram_bounds(max_batch_size: int) -> List[int]:
+        """Powers of two up to (and including) the maximum batch size"""
+        bounds = []
+        bound = 1
+        while bound < max_batch_size:
+            bounds.append(bound)
+            bound *= 2
+        bounds.append(max_batch_size)
+        return bounds
+
+    def _ensure_started(self):
+        """Start the worker on the running loop (restarting if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        # Started from whichever request comes first; keep its timings out of the worker
+        self._worker = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def predict(self, patient_data: Dict) -> Tuple:
+        """
+        Queue one patient and wait for its batched prediction
+
+        Args:
+            patient_data: Dictionary containing patient features
+
+        Returns:
+            This patient's entry of the `predict_batch` result, e.g.
+            (prediction, probability, model_version) from the executor
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((patient_data, future, time.perf_counter(), current_timings.get()))
+        return await future
+
+    async def stop(self):
+        """Stop the worker and fail any requests still queued"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        while self._queue is not None and not self._queue.empty():
+            _, future, _, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    async def _run(self):
+        """Collect queued requests into batches and score them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued before waiting for more
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Dict, asyncio.Future, float, Optional[RequestTimings]]]):
+        """Score one batch and fan the results out to the waiting callers"""
+        started = time.perf_counter()
+        self._record_batch(len(batch), [started - queued for _, _, queued, _ in batch])
+
+        # Callers that went away (e.g. client disconnected) are skipped
+        pending = [(patient, future) for patient, future, _, _ in batch if not future.done()]
+        if not pending:
+            return
+
+        # Time the shared model call once and copy it to every timed caller
+        timed = [
+            (queued, timings) for _, future, queued, timings in batch
+            if timings is not None and not future.done()
+        ]
+        if timed:
+            batch_timings = RequestTimings()
+            current_timings.set(batch_timings)
+            try:
+                await self._score(pending)
+            finally:
+                for queued, timings in timed:
+                    timings.add("queue_wait", started - queued)
+                    for stage, seconds in batch_timings.stages.items():
+                        timings.add(stage, seconds)
+                    timings.mark("batch", f"coalesced {len(pending)}")
+        else:
+            await self._score(pending)
+
+    async def _score(self, pending: List[Tuple[Dict, asyncio.Future]]):
+        """Score waiting callers together, falling back to one by one if the batch fails"""
+        try:
+            results = await self.predict_batch([patient for patient, _ in pending])
+        except Exception:
+            # One bad patient must not fail the others; score them one by one
+            for patient, future in pending:
+                try:
+                    result = (await self.predict_batch([patient]))[0]
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            return
+
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _record_batch(self, size: int, waits: List[float]):
+        """Update batch-size histogram and added-wait counters"""
+        self._batches += 1
+        self._requests += size
+        for i, bound in enumerate(self._bucket_bounds):
+            if size <= bound:
+                self._batch_size_counts[i] += 1
+                break
+        self._wait_total += sum(waits)
+        self._wait_max = max(self._wait_max, max(waits))
+
+    def queue_depth(self) -> int:
+        """Number of requests waiting to be batched"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def get_stats(self) -> Dict:
+        """
+        Get micro-batching metrics
+
+        Returns:
+            Dictionary with queue depth, batch-size histogram (cumulative, keyed by
+            upper bound) and the wait added by batching in milliseconds
+        """
+        histogram = {}
+        cumulative = 0
+        for bound, count in zip(self._bucket_bounds, self._batch_size_counts):
+            cumulative += count
+            histogram[f"le_{bound}"] = cumulative
+
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "requests": self._requests,
+            "mean_batch_size": (self._requests / self._batches) if self._batches else 0.0,
+            "batch_size_histogram": histogram,
+            "added_wait_ms": {
+                "total": self._wait_total * 1000,
+                "mean": (self._wait_total * 1000 / self._requests) if self._requests else 0.0,
+                "max": self._wait_max * 1000,
+            },
+        }
@@ -0,0 +1,96 @@
+"""
+Binary request/response format for scoring pre-encoded feature matrices
+
+Request body: a 16-byte header followed by a C-contiguous, little-endian
+float32 or float64 matrix of `rows x 8` values in FEATURE_ORDER, with the
+categorical columns already label-encoded.
+
+    offset  size  field
+    0       4     magic b"DPM1"
+    4       1     format version (1)
+    5       1     itemsize: 4 (float32) or 8 (float64)
+    6       2     reserved (0)
+    8       4     rows (uint32)
+    12      4     columns (uint32, must be 8)
+
+Response body: a 16-byte header (magic b"DPR1", version, reserved, rows as
+uint32 at offset 8, 4 reserved bytes) followed by `rows` float64
+probabilities and `rows` uint8 labels, all little-endian.
+"""
+import struct
+from typing import Tuple
+
+import numpy as np
+
+from preprocessing import FEATURE_ORDER
+
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+REQUEST_MAGIC = b"DPM1"
+RESPONSE_MAGIC = b"DPR1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBBHII")
+HEADER_SIZE = HEADER.size
+
+DTYPES = {4: np.dtype("<f4"), 8: np.dtype("<f8")}
+
+
+def parse_matrix(body: bytes) -> np.ndarray:
+    """
+    Wrap a binary request body as a (rows, 8) matrix without copying
+
+    Args:
+        body: Request body
+
+    Returns:
+        Read-only float32 or float64 view over `body`
+
+    Raises:
+        ValueError: Malformed header or a body of the wrong length
+    """
+    if len(body) < HEADER_SIZE:
+        raise ValueError(f"Body shorter than the {HEADER_SIZE}-byte header")
+    magic, version, itemsize, _, rows, cols = HEADER.unpack_from(body)
+    if magic != REQUEST_MAGIC:
+        raise ValueError(f"Bad magic {magic!r}, expected {REQUEST_MAGIC!r}")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported format version {version}")
+    if itemsize not in DTYPES:
+        raise ValueError(f"Unsupported itemsize {itemsize}; use 4 (float32) or 8 (float64)")
+    if cols != len(FEATURE_ORDER):
+        raise ValueError(f"Expected {len(FEATURE_ORDER)} columns in the order {FEATURE_ORDER}, got {cols}")
+    expected = HEADER_SIZE + rows * cols * itemsize
+    if len(body) != expected:
+        raise ValueError(f"Body is {len(body)} bytes, expected {expected} for {rows} rows")
+
+    return np.frombuffer(body, dtype=DTYPES[itemsize], count=rows * cols, offset=HEADER_SIZE).reshape(rows, cols)
+
+
+def pack_matrix(matrix: np.ndarray) -> bytes:
+    """Encode a (rows, 8) float32/float64 matrix as a request body (client side)"""
+    matrix = np.asarray(matrix)
+    dtype = DTYPES.get(matrix.dtype.itemsize) if matrix.dtype.kind == "f" else None
+    if dtype is None or matrix.ndim != 2:
+        raise ValueError("Expected a 2-D float32 or float64 matrix")
+    header = HEADER.pack(REQUEST_MAGIC, FORMAT_VERSION, dtype.itemsize, 0, matrix.shape[0], matrix.shape[1])
+    return header + np.ascontiguousarray(matrix, dtype=dtype).tobytes()
+
+
+def pack_results(predictions: np.ndarray, probabilities: np.ndarray) -> bytes:
+    """Encode labels and probabilities as a response body"""
+    header = HEADER.pack(RESPONSE_MAGIC, FORMAT_VERSION, 8, 0, len(probabilities), 0)
+    return (
+        header
+        + np.ascontiguousarray(probabilities, dtype="<f8").tobytes()
+        + np.ascontiguousarray(predictions, dtype=np.uint8).tobytes()
+    )
+
+
+def unpack_results(body: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode a response body into (predictions, probabilities) (client side)"""
+    magic, version, _, _, rows, _ = HEADER.unpack_from(body)
+    if magic != RESPONSE_MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a binary prediction response")
+    probabilities = np.frombuffer(body, dtype="<f8", count=rows, offset=HEADER_SIZE)
+    predictions = np.frombuffer(body, dtype=np.uint8, count=rows, offset=HEADER_SIZE + rows * 8)
+    return predictions, probabilities
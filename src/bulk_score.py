@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring of patient CSV files
+
+    diabetes-score data/diabetes_data.csv -o predictions.csv
+    diabetes-score registry/*.csv -o predictions.parquet --workers 4
+
+Input files are shaped like data/diabetes_data.csv (extra columns are
+ignored) and are read in typed chunks. Each chunk is held to the API's
+field bounds; a chunk with rows the API would reject with 422 stops the run
+with an error naming them. Chunks are scored by a pool of forked
+worker processes that share the parent's loaded model copy-on-write, and
+written in input order as `source, row, prediction, probability, risk_level`.
+CSV output is one file; Parquet output is a directory of numbered part files
+and needs pyarrow.
+
+After every written chunk a checkpoint (`<output>.checkpoint.json`) records
+how far each input got. `--resume` continues a crashed run from there,
+discarding output written after the last checkpoint.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from csv_input import read_chunks
+from input_checks import range_errors
+from model_service import ModelService, risk_levels
+from preprocessing import FEATURE_ORDER
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("csv", "parquet")
+
+CHECKPOINT_VERSION = 1
+
+# Model of each worker process; inherited from the parent when forked
+_service: Optional[ModelService] = None
+
+
+def _init_worker(service_kwargs: Dict):
+    """Limit native threads and, unless inherited through fork, load the model"""
+    global _service
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+    if _service is None:
+        _service = ModelService(**service_kwargs)
+
+
+def _score_chunk(columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Score one chunk of columns with the worker's model"""
+    return _service.predict_columns(columns)
+
+
+def input_fingerprint(path: Path) -> Dict:
+    """Identity of an input file, to detect changes between a run and its resume"""
+    stat = path.stat()
+    return {"path": str(path.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class Checkpoint:
+    """Progress of a bulk scoring run, saved atomically after every chunk"""
+
+    def __init__(self, path: Path, inputs: List[Path], chunk_size: int, output_format: str):
+        self.path = path
+        self.state = {
+            "version": CHECKPOINT_VERSION,
+            "chunk_size": chunk_size,
+            "format": output_format,
+            "inputs": [{**input_fingerprint(p), "rows_done": 0, "complete": False} for p in inputs],
+            "chunks_done": 0,
+            "output_bytes": 0,
+        }
+
+    def load(self) -> bool:
+        """
+        Adopt a saved checkpoint of the same run
+
+        Returns:
+            Whether a checkpoint was found
+
+        Raises:
+            ValueError: The checkpoint belongs to different inputs or settings
+        """
+        if not self.path.exists():
+            return False
+        saved = json.loads(self.path.read_text())
+        for key in ("version", "chunk_size", "format"):
+            if saved.get(key) != self.state[key]:
+                raise ValueError(f"Checkpoint {self.path} was written with {key}={saved.get(key)!r}")
+        fingerprints = [{k: entry[k] for k in ("path", "size", "mtime_ns")} for entry in saved["inputs"]]
+        if fingerprints != [{k: entry[k] for k in ("path", "size", "mtime_ns")} for entry in self.state["inputs"]]:
+            raise ValueError(f"Input files changed since checkpoint {self.path} was written")
+        self.state = saved
+        return True
+
+    def save(self):
+        """Write the checkpoint atomically"""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        """Delete the checkpoint after a completed run"""
+        self.path.unlink(missing_ok=True)
+
+
+class OutputWriter:
+    """Append scored chunks to CSV or numbered Parquet parts, durably and in order"""
+
+    def __init__(self, path: Path, output_format: str, checkpoint: Checkpoint):
+        self.path = path
+        self.format = output_format
+        self.checkpoint = checkpoint
+
+    def open(self, resume: bool):
+        """
+        Prepare the output, dropping anything written after the checkpoint
+
+        Raises:
+            ValueError: Resuming, but output the checkpoint counts as written is missing
+        """
+        state = self.checkpoint.state
+        if self.format == "csv":
+            if resume and (not self.path.exists() or self.path.stat().st_size < state["output_bytes"]):
+                raise ValueError(
+                    f"Output {self.path} is missing or shorter than checkpoint {self.checkpoint.path} "
+                    f"records; rerun without --resume"
+                )
+            self._file = open(self.path, "r+b" if resume else "wb")
+            self._file.truncate(state["output_bytes"] if resume else 0)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            if resume:
+                missing = [i for i in range(state["chunks_done"]) if not (self.path / f"part-{i:06d}.parquet").exists()]
+                if missing:
+                    raise ValueError(
+                        f"Output part {self.path / f'part-{missing[0]:06d}.parquet'} recorded by checkpoint "
+                        f"{self.checkpoint.path} is missing; rerun without --resume"
+                    )
+            self.path.mkdir(parents=True, exist_ok=True)
+            for part in self.path.glob("part-*.parquet"):
+                if not resume or int(part.stem.split("-")[1]) >= state["chunks_done"]:
+                    part.unlink()
+
+    def write(self, frame: pd.DataFrame):
+        """Write one chunk and make it durable before the checkpoint moves past it"""
+        state = self.checkpoint.state
+        if self.format == "csv":
+            data = frame.to_csv(index=False, header=state["output_bytes"] == 0).encode()
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            state["output_bytes"] += len(data)
+        else:
+            part = self.path / f"part-{state['chunks_done']:06d}.parquet"
+            frame.to_parquet(part, index=False)
+        state["chunks_done"] += 1
+
+    def close(self):
+        """Close the output file"""
+        if self.format == "csv":
+            self._file.close()
+
+
+def check_chunk(source: str, columns: Dict[str, np.ndarray], first_row: int):
+    """Raise ValueError naming the rows of a chunk that the API would reject with 422"""
+    errors = range_errors(columns, first_row)
+    if errors:
+        raise ValueError(f"{source}: " + "; ".join(
+            f"invalid '{error['field']}' in {error['count']} data row(s), e.g. {error['rows'][:5]}: {error['msg']}"
+            for error in errors
+        ))
+
+
+def result_frame(source: str, first_row: int, predictions: np.ndarray, probabilities: np.ndarray) -> pd.DataFrame:
+    """Output rows of one scored chunk"""
+    return pd.DataFrame({
+        "source": source,
+        "row": np.arange(first_row, first_row + len(predictions)),
+        "prediction": predictions.astype(np.int64),
+        "probability": probabilities,
+        "risk_level": risk_levels(probabilities),
+    })
+
+
+def score_files(
+    inputs: List[Path],
+    output: Path,
+    output_format: str,
+    service_kwargs: Dict,
+    chunk_size: int = 50000,
+    workers: int = 1,
+    resume: bool = False,
+    checkpoint_path: Optional[Path] = None,
+) -> Dict:
+    """
+    Score CSV files into one output, in input order
+
+    Args:
+        inputs: Input CSV files
+        output: Output CSV file or Parquet directory
+        output_format: "csv" or "parquet"
+        service_kwargs: ModelService arguments
+        chunk_size: Rows per chunk
+        workers: Worker processes; 1 scores in this process
+        resume: Continue from the checkpoint of a previous run, if any
+        checkpoint_path: Checkpoint file (default: `<output>.checkpoint.json`)
+
+    Returns:
+        Summary with rows scored by this run, duration and rows per second
+    """
+    global _service
+
+    checkpoint = Checkpoint(
+        checkpoint_path or output.with_name(output.name + ".checkpoint.json"), inputs, chunk_size, output_format
+    )
+    resumed = resume and checkpoint.load()
+    if resumed:
+        done = sum(entry["rows_done"] for entry in checkpoint.state["inputs"])
+        logger.info(f"Resuming from {checkpoint.path}: {done} rows already scored")
+
+    writer = OutputWriter(output, output_format, checkpoint)
+    writer.open(resumed)
+
+    # Loaded once here; forked workers share these pages copy-on-write
+    _service = ModelService(**service_kwargs)
+    pool = None
+    if workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(service_kwargs,)
+        )
+
+    rows = 0
+    start = last_report = time.perf_counter()
+    pending = deque()
+
+    def drain(limit: int):
+        """Write finished chunks in order until at most `limit` are pending"""
+        nonlocal rows, last_report
+        while len(pending) > limit:
+            entry, first_row, n_rows, scored = pending.popleft()
+            predictions, probabilities = scored.result() if pool is not None else scored
+            writer.write(result_frame(Path(entry["path"]).name, first_row, predictions, probabilities))
+            entry["rows_done"] = first_row + n_rows
+            checkpoint.save()
+            rows += n_rows
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                logger.info(f"Scored {rows} rows ({rows / (now - start):,.0f} rows/s)")
+                last_report = now
+
+    try:
+        for entry in checkpoint.state["inputs"]:
+            if entry["complete"]:
+                continue
+            for first_row, columns in read_chunks(Path(entry["path"]), chunk_size, entry["rows_done"]):
+                check_chunk(entry["path"], columns, first_row)
+                n_rows = len(columns[FEATURE_ORDER[0]])
+                scored = pool.submit(_score_chunk, columns) if pool is not None else _score_chunk(columns)
+                pending.append((entry, first_row, n_rows, scored))
+                # Bound the chunks held in memory while keeping every worker busy
+                drain(2 * workers)
+            drain(0)
+            entry["complete"] = True
+            checkpoint.save()
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    checkpoint.remove()
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+        "resumed": resumed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Input CSV files, scored in the given order")
+    parser.add_argument("-o", "--output", required=True, help="Output CSV file or Parquet directory")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=None,
+                        help="Output format (default: from the output suffix, else csv)")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of a crashed run")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--base-dir", default=None, help="Project base directory (auto-detected)")
+    parser.add_argument("--models-dir", default=None, help="Model directory (default: <base-dir>/models)")
+    parser.add_argument("--inference-engine", default=settings.INFERENCE_ENGINE, help="sklearn, native or folded")
+    parser.add_argument("--model-storage", default=settings.MODEL_STORAGE, help="pickle, mmap or bundle")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    output_format = args.format or ("parquet" if output.suffix == ".parquet" else "csv")
+    if output_format == "parquet" and find_spec("pyarrow") is None:
+        parser.error("Parquet output needs pyarrow (pip install pyarrow)")
+
+    try:
+        summary = score_files(
+            [Path(path) for path in args.inputs],
+            output,
+            output_format,
+            service_kwargs={
+                "base_dir": args.base_dir,
+                "models_dir": args.models_dir,
+                "inference_engine": args.inference_engine,
+                "model_storage": args.model_storage,
+            },
+            chunk_size=args.chunk_size,
+            workers=max(1, args.workers),
+            resume=args.resume,
+            checkpoint_path=Path(args.checkpoint) if args.checkpoint else None,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return 1
+    print(
+        f"Scored {summary['rows']} rows in {summary['seconds']:.1f}s "
+        f"({summary['rows_per_second']:,.0f} rows/s) -> {output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,7 @@
 Configuration settings for the Diabetes Prediction API
 """
 import os
-from typing import List
+from typing import Dict, List
 
 
 class Settings:
@@ -27,12 +27,129 @@ class Settings:
     BASE_DIR: str = os.getenv("BASE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     MODELS_DIR: str = os.path.join(BASE_DIR, "models")
     
+    # Inference engine: "sklearn" (default), "native" (flattened NumPy forest)
+    # or "folded" (native forest with the scaler folded into its thresholds)
+    INFERENCE_ENGINE: str = os.getenv("INFERENCE_ENGINE", "sklearn").lower()
+    
+    # Inference executor: "thread" pool sharing the loaded model, or "process"
+    # pool with one model copy per process. Workers are capped at CPU cores.
+    # Process mode is opt-in: the API process keeps its own copy as well
+    # (about 100 MB per pickled forest), so it holds workers + 1 copies.
+    INFERENCE_EXECUTOR: str = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", 0))  # 0 = auto
+    INFERENCE_MAX_PENDING: int = int(os.getenv("INFERENCE_MAX_PENDING", 0))  # 0 = 2x workers
+    
+    # Model storage: "pickle" (unpickle best_diabetes_model.pkl per worker),
+    # "mmap" (memory-map models/forest_mmap/ so workers share one copy) or
+    # "bundle" (load the pickle-free models/forest_bundle.npz); mmap and bundle
+    # need a forest inference engine and `python src/export_model.py --format ...`
+    MODEL_STORAGE: str = os.getenv("MODEL_STORAGE", "pickle").lower()
+    
+    # Retry-After (seconds) sent with 503s while the model loads in the background
+    MODEL_READY_RETRY_AFTER: int = int(os.getenv("MODEL_READY_RETRY_AFTER", 5))
+    
+    # Model hot-swap. POST /admin/model/reload needs the X-Admin-Token header to
+    # match ADMIN_TOKEN (the endpoint is disabled while it is empty). The watcher
+    # swaps in MODEL_WATCH_DIR whenever its files change.
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    MODEL_WATCH_ENABLED: bool = os.getenv("MODEL_WATCH_ENABLED", "false").lower() == "true"
+    MODEL_WATCH_DIR: str = os.getenv("MODEL_WATCH_DIR", MODELS_DIR)
+    MODEL_WATCH_INTERVAL_SECONDS: float = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", 5.0))
+    # Minimum share of probe patients where the candidate agrees with the live model
+    MODEL_SWAP_MIN_AGREEMENT: float = float(os.getenv("MODEL_SWAP_MIN_AGREEMENT", 0.0))
+    
+    # Model registry: the model in MODELS_DIR is served as MODEL_DEFAULT_NAME;
+    # MODEL_REGISTRY adds more as "name=dir,name=dir" (dirs relative to BASE_DIR)
+    MODEL_DEFAULT_NAME: str = os.getenv("MODEL_DEFAULT_NAME", "default")
+    MODEL_REGISTRY: str = os.getenv("MODEL_REGISTRY", "")
+    # Weighted A/B split of /v2/predict as "name=weight,name=weight"
+    MODEL_ROUTING_WEIGHTS: str = os.getenv("MODEL_ROUTING_WEIGHTS", "")
+    
+    # Shadow scoring: after each response, also score the request with this
+    # registry model off the request path and report disagreement on
+    # /shadow/stats (empty disables). Shadow batches only run while the
+    # inference executor is idle; work beyond the queue size is dropped.
+    SHADOW_MODEL: str = os.getenv("SHADOW_MODEL", "")
+    SHADOW_QUEUE_SIZE: int = int(os.getenv("SHADOW_QUEUE_SIZE", 1000))
+    SHADOW_MAX_BATCH_ROWS: int = int(os.getenv("SHADOW_MAX_BATCH_ROWS", 64))
+    SHADOW_SAMPLE_RATE: float = float(os.getenv("SHADOW_SAMPLE_RATE", 1.0))
+    
+    # Micro-batching of concurrent /predict calls
+    MICRO_BATCH_ENABLED: bool = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+    MICRO_BATCH_MAX_SIZE: int = int(os.getenv("MICRO_BATCH_MAX_SIZE", 64))
+    MICRO_BATCH_MAX_WAIT_MS: float = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", 2.0))
+    
+    # Prediction cache keyed on the normalized patient input and model version
+    PREDICTION_CACHE_ENABLED: bool = os.getenv("PREDICTION_CACHE_ENABLED", "false").lower() == "true"
+    PREDICTION_CACHE_MAX_ENTRIES: int = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", 10000))
+    PREDICTION_CACHE_MAX_BYTES: int = int(os.getenv("PREDICTION_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+    PREDICTION_CACHE_TTL_SECONDS: float = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 0))  # 0 = no expiry
+    # Cache key: "input" (raw fields) or "decision_cell" (bins between the
+    # forest's split thresholds, shared by all inputs with identical
+    # predictions; 20k training rows still fall into ~19.5k distinct cells)
+    PREDICTION_CACHE_KEY: str = os.getenv("PREDICTION_CACHE_KEY", "input").lower()
+    
+    # NDJSON streaming of /predict/stream: lines per vectorized model call
+    # and the longest accepted line
+    STREAM_CHUNK_SIZE: int = int(os.getenv("STREAM_CHUNK_SIZE", 2000))
+    STREAM_MAX_LINE_BYTES: int = int(os.getenv("STREAM_MAX_LINE_BYTES", 16384))
+    
+    # Asynchronous batch jobs (/jobs) stored in a SQLite database in WAL mode (opt-in:
+    # enabling creates JOB_DB_PATH and starts background job workers)
+    JOBS_ENABLED: bool = os.getenv("JOBS_ENABLED", "false").lower() == "true"
+    JOB_DB_PATH: str = os.getenv("JOB_DB_PATH", os.path.join(BASE_DIR, "jobs.db"))
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 1))
+    JOB_CHUNK_SIZE: int = int(os.getenv("JOB_CHUNK_SIZE", 5000))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", 30))
+    JOB_RETENTION_SECONDS: float = float(os.getenv("JOB_RETENTION_SECONDS", 86400))
+    JOB_MAX_FINISHED: int = int(os.getenv("JOB_MAX_FINISHED", 1000))
+    JOB_MAX_PAGE_SIZE: int = int(os.getenv("JOB_MAX_PAGE_SIZE", 10000))
+    
+    # Per-stage latency histograms on /metrics (opt-in). With several uvicorn workers,
+    # point METRICS_DIR at a directory shared by them to report their totals
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS: float = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+    # Per-request stage breakdown in a Server-Timing response header (opt-in)
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    
+    # Sampling profiler of /debug/profile (admin only): longest profile and default sampling interval
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 10))
+    
+    # Memory snapshots (/admin/memory): tracemalloc traceback depth and
+    # snapshots kept per worker (each holds every traced allocation)
+    TRACEMALLOC_FRAMES: int = int(os.getenv("TRACEMALLOC_FRAMES", 1))
+    MEMORY_MAX_SNAPSHOTS: int = int(os.getenv("MEMORY_MAX_SNAPSHOTS", 8))
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "info")
     
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     
+    @staticmethod
+    def _parse_pairs(value: str) -> Dict[str, str]:
+        """Parse "key=value,key=value" into a dictionary"""
+        pairs = {}
+        for item in value.split(","):
+            if item.strip():
+                key, sep, val = item.partition("=")
+                if not sep:
+                    raise ValueError(f"Expected 'name=value', got '{item.strip()}'")
+                pairs[key.strip()] = val.strip()
+        return pairs
+    
+    @property
+    def registry_models(self) -> Dict[str, str]:
+        """Extra models from MODEL_REGISTRY: name -> model directory"""
+        return self._parse_pairs(self.MODEL_REGISTRY)
+    
+    @property
+    def routing_weights(self) -> Dict[str, float]:
+        """A/B routing weights from MODEL_ROUTING_WEIGHTS: name -> weight"""
+        return {name: float(weight) for name, weight in self._parse_pairs(self.MODEL_ROUTING_WEIGHTS).items()}
+    
     @property
     def is_production(self) -> bool:
         """Check if running in production environment"""
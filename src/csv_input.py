@@ -0,0 +1,63 @@
+"""
+Typed, chunked reading of patient CSV files
+"""
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import FEATURE_ORDER
+
+# Column types of the input files
+INPUT_DTYPES = {
+    'gender': str,
+    'age': np.float64,
+    'hypertension': np.int64,
+    'heart_disease': np.int64,
+    'smoking_history': str,
+    'bmi': np.float64,
+    'HbA1c_level': np.float64,
+    'blood_glucose_level': np.float64,
+}
+
+
+def read_chunks(
+    path: Union[Path, BinaryIO], chunk_size: int, skip_rows: int = 0
+) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+    """
+    Read a CSV file shaped like data/diabetes_data.csv as typed column chunks
+
+    Extra columns are ignored.
+
+    Args:
+        path: Input CSV file, or a binary file object
+        chunk_size: Rows per chunk
+        skip_rows: Data rows already scored by an earlier run
+
+    Yields:
+        (index of the chunk's first data row, columns in FEATURE_ORDER)
+
+    Raises:
+        ValueError: A feature is missing in some data row
+    """
+    reader = pd.read_csv(
+        path,
+        usecols=FEATURE_ORDER,
+        dtype=INPUT_DTYPES,
+        chunksize=chunk_size,
+        skiprows=range(1, skip_rows + 1) if skip_rows else None,
+    )
+    first_row = skip_rows
+    prefix = f"{path}: " if isinstance(path, (str, Path)) else ""
+    with reader:
+        for frame in reader:
+            columns = {}
+            for feature in FEATURE_ORDER:
+                column = frame[feature]
+                if column.isna().any():
+                    row = first_row + int(np.argmax(column.isna().to_numpy()))
+                    raise ValueError(f"{prefix}missing '{feature}' in data row {row}")
+                columns[feature] = column.to_numpy(dtype=INPUT_DTYPES[feature])
+            yield first_row, columns
+            first_row += len(frame)
@@ -0,0 +1,362 @@
+"""
+Process memory diagnostics for the prediction API
+"""
+import mmap
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# /proc/<pid>/smaps fields reported, converted from kB to bytes
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def _parse_smaps_fields(lines) -> Dict[str, int]:
+    """Sum the interesting smaps fields of a block of lines"""
+    totals = {name: 0 for name in SMAPS_FIELDS}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in totals:
+            totals[name] += int(rest.split()[0]) * 1024
+    return totals
+
+
+def _summarize(totals: Dict[str, int]) -> Dict[str, int]:
+    """Turn raw smaps fields into unique vs shared byte counts"""
+    return {
+        "rss": totals["Rss"],
+        "pss": totals["Pss"],
+        "unique": totals["Private_Clean"] + totals["Private_Dirty"],
+        "shared": totals["Shared_Clean"] + totals["Shared_Dirty"],
+    }
+
+
+def memory_usage(mapped_dir: Optional[Path] = None) -> Dict:
+    """
+    Report this worker's unique vs shared memory
+
+    Uses /proc/self/smaps (Linux). `unique` is memory only this process holds
+    (USS); `shared` is resident memory also mapped by other processes, such as
+    a memory-mapped model read by several workers. `pss` splits shared pages
+    evenly between the processes mapping them.
+
+    Args:
+        mapped_dir: Directory of memory-mapped model files to break out separately
+
+    Returns:
+        Dictionary with process totals and, if `mapped_dir` is given, the part of
+        them backed by files in that directory
+    """
+    smaps = Path("/proc/self/smaps")
+    if not smaps.exists():
+        return {"pid": os.getpid(), "supported": False}
+
+    prefix = str(Path(mapped_dir).resolve()) if mapped_dir is not None else None
+    process_lines = []
+    mapped_lines = []
+    mapped_files = set()
+    in_mapped = False
+
+    with open(smaps) as f:
+        for line in f:
+            first = line.split(None, 1)[0]
+            if "-" in first and not first.endswith(":"):
+                # Mapping header: address range, perms, offset, dev, inode, [path]
+                parts = line.split(None, 5)
+                path = parts[5].strip() if len(parts) > 5 else ""
+                in_mapped = prefix is not None and path.startswith(prefix)
+                if in_mapped:
+                    mapped_files.add(path)
+                continue
+            process_lines.append(line)
+            if in_mapped:
+                mapped_lines.append(line)
+
+    report = {
+        "pid": os.getpid(),
+        "supported": True,
+        "process": _summarize(_parse_smaps_fields(process_lines)),
+    }
+    if prefix is not None:
+        report["model_mapping"] = {
+            "directory": prefix,
+            "files": len(mapped_files),
+            **_summarize(_parse_smaps_fields(mapped_lines)),
+        }
+    return report
+
+
+# tracemalloc grouping: full dotted module, top-level package, or source line
+GROUP_BY = ("module", "package", "line")
+
+# Allocations of tracemalloc itself and of the import machinery are left out of snapshots
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _modules_by_file() -> Dict[str, str]:
+    """Source file -> module name of every imported module"""
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if filename:
+            modules[os.path.realpath(filename)] = name
+    return modules
+
+
+class AllocationTracker:
+    """
+    Named tracemalloc snapshots of this process, compared by module
+
+    Tracing slows every allocation down, so it only runs between `start()`
+    and `stop()`. Snapshots hold every traced allocation and are kept until
+    deleted or until tracing stops, at most `max_snapshots` at a time.
+    """
+
+    def __init__(self, max_snapshots: int = 8):
+        """
+        Initialize the tracker
+
+        Args:
+            max_snapshots: Snapshots kept at once
+        """
+        self.max_snapshots = max_snapshots
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1) -> Dict:
+        """Start tracing with `frames` frames per allocation traceback (no-op if already tracing)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> Dict:
+        """Stop tracing and drop all snapshots"""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+        return self.status()
+
+    def status(self) -> Dict:
+        """Whether tracing runs, traced memory and the stored snapshots"""
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshots = [{"name": name, **self._meta(entry)} for name, entry in self._snapshots.items()]
+        return {
+            "pid": os.getpid(),
+            "tracing": tracemalloc.is_tracing(),
+            "traceback_frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": snapshots,
+        }
+
+    @staticmethod
+    def _meta(entry: Dict[str, Any]) -> Dict:
+        return {key: value for key, value in entry.items() if key != "snapshot"}
+
+    def take(self, name: str) -> Dict:
+        """
+        Take a named snapshot of the traced allocations
+
+        Raises:
+            RuntimeError: Tracing is not running
+            ValueError: The name is taken or `max_snapshots` snapshots are stored
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start tracing first")
+        with self._lock:
+            if name in self._snapshots:
+                raise ValueError(f"Snapshot '{name}' already exists")
+            if len(self._snapshots) >= self.max_snapshots:
+                raise ValueError(f"{self.max_snapshots} snapshots stored; delete one first")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        usage = memory_usage()
+        entry = {
+            "taken_at": time.time(),
+            "traced_bytes": sum(trace.size for trace in snapshot.traces),
+            "rss_bytes": usage["process"]["rss"] if usage["supported"] else None,
+            "snapshot": snapshot,
+        }
+        with self._lock:
+            self._snapshots[name] = entry
+        return {"name": name, **self._meta(entry)}
+
+    def delete(self, name: str) -> bool:
+        """Drop a snapshot; False if it does not exist"""
+        with self._lock:
+            return self._snapshots.pop(name, None) is not None
+
+    def _get(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._snapshots.get(name)
+        if entry is None:
+            raise KeyError(name)
+        return entry
+
+    @staticmethod
+    def _key(filename: str, lineno: int, group_by: str, modules: Dict[str, str]) -> str:
+        """Group label of an allocation site"""
+        module = modules.get(os.path.realpath(filename), filename)
+        if group_by == "package":
+            return module.split(".", 1)[0]
+        if group_by == "line":
+            return f"{module}:{lineno}"
+        return module
+
+    def top(self, name: str, group_by: str = "module", limit: int = 20) -> Dict:
+        """
+        Largest allocation sites of a snapshot
+
+        Args:
+            name: Snapshot name
+            group_by: One of GROUP_BY
+            limit: Number of groups returned
+
+        Returns:
+            Snapshot metadata and the `limit` groups holding the most memory
+
+        Raises:
+            KeyError: Unknown snapshot
+        """
+        entry = self._get(name)
+        modules = _modules_by_file()
+        groups: Dict[str, List[int]] = {}
+        for stat in entry["snapshot"].statistics("lineno" if group_by == "line" else "filename"):
+            frame = stat.traceback[0]
+            group = groups.setdefault(self._key(frame.filename, frame.lineno, group_by, modules), [0, 0])
+            group[0] += stat.size
+            group[1] += stat.count
+
+        ranked = sorted(groups.items(), key=lambda item: item[1][0], reverse=True)
+        return {
+            "name": name,
+            **self._meta(entry),
+            "group_by": group_by,
+            "top": [{group_by: key, "bytes": size, "blocks": count} for key, (size, count) in ranked[:limit]],
+        }
+
+    def diff(self, base: str, target: str, group_by: str = "module", limit: int = 20) -> Dict:
+        """
+        Memory growth from one snapshot to another
+
+        Args:
+            base: Earlier snapshot
+            target: Later snapshot
+            group_by: One of GROUP_BY
+            limit: Number of groups returned
+
+        Returns:
+            Total change and the `limit` groups with the largest change, either way
+
+        Raises:
+            KeyError: Unknown snapshot
+        """
+        old, new = self._get(base), self._get(target)
+        modules = _modules_by_file()
+        groups: Dict[str, List[int]] = {}
+        for stat in new["snapshot"].compare_to(old["snapshot"], "lineno" if group_by == "line" else "filename"):
+            frame = stat.traceback[0]
+            group = groups.setdefault(self._key(frame.filename, frame.lineno, group_by, modules), [0, 0, 0])
+            group[0] += stat.size_diff
+            group[1] += stat.count_diff
+            group[2] += stat.size
+
+        ranked = sorted(groups.items(), key=lambda item: abs(item[1][0]), reverse=True)
+        rss = (new["rss_bytes"] - old["rss_bytes"]) if new["rss_bytes"] is not None and old["rss_bytes"] is not None else None
+        return {
+            "base": base,
+            "target": target,
+            "seconds_between": new["taken_at"] - old["taken_at"],
+            "traced_bytes_diff": new["traced_bytes"] - old["traced_bytes"],
+            "rss_bytes_diff": rss,
+            "group_by": group_by,
+            "top": [
+                {group_by: key, "bytes_diff": size_diff, "blocks_diff": count_diff, "bytes": size}
+                for key, (size_diff, count_diff, size) in ranked[:limit]
+            ],
+        }
+
+
+def deep_sizeof(obj: Any, seen: Optional[Dict[int, Any]] = None) -> int:
+    """
+    Approximate heap bytes held by an object and everything it references
+
+    Follows containers, instance attributes and slots. NumPy arrays count
+    their data, except arrays backed by a memory-mapped file; extension
+    objects without attributes (such as sklearn's Cython `Tree`) are measured
+    through their pickled state. Objects reached twice are counted once;
+    `seen` maps the id of every object visited to the object, keeping
+    temporaries such as pickled state alive so their ids are not reused.
+    """
+    if seen is None:
+        seen = {}
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        size = sys.getsizeof(obj)
+        base = obj.base
+        if base is None or isinstance(base, mmap.mmap):
+            return size
+        if isinstance(base, (np.ndarray, bytes, bytearray, memoryview)):
+            return size + deep_sizeof(base, seen)
+        # A view of a buffer owned by an extension object
+        return size + obj.nbytes
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, complex)) or obj is None:
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+
+    state = getattr(obj, "__dict__", None)
+    if state is not None:
+        size += deep_sizeof(state, seen)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if hasattr(obj, slot) and not slot.startswith("__"):
+                size += deep_sizeof(getattr(obj, slot), seen)
+    if state is None and hasattr(obj, "__getstate__") and type(obj).__module__ not in ("builtins", "mmap"):
+        try:
+            extension_state = obj.__getstate__()
+        except Exception:
+            extension_state = None
+        if isinstance(extension_state, dict):
+            size += sum(deep_sizeof(value, seen) for value in extension_state.values())
+    return size
+
+
+# ModelService attributes reported by `model_footprint`
+FOOTPRINT_COMPONENTS = ("model", "estimator", "scaler", "label_encoders", "preprocessing_plan", "decision_cells")
+
+
+def model_footprint(service) -> Dict[str, Optional[int]]:
+    """
+    Heap bytes of each loaded component of a ModelService
+
+    `estimator` only counts what `model` does not already hold (e.g. a native
+    forest built from it), and `total` counts shared objects once.
+    Memory-mapped model files are not included; see `memory_usage`.
+    """
+    footprint = {}
+    seen: Dict[int, Any] = {}
+    for component in FOOTPRINT_COMPONENTS:
+        value = getattr(service, component, None)
+        footprint[component] = deep_sizeof(value, seen) if value is not None else None
+    footprint["total"] = sum(size for size in footprint.values() if size)
+    return footprint
@@ -0,0 +1,341 @@
+"""
+Bounded executor that keeps CPU-bound inference off the event loop
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("thread", "process")
+
+# Model registry owned by each worker process in process mode
+_worker_registry = None
+
+
+class StaleModelError(RuntimeError):
+    """Raised when features preprocessed for one model version reach another"""
+
+
+def _init_worker(specs: List[Tuple], default_name: str):
+    """Load a private copy of the model registry in a worker process"""
+    global _worker_registry
+
+    # One inference per process; keep native thread pools from oversubscribing
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+    from model_service import ModelRegistry
+    _worker_registry = ModelRegistry.from_specs(specs, default_name)
+
+
+def _worker_predict(model_name: str, patient_data: Dict) -> Tuple[int, float, str]:
+    """Single prediction inside a worker process"""
+    service = _worker_registry.get(model_name)
+    prediction, probability = service.predict(patient_data)
+    return prediction, probability, service.model_version
+
+
+def _worker_predict_batch(model_name: str, patients: List[Dict]) -> List[Tuple[int, float, str]]:
+    """Batch prediction inside a worker process"""
+    service = _worker_registry.get(model_name)
+    return [
+        (prediction, probability, service.model_version)
+        for prediction, probability in service.predict_batch(patients)
+    ]
+
+
+def _worker_predict_columns(model_name: str, columns: Dict[str, Sequence]) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Columnar batch prediction inside a worker process"""
+    service = _worker_registry.get(model_name)
+    predictions, probabilities = service.predict_columns(columns)
+    return predictions, probabilities, service.model_version
+
+
+def _worker_predict_encoded(model_name: str, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Prediction of a pre-encoded feature matrix inside a worker process"""
+    service = _worker_registry.get(model_name)
+    predictions, probabilities = service.predict_encoded(matrix)
+    return predictions, probabilities, service.model_version
+
+
+def _worker_preprocess_cells(model_name: str, patients: List[Dict]) -> Tuple[np.ndarray, List[Tuple], str]:
+    """Preprocessing and decision-cell keys of a batch inside a worker process"""
+    service = _worker_registry.get(model_name)
+    features, keys = service.preprocess_cells(patients)
+    return features, keys, service.model_version
+
+
+def _worker_predict_features(model_name: str, features: np.ndarray, model_version: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Prediction of preprocessed features inside a worker process"""
+    service = _worker_registry.get(model_name)
+    if service.model_version != model_version:
+        raise StaleModelError(f"Features were preprocessed by model {model_version}, serving {service.model_version}")
+    return service.predict_features(features)
+
+
+def _run_timed(submitted: float, fn, *args):
+    """Record how long a job waited for a pool thread, then run it"""
+    record_stage("queue_wait", time.perf_counter() - submitted)
+    return fn(*args)
+
+
+def default_workers() -> int:
+    """Default pool size: one worker per core, capped at 4"""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+class InferenceExecutor:
+    """
+    Run model predictions in a dedicated, bounded worker pool
+
+    The `async def` endpoints await predictions here instead of calling the
+    model inline, so a large batch no longer blocks `/health` or other requests
+    on the same worker. The pool never has more workers than CPU cores, and at
+    most `max_pending` jobs are submitted at once; further callers wait.
+
+    Jobs are scored by one model of the registry, chosen by name, and results
+    carry the version of the model that produced them. `swap()` replaces a
+    model without dropping requests: jobs already submitted finish on the
+    previous model.
+    """
+
+    def __init__(
+        self,
+        model_registry,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        """
+        Initialize the executor
+
+        Args:
+            model_registry: ModelRegistry used in thread mode (and whose
+                configuration is reused by process workers)
+            mode: "thread" to share the loaded models, or "process" to run
+                inference in separate processes with their own model copies.
+                The registry's models stay loaded in this process too, so
+                process mode holds `max_workers + 1` copies of each model
+            max_workers: Pool size; defaults to `default_workers()` and is capped
+                at the number of CPU cores
+            max_pending: Jobs allowed in the pool at once (running + queued);
+                defaults to twice the pool size
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(
+                f"Unknown executor mode '{mode}'. Allowed values: {list(EXECUTOR_MODES)}"
+            )
+
+        cores = os.cpu_count() or 1
+        workers = max_workers or default_workers()
+        if workers > cores:
+            logger.warning(f"Capping inference workers at {cores} CPU cores (requested {workers})")
+            workers = cores
+
+        if mode == "process":
+            logger.warning(
+                f"Process executor: each of the {workers} workers loads its own copy of every model, "
+                f"on top of the copy the API process keeps for readiness, hot-swap checks, cache keys "
+                f"and shadow scoring; MODEL_STORAGE=mmap lets them share the forest pages"
+            )
+
+        self.model_registry = model_registry
+        self.mode = mode
+        self.max_workers = workers
+        self.max_pending = max_pending or workers * 2
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = 0
+
+    def _create_pool(self, specs: Optional[List[Tuple]] = None) -> Executor:
+        """Start a worker pool; process workers load the models described by `specs`"""
+        if self.mode == "process":
+            pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(specs, self.model_registry.default_name),
+            )
+        else:
+            pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+            )
+        logger.info(f"Inference {self.mode} pool started with {self.max_workers} workers")
+        return pool
+
+    def _get_pool(self) -> Executor:
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            self._pool = self._create_pool(self.model_registry.specs())
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding submitted jobs, bound to the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _submit(self, fn, *args):
+        """Run `fn(*args)` in the pool once a slot is free"""
+        submitted = time.perf_counter()
+        self._in_flight += 1
+        try:
+            async with self._get_slots():
+                loop = asyncio.get_running_loop()
+                if self.mode == "process":
+                    return await loop.run_in_executor(self._get_pool(), fn, *args)
+                # Run in a copy of the caller's context so stage timings reach its request
+                return await loop.run_in_executor(
+                    self._get_pool(), contextvars.copy_context().run, _run_timed, submitted, fn, *args
+                )
+        finally:
+            self._in_flight -= 1
+
+    def in_flight(self) -> int:
+        """Jobs running or waiting for a slot"""
+        return self._in_flight
+
+    async def predict(self, patient_data: Dict, model_name: Optional[str] = None) -> Tuple[int, float, str]:
+        """Score one patient in the pool, returning (prediction, probability, model_version)"""
+        name = model_name or self.model_registry.default_name
+        start = time.perf_counter()
+        if self.mode == "process":
+            result = await self._submit(_worker_predict, name, patient_data)
+        else:
+            service = self.model_registry.get(name)
+            prediction, probability = await self._submit(service.predict, patient_data)
+            result = (prediction, probability, service.model_version)
+        self.model_registry.record(name, 1, time.perf_counter() - start)
+        return result
+
+    async def predict_batch(
+        self, patients: List[Dict], model_name: Optional[str] = None
+    ) -> List[Tuple[int, float, str]]:
+        """Score a batch of patients in the pool, each with the serving model version"""
+        name = model_name or self.model_registry.default_name
+        start = time.perf_counter()
+        if self.mode == "process":
+            results = await self._submit(_worker_predict_batch, name, patients)
+        else:
+            service = self.model_registry.get(name)
+            scored = await self._submit(service.predict_batch, patients)
+            results = [(prediction, probability, service.model_version) for prediction, probability in scored]
+        self.model_registry.record(name, len(patients), time.perf_counter() - start)
+        return results
+
+    async def predict_columns(
+        self, columns: Dict[str, Sequence], model_name: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, str]:
+        """Score a batch given as one sequence per feature, returning arrays and the model version"""
+        name = model_name or self.model_registry.default_name
+        rows = len(next(iter(columns.values()))) if columns else 0
+        start = time.perf_counter()
+        if self.mode == "process":
+            result = await self._submit(_worker_predict_columns, name, columns)
+        else:
+            service = self.model_registry.get(name)
+            predictions, probabilities = await self._submit(service.predict_columns, columns)
+            result = (predictions, probabilities, service.model_version)
+        self.model_registry.record(name, rows, time.perf_counter() - start)
+        return result
+
+    async def predict_encoded(
+        self, matrix: np.ndarray, model_name: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, str]:
+        """Score a pre-encoded feature matrix, returning arrays and the model version"""
+        name = model_name or self.model_registry.default_name
+        start = time.perf_counter()
+        if self.mode == "process":
+            result = await self._submit(_worker_predict_encoded, name, matrix)
+        else:
+            service = self.model_registry.get(name)
+            predictions, probabilities = await self._submit(service.predict_encoded, matrix)
+            result = (predictions, probabilities, service.model_version)
+        self.model_registry.record(name, len(matrix), time.perf_counter() - start)
+        return result
+
+    async def preprocess_cells(
+        self, patients: List[Dict], model_name: Optional[str] = None
+    ) -> Tuple[np.ndarray, List[Tuple], str]:
+        """Preprocess a batch in the pool, returning the features, decision-cell keys and model version"""
+        name = model_name or self.model_registry.default_name
+        if self.mode == "process":
+            return await self._submit(_worker_preprocess_cells, name, patients)
+        service = self.model_registry.get(name)
+        features, keys = await self._submit(service.preprocess_cells, patients)
+        return features, keys, service.model_version
+
+    async def predict_features(
+        self, features: np.ndarray, model_version: str, model_name: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score features from `preprocess_cells` with the model that preprocessed them
+
+        Raises:
+            StaleModelError: `model_version` is no longer served under this name
+        """
+        name = model_name or self.model_registry.default_name
+        start = time.perf_counter()
+        if self.mode == "process":
+            result = await self._submit(_worker_predict_features, name, features, model_version)
+        else:
+            service = self.model_registry.get(name)
+            if service.model_version != model_version:
+                raise StaleModelError(f"Features were preprocessed by model {model_version}, serving {service.model_version}")
+            result = await self._submit(service.predict_features, features)
+        self.model_registry.record(name, len(features), time.perf_counter() - start)
+        return result
+
+    async def swap(self, model_name: str, model_service, warmup_patient: Optional[Dict] = None):
+        """
+        Atomically replace one model of the registry for new jobs
+
+        In process mode a new pool is started with `model_service` in place of
+        the current model (and warmed up with `warmup_patient`) before it
+        replaces the old pool. The old pool is shut down without cancelling its
+        queued jobs, so they still complete.
+
+        Args:
+            model_name: Registry entry to replace
+            model_service: Loaded ModelService to serve from now on
+            warmup_patient: Patient scored in the new pool before the swap
+        """
+        if self.mode != "process":
+            self.model_registry.replace(model_name, model_service)
+            return
+
+        pool = self._create_pool(self.model_registry.specs(replace={model_name: model_service}))
+        if warmup_patient is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(pool, _worker_predict, model_name, warmup_patient)
+            except Exception:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        previous = self._pool
+        self.model_registry.replace(model_name, model_service)
+        self._pool = pool
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def shutdown(self):
+        """Shut down the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Export the trained model into alternative storage formats
+
+    python src/export_model.py --format mmap
+    python src/export_model.py --format bundle
+
+Formats:
+    mmap:   Flat forest as uncompressed .npy arrays in models/forest_mmap/, loaded
+            with MODEL_STORAGE=mmap so all workers share the same pages
+    bundle: Compact, checksummed, pickle-free models/forest_bundle.npz holding the
+            forest and preprocessing components, loaded with MODEL_STORAGE=bundle
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+from forest_engine import FlatForest
+from model_bundle import save_bundle
+from model_service import FOREST_BUNDLE_FILE, FOREST_MMAP_DIR, ModelService
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("mmap", "bundle")
+
+
+def export_mmap(service: ModelService, output_dir: Path):
+    """Write the flattened forest as memory-mappable arrays"""
+    forest = FlatForest.from_sklearn(service.model)
+    forest.save(output_dir, metadata={
+        "model_type": service.model_type,
+        "model_version": service.model_version,
+    })
+    size = sum(path.stat().st_size for path in output_dir.iterdir())
+    logger.info(f"Wrote {forest.n_nodes} nodes to {output_dir} ({size / 1e6:.1f} MB)")
+
+
+def export_bundle(service: ModelService, output_path: Path):
+    """Write the forest and preprocessing components as one model bundle"""
+    forest = FlatForest.from_sklearn(service.model)
+    manifest = save_bundle(
+        output_path,
+        forest,
+        label_encoders=service.label_encoders,
+        scaler=service.scaler,
+        selected_features=service.selected_features,
+        feature_indices=service.feature_indices,
+        model_type=service.model_type,
+        model_version=service.model_version,
+    )
+    size = output_path.stat().st_size
+    logger.info(
+        f"Wrote {forest.n_nodes} nodes to {output_path} ({size / 1e6:.1f} MB, "
+        f"checksum {manifest['checksum'][:12]})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the trained model")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="mmap", help="Output format")
+    parser.add_argument("--base-dir", default=None, help="Project base directory (auto-detected)")
+    parser.add_argument("--output", default=None, help="Output path (defaults to models/<format dir>)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    service = ModelService(base_dir=args.base_dir)
+
+    if args.format == "mmap":
+        output = Path(args.output) if args.output else service.models_dir / FOREST_MMAP_DIR
+        export_mmap(service, output)
+    elif args.format == "bundle":
+        output = Path(args.output) if args.output else service.models_dir / FOREST_BUNDLE_FILE
+        export_bundle(service, output)
+
+    logger.info(f"Export finished in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,523 @@
+"""
+Array-based evaluator for fitted sklearn tree ensembles
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of (tree, row) pairs traversed at once; bounds the size of the
+# temporary node index arrays for very large batches
+MAX_CELLS_PER_CHUNK = 2_000_000
+
+# Arrays written by `FlatForest.save`, one uncompressed .npy file each
+FOREST_ARRAYS = ("children", "feature", "threshold", "leaf_values", "roots", "is_leaf")
+FOREST_METADATA = "forest.json"
+
+
+class FlatForest:
+    """
+    Random forest flattened into contiguous NumPy buffers
+
+    All trees are concatenated into one node table (children, split feature,
+    threshold, leaf class distribution). A batch is evaluated for every tree at
+    once by advancing all (tree, row) cursors one level per step, so the cost of
+    a call is a handful of vectorized operations per tree level instead of a
+    Python dispatch per tree.
+
+    Results match `RandomForestClassifier.predict_proba` exactly: inputs are cast
+    to float32 like sklearn's tree code, leaf distributions are normalized the
+    same way, and per-tree probabilities are summed in estimator order.
+    """
+
+    def __init__(
+        self,
+        children: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        leaf_values: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        classes: np.ndarray,
+        n_features: int,
+        input_dtype=np.float32,
+        is_leaf: Optional[np.ndarray] = None,
+        leaf_index: Optional[np.ndarray] = None,
+    ):
+        """
+        Create a flat forest from already-concatenated node arrays
+
+        Args:
+            children: Global (right, left) child indices per node, shape
+                (n_nodes, 2); leaves point at themselves. Interleaving lets one
+                gather pick the branch.
+            feature: Split feature per node (0 for leaves)
+            threshold: Split threshold per node
+            leaf_values: Normalized class distribution per node, shape (n_nodes, n_classes),
+                or a deduplicated table of distributions when `leaf_index` is given
+            roots: Global index of each tree's root node
+            max_depth: Deepest tree depth in the ensemble
+            classes: Class labels, as in `classes_`
+            n_features: Number of input features expected
+            input_dtype: dtype inputs are cast to before comparing with thresholds
+                (float32 like sklearn, or float64 for scaler-folded forests)
+            is_leaf: Leaf mask per node; derived from `children` when omitted
+            leaf_index: Optional row of `leaf_values` for each node
+        """
+        self.children = children
+        self.feature = feature
+        self.threshold = threshold
+        self.leaf_values = leaf_values
+        self.leaf_index = leaf_index
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        self.input_dtype = np.dtype(input_dtype)
+        if is_leaf is None:
+            is_leaf = children[:, 1] == np.arange(len(children))
+        self.is_leaf = is_leaf
+        self._children_flat = children.reshape(-1)
+
+    @property
+    def children_left(self) -> np.ndarray:
+        """Left child per node (view)"""
+        return self.children[:, 1]
+
+    @property
+    def children_right(self) -> np.ndarray:
+        """Right child per node (view)"""
+        return self.children[:, 0]
+
+    @property
+    def node_leaf_values(self) -> np.ndarray:
+        """Class distribution per node, resolving `leaf_index` if present"""
+        if self.leaf_index is None:
+            return self.leaf_values
+        return self.leaf_values[self.leaf_index]
+
+    @property
+    def n_estimators(self) -> int:
+        """Number of trees in the forest"""
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        """Total number of nodes across all trees"""
+        return len(self.children)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """
+        Flatten a fitted sklearn forest classifier
+
+        Args:
+            model: Fitted RandomForestClassifier (or any forest exposing
+                `estimators_` of single-output decision tree classifiers)
+
+        Returns:
+            FlatForest evaluating the same ensemble
+        """
+        if not hasattr(model, "estimators_") or not hasattr(model, "classes_"):
+            raise ValueError(f"Unsupported model type for flat forest: {type(model).__name__}")
+
+        n_classes = len(model.classes_)
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Only single-output forests are supported")
+
+            nodes = np.arange(tree.node_count, dtype=np.intp)
+            leaf = tree.children_left == -1
+
+            # Leaves point at themselves so extra traversal steps are no-ops
+            left = np.where(leaf, nodes, tree.children_left) + offset
+            right = np.where(leaf, nodes, tree.children_right) + offset
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+
+            lefts.append(left)
+            rights.append(right)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            values.append(proba)
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        children = np.stack([np.concatenate(rights), np.concatenate(lefts)], axis=1)
+        return cls(
+            children=np.ascontiguousarray(children, dtype=np.intp),
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            leaf_values=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_,
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Find the leaf reached in every tree for every row
+
+        Args:
+            X: Feature matrix of shape (n_samples, n_features), already cast
+                to `input_dtype`
+
+        Returns:
+            Global leaf indices of shape (n_estimators, n_samples)
+        """
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        nodes = np.repeat(self.roots, n_samples)
+        offsets = np.tile(np.arange(n_samples, dtype=np.intp) * n_features, self.n_estimators)
+
+        # Level-synchronous traversal: every unfinished cursor moves one level
+        # per step, and cursors that reached a leaf drop out of the active set
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        for _ in range(self.max_depth):
+            if active.size == 0:
+                break
+            current = nodes[active]
+            values = flat_X[offsets[active] + self.feature[current]]
+            go_left = values <= self.threshold[current]
+            current = self._children_flat[2 * current + go_left]
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+
+        nodes = nodes.reshape(self.n_estimators, n_samples)
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict class probabilities, matching sklearn's forest output
+
+        Args:
+            X: Feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            Class probabilities of shape (n_samples, n_classes)
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has shape {X.shape}, but the forest expects {self.n_features_in_} features"
+            )
+
+        # sklearn evaluates trees on float32 inputs
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        n_samples = X.shape[0]
+        proba = np.zeros((n_samples, len(self.classes_)), dtype=np.float64)
+
+        chunk = max(1, MAX_CELLS_PER_CHUNK // max(1, self.n_estimators))
+        for start in range(0, n_samples, chunk):
+            stop = min(start + chunk, n_samples)
+            leaves = self.apply(X[start:stop])
+            out = proba[start:stop]
+            # Accumulate in estimator order, as the sklearn forest does
+            if self.leaf_index is not None:
+                leaves = self.leaf_index[leaves]
+            for tree_leaves in leaves:
+                out += self.leaf_values[tree_leaves]
+
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict class labels using the same argmax rule as sklearn"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def fold_scaler(self, means: np.ndarray, scales: np.ndarray) -> "FlatForest":
+        """
+        Move input standardization into the split thresholds
+
+        The forest was trained on `float32((x - mean) / scale)`. That expression is
+        monotone in the raw value `x`, so every split `scaled <= t` is equivalent
+        to `x <= c` for a single raw cutoff `c`. The cutoff is found exactly (to
+        the last float64 bit) by bisection, not by the approximate inverse
+        `t * scale + mean`, so decisions are identical for every float64 input.
+
+        Args:
+            means: Scaler mean per model input column
+            scales: Scaler scale per model input column
+
+        Returns:
+            New FlatForest that takes raw (unscaled) float64 features
+        """
+        internal = ~self.is_leaf
+        feature = self.feature[internal]
+        threshold = self.threshold.astype(np.float64)
+        threshold[internal] = _raw_cutoffs(
+            self.threshold[internal],
+            np.asarray(means, dtype=np.float64)[feature],
+            np.asarray(scales, dtype=np.float64)[feature],
+        )
+
+        return FlatForest(
+            children=self.children,
+            feature=self.feature,
+            threshold=threshold,
+            leaf_values=self.leaf_values,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            n_features=self.n_features_in_,
+            input_dtype=np.float64,
+            is_leaf=self.is_leaf,
+            leaf_index=self.leaf_index,
+        )
+
+    def save(self, directory: Union[str, Path], metadata: Optional[Dict] = None):
+        """
+        Write the forest as uncompressed .npy arrays plus a JSON header
+
+        The arrays can be memory-mapped by `load`, so every worker process on
+        a host shares the same physical pages.
+
+        Args:
+            directory: Output directory (created if missing)
+            metadata: Extra JSON-serializable fields stored in the header
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in FOREST_ARRAYS:
+            array = self.node_leaf_values if name == "leaf_values" else getattr(self, name)
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(array))
+
+        header = dict(metadata or {})
+        header.update({
+            "max_depth": self.max_depth,
+            "n_features": self.n_features_in_,
+            "classes": self.classes_.tolist(),
+            "input_dtype": self.input_dtype.name,
+        })
+        with open(directory / FOREST_METADATA, "w") as f:
+            json.dump(header, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap_mode: Optional[str] = "r") -> Tuple["FlatForest", Dict]:
+        """
+        Load a forest written by `save`
+
+        Args:
+            directory: Directory containing the .npy arrays and header
+            mmap_mode: Passed to `np.load`; "r" maps the arrays read-only so
+                they are shared between processes, None reads private copies
+
+        Returns:
+            Tuple of (forest, header metadata)
+        """
+        directory = Path(directory)
+        with open(directory / FOREST_METADATA) as f:
+            header = json.load(f)
+
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in FOREST_ARRAYS
+        }
+        forest = cls(
+            children=arrays["children"],
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            leaf_values=arrays["leaf_values"],
+            roots=arrays["roots"],
+            max_depth=header["max_depth"],
+            classes=np.asarray(header["classes"]),
+            n_features=header["n_features"],
+            input_dtype=np.dtype(header["input_dtype"]),
+            is_leaf=arrays["is_leaf"],
+        )
+        return forest, header
+
+
+class DecisionCells:
+    """
+    Map feature vectors to the forest cell they fall into
+
+    For each model input column, the sorted unique split thresholds used
+    anywhere in the forest partition the axis into bins. Two inputs in the
+    same bin on every column take the same branch at every split of every
+    tree, so they reach the same leaves and get identical probabilities. The
+    tuple of bin indices is therefore a cache key that is exactly
+    prediction-equivalent, yet far coarser than the raw values.
+    """
+
+    def __init__(self, thresholds: List[np.ndarray], input_dtype=np.float32):
+        """
+        Create the bin edges
+
+        Args:
+            thresholds: Sorted unique split thresholds per model input column
+            input_dtype: dtype the forest casts inputs to before comparing
+        """
+        self.thresholds = thresholds
+        self.input_dtype = np.dtype(input_dtype)
+
+    @classmethod
+    def from_forest(cls, forest: FlatForest) -> "DecisionCells":
+        """Collect the split thresholds of a flat forest per input column"""
+        internal = ~forest.is_leaf
+        feature = forest.feature[internal]
+        threshold = forest.threshold[internal]
+        thresholds = [np.unique(threshold[feature == j]) for j in range(forest.n_features_in_)]
+        return cls(thresholds, input_dtype=forest.input_dtype)
+
+    @property
+    def n_cells(self) -> int:
+        """Number of distinct decision cells (product of bins per column)"""
+        cells = 1
+        for edges in self.thresholds:
+            cells *= len(edges) + 1
+        return cells
+
+    def bins(self, X: np.ndarray) -> np.ndarray:
+        """
+        Bin index of every value, shape (n_samples, n_features)
+
+        A split sends `x` left when `x <= t`. `searchsorted(..., side="left")`
+        counts the thresholds strictly below `x`, so equal bins mean equal
+        decisions against every threshold.
+        """
+        X = np.asarray(X, dtype=self.input_dtype)
+        bins = np.empty(X.shape, dtype=np.intp)
+        for j, edges in enumerate(self.thresholds):
+            bins[:, j] = np.searchsorted(edges, X[:, j], side="left")
+        return bins
+
+    def keys(self, X: np.ndarray) -> List[Tuple[int, ...]]:
+        """Hashable decision-cell key for every row of X"""
+        return [tuple(row) for row in self.bins(X).tolist()]
+
+
+def _scaled(x: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Scale raw values the way the scaled pipeline feeds the trees"""
+    with np.errstate(over="ignore", invalid="ignore"):
+        return ((x - mean) / scale).astype(np.float32)
+
+
+def _raw_cutoffs(threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Find the largest raw value that still goes left for each scaled threshold
+
+    Args:
+        threshold: Scaled split thresholds
+        mean: Scaler mean for each split's feature
+        scale: Scaler scale for each split's feature
+
+    Returns:
+        Raw float64 cutoffs `c` such that `x <= c` iff `float32((x - mean) / scale) <= t`
+    """
+    guess = threshold * scale + mean
+    step = np.abs(guess) * 1e-5 + 1e-5
+
+    # Bracket the boundary: f(lo) <= t < f(hi)
+    lo = guess - step
+    hi = guess + step
+    for _ in range(64):
+        low_bad = _scaled(lo, mean, scale) > threshold
+        high_bad = _scaled(hi, mean, scale) <= threshold
+        if not (low_bad.any() or high_bad.any()):
+            break
+        lo = np.where(low_bad, lo - step, lo)
+        hi = np.where(high_bad, hi + step, hi)
+        step = step * 2
+    else:
+        raise ValueError("Could not bracket scaled thresholds in raw feature units")
+
+    # Bisect until lo and hi are adjacent doubles
+    while True:
+        mid = lo + (hi - lo) / 2
+        open_ = (mid > lo) & (mid < hi)
+        if not open_.any():
+            break
+        goes_left = _scaled(mid, mean, scale) <= threshold
+        lo = np.where(open_ & goes_left, mid, lo)
+        hi = np.where(open_ & ~goes_left, mid, hi)
+
+    return lo
+
+
+@dataclass
+class FoldReport:
+    """Outcome of checking a scaler-folded forest against its scaled original"""
+    thresholds_checked: int
+    # Splits whose folded cutoff does not reproduce the scaled decision at
+    # the boundary (should always be empty)
+    violations: List[int] = field(default_factory=list)
+
+    @property
+    def exact(self) -> bool:
+        """True when every folded split decides exactly like the original"""
+        return not self.violations
+
+
+def verify_folded(
+    forest: FlatForest,
+    folded: FlatForest,
+    means: np.ndarray,
+    scales: np.ndarray,
+) -> FoldReport:
+    """
+    Check every folded threshold against the scaled split it replaces
+
+    A folded cutoff `c` is exact when `c` itself still goes left in the scaled
+    model and the next float64 above `c` goes right.
+
+    Args:
+        forest: Original forest over scaled inputs
+        folded: Forest returned by `forest.fold_scaler(means, scales)`
+        means: Scaler mean per model input column
+        scales: Scaler scale per model input column
+
+    Returns:
+        FoldReport listing global node indices of violating splits
+    """
+    nodes = np.flatnonzero(~forest.is_leaf)
+    feature = forest.feature[nodes]
+    mean = np.asarray(means, dtype=np.float64)[feature]
+    scale = np.asarray(scales, dtype=np.float64)[feature]
+    threshold = forest.threshold[nodes]
+    cutoff = folded.threshold[nodes]
+
+    at_cutoff_left = _scaled(cutoff, mean, scale) <= threshold
+    above_cutoff_left = _scaled(np.nextafter(cutoff, np.inf), mean, scale) <= threshold
+    violations = nodes[~at_cutoff_left | above_cutoff_left]
+
+    return FoldReport(
+        thresholds_checked=len(nodes),
+        violations=violations.tolist(),
+    )
+
+
+def check_parity(model, forest: FlatForest, X: np.ndarray) -> Tuple[int, float]:
+    """
+    Compare a flat forest against the sklearn model it was built from
+
+    Args:
+        model: Original sklearn forest
+        forest: Flattened forest
+        X: Feature matrix to score with both
+
+    Returns:
+        Tuple of (rows whose probabilities differ, largest absolute difference)
+    """
+    expected = model.predict_proba(X)
+    actual = forest.predict_proba(X)
+    mismatched = int(np.any(expected != actual, axis=1).sum())
+    return mismatched, float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+
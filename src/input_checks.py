@@ -0,0 +1,67 @@
+"""
+Column-wise bound and integer checks of numeric patient fields
+
+The single-patient request schema takes its bounds from FIELD_BOUNDS, so
+columnar, binary, CSV and bulk inputs are held to the same limits.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+from preprocessing import BINARY_FEATURES
+
+# Accepted range of each numeric field, as pydantic Field(ge=..., le=...) keywords
+FIELD_BOUNDS = {
+    'age': {'ge': 0, 'le': 120},
+    'hypertension': {'ge': 0, 'le': 1},
+    'heart_disease': {'ge': 0, 'le': 1},
+    'bmi': {'ge': 10, 'le': 100},
+    'HbA1c_level': {'ge': 3.5, 'le': 10},
+    'blood_glucose_level': {'ge': 80, 'le': 300},
+}
+
+# Fields that only take whole numbers; columns may arrive as floats
+INTEGER_FIELDS = list(BINARY_FEATURES)
+
+# Offending row indices listed per field
+MAX_REPORTED_ROWS = 20
+
+
+def range_errors(columns: Dict[str, np.ndarray], first_row: int = 0) -> List[Dict]:
+    """
+    List, per field, the rows outside FIELD_BOUNDS or not whole numbers
+
+    Args:
+        columns: Mapping of feature name to its values
+        first_row: Index of the first row, added to the reported rows
+
+    Returns:
+        One error per offending field and check, with `field`, `msg`, `type`,
+        the first MAX_REPORTED_ROWS offending `rows` and their total `count`;
+        empty if every row passes
+    """
+    errors = []
+    for name, bounds in FIELD_BOUNDS.items():
+        values = np.asarray(columns[name], dtype=np.float64)
+        rows = np.flatnonzero(~((values >= bounds['ge']) & (values <= bounds['le'])))
+        if rows.size:
+            errors.append({
+                "field": name,
+                "msg": f"Input should be greater than or equal to {bounds['ge']} and less than or equal to {bounds['le']}",
+                "type": "range_error",
+                "rows": (rows[:MAX_REPORTED_ROWS] + first_row).tolist(),
+                "count": int(rows.size)
+            })
+    for name in INTEGER_FIELDS:
+        values = np.asarray(columns[name], dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            rows = np.flatnonzero(values != np.floor(values))
+        if rows.size:
+            errors.append({
+                "field": name,
+                "msg": "Input should be a valid integer, got a number with a fractional part",
+                "type": "int_from_float",
+                "rows": (rows[:MAX_REPORTED_ROWS] + first_row).tolist(),
+                "count": int(rows.size)
+            })
+    return errors
@@ -0,0 +1,457 @@
+"""
+Asynchronous batch scoring jobs backed by a local SQLite database
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("uploading", "queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    total_rows INTEGER NOT NULL,
+    total_chunks INTEGER NOT NULL,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    processed_rows INTEGER NOT NULL DEFAULT 0,
+    model_versions TEXT NOT NULL DEFAULT '[]',
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    first_row INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    PRIMARY KEY (job_id, chunk)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    prediction INTEGER NOT NULL,
+    probability REAL NOT NULL,
+    PRIMARY KEY (job_id, row)
+) WITHOUT ROWID;
+"""
+
+# Job fields returned to clients
+JOB_FIELDS = (
+    "id", "status", "model_name", "source", "total_rows", "processed_rows",
+    "error", "created_at", "started_at", "finished_at",
+)
+
+
+class JobStore:
+    """
+    Job queue, inputs and results in one SQLite database in WAL mode
+
+    Inputs are stored in chunks when a job is created, each chunk committed on
+    its own so that a large upload never holds the write lock for long; the
+    job only becomes claimable once all of them are in. A chunk's results are
+    written, and its input deleted, in the same transaction that advances the
+    job, so a job interrupted by a crash or restart resumes at its first
+    unscored chunk. Running jobs renew a lease with every chunk; a job whose
+    lease has expired is claimed again, also by another worker process
+    sharing the database.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the store
+
+        Args:
+            path: SQLite database file, created if missing
+        """
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection of the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """Connection with an immediate (write-locked) transaction open"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def init(self):
+        """Create the database and tables"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def create(self, model_name: str, source: str, chunks: Iterable[Tuple[int, Dict[str, List]]]) -> Dict:
+        """
+        Store a new job and its input chunks
+
+        Chunks are committed one by one (see the class docstring). The job
+        stays "uploading", and is never claimed, until the last one is in; if
+        `chunks` raises, the job and the chunks stored so far are deleted
+        before the error propagates. An upload cut short by a crash is removed
+        by `purge`.
+
+        Args:
+            model_name: Registry model that scores the job
+            source: Input kind, e.g. "json" or "csv"
+            chunks: (first row, columns) per chunk, in row order
+
+        Returns:
+            The queued job
+        """
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO jobs (id, status, model_name, source, total_rows, total_chunks, created_at) "
+            "VALUES (?, 'uploading', ?, ?, 0, 0, ?)",
+            (job_id, model_name, source, time.time()),
+        )
+        total_rows = total_chunks = 0
+        try:
+            for first_row, columns in chunks:
+                conn.execute(
+                    "INSERT INTO job_chunks (job_id, chunk, first_row, columns) VALUES (?, ?, ?, ?)",
+                    (job_id, total_chunks, first_row, json.dumps(columns)),
+                )
+                total_rows += len(next(iter(columns.values()), []))
+                total_chunks += 1
+        except BaseException:
+            self.delete(job_id)
+            raise
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', total_rows = ?, total_chunks = ? WHERE id = ?",
+            (total_rows, total_chunks, job_id),
+        )
+        return self.get(job_id)
+
+    def claim(self, lease_seconds: float) -> Optional[Dict]:
+        """Take the oldest queued job, or a running job whose lease expired"""
+        conn = self._transaction()
+        try:
+            now = time.time()
+            row = conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?), heartbeat_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND heartbeat_at < ?) ORDER BY created_at LIMIT 1) "
+                "RETURNING *",
+                (now, now, now - lease_seconds),
+            ).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return dict(row) if row is not None else None
+
+    def load_chunk(self, job_id: str, chunk: int) -> Optional[Tuple[int, Dict[str, List]]]:
+        """Input of one chunk, or None once the job was cancelled or deleted"""
+        row = self._connect().execute(
+            "SELECT first_row, columns FROM job_chunks WHERE job_id = ? AND chunk = ?", (job_id, chunk)
+        ).fetchone()
+        return (row["first_row"], json.loads(row["columns"])) if row is not None else None
+
+    def save_chunk(
+        self,
+        job_id: str,
+        chunk: int,
+        first_row: int,
+        predictions: np.ndarray,
+        probabilities: np.ndarray,
+        model_version: Optional[str],
+    ) -> Optional[str]:
+        """
+        Store the results of one chunk and advance the job
+
+        Returns:
+            Job status afterwards; results are discarded unless it is still running
+        """
+        conn = self._transaction()
+        try:
+            job = conn.execute(
+                "SELECT status, chunks_done, model_versions FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None or job["status"] != "running" or job["chunks_done"] != chunk:
+                # Cancelled, deleted, or reclaimed by another worker after a lost lease
+                conn.execute("ROLLBACK")
+                if job is None:
+                    return None
+                return job["status"] if job["status"] != "running" else "superseded"
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_results (job_id, row, prediction, probability) VALUES (?, ?, ?, ?)",
+                zip(
+                    [job_id] * len(predictions),
+                    range(first_row, first_row + len(predictions)),
+                    predictions.tolist(),
+                    probabilities.tolist(),
+                ),
+            )
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ? AND chunk = ?", (job_id, chunk))
+            versions = json.loads(job["model_versions"])
+            if model_version is not None and model_version not in versions:
+                versions.append(model_version)
+            conn.execute(
+                "UPDATE jobs SET chunks_done = chunks_done + 1, processed_rows = processed_rows + ?, "
+                "model_versions = ?, heartbeat_at = ? WHERE id = ?",
+                (len(predictions), json.dumps(versions), time.time(), job_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return "running"
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        """Mark a running job as succeeded or failed"""
+        conn = self._transaction()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                (status, error, time.time(), job_id),
+            )
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued or running job, keeping the results scored so far"""
+        conn = self._transaction()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            )
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(job_id)
+
+    def delete(self, job_id: str) -> bool:
+        """Delete a job with its inputs and results; a running job stops at its next chunk"""
+        conn = self._transaction()
+        try:
+            deleted = conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted > 0
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Public fields of a job, or None if it does not exist"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {field: row[field] for field in JOB_FIELDS}
+        job["model_versions"] = json.loads(row["model_versions"])
+        return job
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[Tuple[int, int, float]]:
+        """(row, prediction, probability) of up to `limit` results from row `offset` on"""
+        return [
+            tuple(row) for row in self._connect().execute(
+                "SELECT row, prediction, probability FROM job_results "
+                "WHERE job_id = ? AND row >= ? ORDER BY row LIMIT ?",
+                (job_id, offset, limit),
+            )
+        ]
+
+    def purge(self, retention_seconds: float, max_finished: int) -> int:
+        """
+        Delete finished jobs past their retention, and uploads abandoned for as long
+
+        Args:
+            retention_seconds: Age after finishing at which a job is deleted
+            max_finished: Finished jobs kept at most, newest first
+
+        Returns:
+            Number of deleted jobs
+        """
+        finished = ", ".join("?" * len(FINISHED_STATUSES))
+        conn = self._transaction()
+        try:
+            cutoff = time.time() - retention_seconds
+            expired = [
+                row["id"] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE (status = 'uploading' AND created_at < ?) "
+                    f"OR (status IN ({finished}) AND (finished_at < ? OR id NOT IN (SELECT id FROM jobs "
+                    f"WHERE status IN ({finished}) ORDER BY finished_at DESC LIMIT ?)))",
+                    (cutoff, *FINISHED_STATUSES, cutoff, *FINISHED_STATUSES, max_finished),
+                )
+            ]
+            for job_id in expired:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(expired)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for row in self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
+
+
+class JobRunner:
+    """
+    Background workers scoring stored jobs chunk by chunk
+
+    Each worker claims one job at a time and scores its chunks with one
+    vectorized call each. Cancellation and deletion take effect at the next
+    chunk. Finished jobs are purged per the retention limits.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        score: Callable[[Dict[str, List], str], Awaitable[Tuple[np.ndarray, np.ndarray, str]]],
+        is_ready: Callable[[], bool] = lambda: True,
+        workers: int = 1,
+        lease_seconds: float = 30.0,
+        retention_seconds: float = 86400.0,
+        max_finished: int = 1000,
+        poll_seconds: float = 1.0,
+    ):
+        """
+        Initialize the runner
+
+        Args:
+            store: Job store
+            score: Coroutine function scoring (columns, model name) into
+                (predictions, probabilities, model version)
+            is_ready: Jobs are only claimed while this returns True
+            workers: Jobs scored concurrently
+            lease_seconds: Time without progress after which a running job is
+                considered abandoned and claimed again
+            retention_seconds: Age after finishing at which a job is deleted
+            max_finished: Finished jobs kept at most
+            poll_seconds: Idle time between checks for new jobs
+        """
+        self.store = store
+        self.score = score
+        self.is_ready = is_ready
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.max_finished = max_finished
+        self.poll_seconds = poll_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the workers on the running loop"""
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_periodically()))
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs resume after the next start"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def wake(self):
+        """Check for new jobs right away instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _idle(self):
+        """Wait for a wakeup or the poll interval"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _work(self):
+        """Claim and process jobs until cancelled"""
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, self.lease_seconds) if self.is_ready() else None
+            except sqlite3.Error:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is None:
+                await self._idle()
+                continue
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Job {job['id']} stopped unexpectedly; it is retried after its lease expires")
+
+    async def _process(self, job: Dict):
+        """Score the remaining chunks of a claimed job"""
+        job_id = job["id"]
+        logger.info(f"Job {job_id}: scoring {job['total_rows']} rows from chunk {job['chunks_done']}")
+        for chunk in range(job["chunks_done"], job["total_chunks"]):
+            loaded = await asyncio.to_thread(self.store.load_chunk, job_id, chunk)
+            if loaded is None:
+                return
+            first_row, columns = loaded
+            try:
+                predictions, probabilities, model_version = await self.score(columns, job["model_name"])
+            except Exception as e:
+                logger.warning(f"Job {job_id} failed: {str(e)}")
+                await asyncio.to_thread(self.store.finish, job_id, "failed", str(e))
+                return
+            status = await asyncio.to_thread(
+                self.store.save_chunk, job_id, chunk, first_row, predictions, probabilities, model_version
+            )
+            if status != "running":
+                logger.info(f"Job {job_id} stopped: {status or 'deleted'}")
+                return
+        await asyncio.to_thread(self.store.finish, job_id, "succeeded")
+        logger.info(f"Job {job_id} succeeded")
+
+    async def _purge_periodically(self):
+        """Apply the retention limits every minute"""
+        while True:
+            try:
+                purged = await asyncio.to_thread(self.store.purge, self.retention_seconds, self.max_finished)
+                if purged:
+                    logger.info(f"Purged {purged} finished jobs")
+            except Exception:
+                logger.exception("Purging finished jobs failed")
+            await asyncio.sleep(60)
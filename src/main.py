@@ -1,28 +1,99 @@
 """
 FastAPI application for Diabetes Prediction Model
 """
+import asyncio
+import functools
+import hmac
+import logging
 import os
 import sys
+import tempfile
+import time
+import weakref
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Path as PathParam, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 
 # Import model service and config
-from model_service import ModelService
+from model_service import FOREST_MMAP_DIR, ModelRegistry, ModelService, risk_levels
+from batching import MicroBatcher
+from executor import InferenceExecutor, StaleModelError
+from prediction_cache import PredictionCache, canonical_key
+from diagnostics import GROUP_BY, AllocationTracker, memory_usage, model_footprint
+from readiness import ModelReadiness
+from model_swap import ModelSwapError, ModelWatcher, probe_patients, verify_candidate
+from shadow import ShadowScorer
+from streaming import NDJSON_MEDIA_TYPE, DuplexStreamingResponse, score_ndjson
+from binary_format import BINARY_MEDIA_TYPE, pack_results, parse_matrix
+from preprocessing import FEATURE_ORDER
+from jobs import JobRunner, JobStore
+from metrics import Histograms, note_path, note_scored, record_stage
+from request_timing import StageTimingMiddleware, TimedRoute
+from profiler import ProfilerBusy, SamplingProfiler, collapsed, summarize
+from csv_input import read_chunks
+from input_checks import FIELD_BOUNDS, range_errors
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the model in the background while the server already answers probes"""
+    loader = asyncio.create_task(load_model())
+    watcher = asyncio.create_task(model_watcher.run()) if model_watcher is not None else None
+    if job_runner is not None:
+        # Jobs left unfinished by a previous run resume once their lease expires
+        await asyncio.to_thread(job_store.init)
+        job_runner.start()
+    flusher = None
+    if stage_histograms is not None and stage_histograms.directory is not None:
+        await asyncio.to_thread(stage_histograms.remove_stale)
+        flusher = asyncio.create_task(stage_histograms.flush_periodically(settings.METRICS_FLUSH_SECONDS))
+    yield
+    
+    # Stop background work
+    loader.cancel()
+    if watcher is not None:
+        watcher.cancel()
+    for micro_batcher in micro_batchers.values():
+        await micro_batcher.stop()
+    if shadow_scorer is not None:
+        await shadow_scorer.stop()
+    if job_runner is not None:
+        await job_runner.stop()
+    if flusher is not None:
+        flusher.cancel()
+    inference_executor.shutdown()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
-    version=settings.API_VERSION
+    version=settings.API_VERSION,
+    lifespan=lifespan
 )
 
+# Per-stage latency histograms and Server-Timing headers; routes split parse and
+# serialization time off the endpoint. Neither costs anything when disabled
+stage_histograms = Histograms(settings.METRICS_DIR or None) if settings.METRICS_ENABLED else None
+if stage_histograms is not None or settings.SERVER_TIMING_ENABLED:
+    app.router.route_class = TimedRoute
+    app.add_middleware(
+        StageTimingMiddleware,
+        histograms=stage_histograms,
+        server_timing=settings.SERVER_TIMING_ENABLED
+    )
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -32,24 +103,102 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize model service with base directory from settings
-model_service = ModelService(base_dir=settings.BASE_DIR)
+
+def resolve_models_dir(path: str) -> Path:
+    """Model directory path, relative paths taken from the project directory"""
+    models_dir = Path(path)
+    return models_dir if models_dir.is_absolute() else Path(settings.BASE_DIR) / models_dir
+
+
+# Models served by the API; loaded by the lifespan handler. Identical
+# preprocessing artifacts are shared between models.
+model_registry = ModelRegistry(
+    base_dir=settings.BASE_DIR,
+    inference_engine=settings.INFERENCE_ENGINE,
+    model_storage=settings.MODEL_STORAGE,
+    default_name=settings.MODEL_DEFAULT_NAME
+)
+model_registry.register(settings.MODEL_DEFAULT_NAME, model_registry.build(load=False))
+for name, models_dir in settings.registry_models.items():
+    model_registry.register(name, model_registry.build(str(resolve_models_dir(models_dir)), load=False))
+if settings.routing_weights:
+    model_registry.set_weights(settings.routing_weights)
+
+# Background load and warm-up progress
+readiness = ModelReadiness(retry_after_seconds=settings.MODEL_READY_RETRY_AFTER)
+
+# Run CPU-bound inference in a bounded pool instead of on the event loop
+inference_executor = InferenceExecutor(
+    model_registry,
+    mode=settings.INFERENCE_EXECUTOR,
+    max_workers=settings.INFERENCE_WORKERS or None,
+    max_pending=settings.INFERENCE_MAX_PENDING or None
+)
+
+
+def shadow_score_batch(patients: List[Dict]) -> Tuple[List[Tuple[int, float]], Optional[str]]:
+    """Score patients with the shadow model (runs on the shadow worker thread)"""
+    service = model_registry.get(settings.SHADOW_MODEL)
+    return service.predict_batch(patients), service.model_version
+
+
+# Score served requests with a candidate model off the request path when enabled
+if settings.SHADOW_MODEL and settings.SHADOW_MODEL not in model_registry.models:
+    raise ValueError(
+        f"SHADOW_MODEL '{settings.SHADOW_MODEL}' is not in the model registry: {model_registry.names()}"
+    )
+shadow_scorer = ShadowScorer(
+    shadow_score_batch,
+    max_queue=settings.SHADOW_QUEUE_SIZE,
+    max_batch_rows=settings.SHADOW_MAX_BATCH_ROWS,
+    sample_rate=settings.SHADOW_SAMPLE_RATE,
+    is_busy=lambda: inference_executor.in_flight() > 0
+) if settings.SHADOW_MODEL else None
+
+# CSV job uploads are spooled to a temporary file off the event loop, in writes of this size
+UPLOAD_SPOOL_BYTES = 1 << 20
+
+# Asynchronous batch jobs, stored in SQLite and scored in the background when enabled
+job_store = JobStore(Path(settings.JOB_DB_PATH)) if settings.JOBS_ENABLED else None
+job_runner = JobRunner(
+    job_store,
+    inference_executor.predict_columns,
+    is_ready=readiness.is_ready,
+    workers=settings.JOB_WORKERS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    retention_seconds=settings.JOB_RETENTION_SECONDS,
+    max_finished=settings.JOB_MAX_FINISHED
+) if job_store is not None else None
+
+# On-demand stack sampling of this worker for /debug/profile
+profiler = SamplingProfiler(max_seconds=settings.PROFILE_MAX_SECONDS)
+
+# tracemalloc snapshots of this worker for /admin/memory
+allocation_tracker = AllocationTracker(max_snapshots=settings.MEMORY_MAX_SNAPSHOTS)
+
+# Per-model micro-batchers and prediction caches, created on first use
+micro_batchers: Dict[str, MicroBatcher] = {}
+prediction_caches: Dict[str, PredictionCache] = {}
+
+# Serialize model swaps; counters are reported on /stats
+swap_lock = asyncio.Lock()
+swap_stats = {"swaps": 0, "failures": 0, "last": None}
 
 
 # Request/Response Schemas
 class DiabetesPredictionRequest(BaseModel):
     """Request schema for diabetes prediction"""
     gender: str = Field(..., description="Gender: 'Female', 'Male', or 'Other'")
-    age: float = Field(..., ge=0, le=120, description="Age in years")
-    hypertension: int = Field(..., ge=0, le=1, description="Hypertension: 0 (No) or 1 (Yes)")
-    heart_disease: int = Field(..., ge=0, le=1, description="Heart disease: 0 (No) or 1 (Yes)")
+    age: float = Field(..., **FIELD_BOUNDS["age"], description="Age in years")
+    hypertension: int = Field(..., **FIELD_BOUNDS["hypertension"], description="Hypertension: 0 (No) or 1 (Yes)")
+    heart_disease: int = Field(..., **FIELD_BOUNDS["heart_disease"], description="Heart disease: 0 (No) or 1 (Yes)")
     smoking_history: str = Field(
         ..., 
         description="Smoking history: 'No Info', 'current', 'ever', 'former', 'never', or 'not current'"
     )
-    bmi: float = Field(..., ge=10, le=100, description="Body Mass Index")
-    HbA1c_level: float = Field(..., ge=3.5, le=10, description="HbA1c level (glycated hemoglobin)")
-    blood_glucose_level: float = Field(..., ge=80, le=300, description="Blood glucose level")
+    bmi: float = Field(..., **FIELD_BOUNDS["bmi"], description="Body Mass Index")
+    HbA1c_level: float = Field(..., **FIELD_BOUNDS["HbA1c_level"], description="HbA1c level (glycated hemoglobin)")
+    blood_glucose_level: float = Field(..., **FIELD_BOUNDS["blood_glucose_level"], description="Blood glucose level")
 
     class Config:
         json_schema_extra = {
@@ -71,13 +220,17 @@ class DiabetesPredictionResponse(BaseModel):
     prediction: int = Field(..., description="Predicted class: 0 (No Diabetes) or 1 (Diabetes)")
     probability: float = Field(..., ge=0, le=1, description="Probability of diabetes")
     risk_level: str = Field(..., description="Risk level: 'Low', 'Medium', or 'High'")
+    model_name: Optional[str] = Field(None, description="Registry name of the model that served the prediction")
+    model_version: Optional[str] = Field(None, description="Version of the model that served the prediction")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "prediction": 0,
                 "probability": 0.15,
-                "risk_level": "Low"
+                "risk_level": "Low",
+                "model_name": "default",
+                "model_version": "a73711353b40"
             }
         }
 
@@ -92,6 +245,50 @@ class BatchPredictionResponse(BaseModel):
     predictions: List[DiabetesPredictionResponse] = Field(..., description="List of predictions")
 
 
+class ColumnarBatchRequest(BaseModel):
+    """Request schema for columnar batch predictions: one array per feature"""
+    gender: List[str] = Field(..., description="Gender of each patient")
+    age: List[float] = Field(..., description="Age in years")
+    hypertension: List[int] = Field(..., description="Hypertension: 0 (No) or 1 (Yes)")
+    heart_disease: List[int] = Field(..., description="Heart disease: 0 (No) or 1 (Yes)")
+    smoking_history: List[str] = Field(..., description="Smoking history")
+    bmi: List[float] = Field(..., description="Body Mass Index")
+    HbA1c_level: List[float] = Field(..., description="HbA1c level (glycated hemoglobin)")
+    blood_glucose_level: List[float] = Field(..., description="Blood glucose level")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "gender": ["Male", "Female"],
+                "age": [55.0, 35.0],
+                "hypertension": [1, 0],
+                "heart_disease": [0, 0],
+                "smoking_history": ["former", "never"],
+                "bmi": [28.0, 22.0],
+                "HbA1c_level": [6.5, 5.0],
+                "blood_glucose_level": [160, 100]
+            }
+        }
+
+
+class ColumnarBatchResponse(BaseModel):
+    """Response schema for columnar batch predictions: one array per output"""
+    predictions: List[int] = Field(..., description="Predicted class of each patient")
+    probabilities: List[float] = Field(..., description="Probability of diabetes of each patient")
+    risk_levels: List[str] = Field(..., description="Risk level of each patient")
+    model_name: Optional[str] = Field(None, description="Registry name of the model that served the predictions")
+    model_version: Optional[str] = Field(None, description="Version of the model that served the predictions")
+
+
+class ModelReloadRequest(BaseModel):
+    """Request schema for a model hot-swap"""
+    model_name: Optional[str] = Field(None, description="Registry entry to replace (defaults to the default model)")
+    models_dir: Optional[str] = Field(
+        None, description="Directory with the new model artifacts (defaults to the live model's directory)"
+    )
+    force: bool = Field(False, description="Swap even if the candidate has the live model's version")
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -99,6 +296,400 @@ class HealthResponse(BaseModel):
     model_type: Optional[str] = None
 
 
+# Patient scored once after loading, before the worker reports ready
+WARMUP_PATIENT = DiabetesPredictionRequest.model_config["json_schema_extra"]["example"]
+
+async def load_model():
+    """Load the models in a background thread, then warm up the inference path"""
+    try:
+        start = time.perf_counter()
+        await asyncio.to_thread(model_registry.load_all)
+        readiness.mark_loaded(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for name in model_registry.names():
+            await inference_executor.predict(dict(WARMUP_PATIENT), name)
+        readiness.mark_ready(time.perf_counter() - start)
+        logger.info("Model ready to serve predictions")
+    except Exception as e:
+        logger.exception("Model failed to load")
+        readiness.mark_failed(str(e))
+
+
+def require_ready():
+    """Reject requests with 503 until the model is loaded and warmed up"""
+    if not readiness.is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model not ready ({readiness.status})",
+            headers={"Retry-After": str(readiness.retry_after_seconds)}
+        )
+
+
+def require_jobs():
+    """Reject job requests with 404 when batch jobs are disabled"""
+    if job_store is None:
+        raise HTTPException(status_code=404, detail="Batch jobs are disabled; set JOBS_ENABLED=true")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow admin requests only with the configured token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+async def swap_model(models_dir: Path, force: bool = False, model_name: Optional[str] = None) -> Dict:
+    """
+    Load a model directory next to the live model and swap it in
+    
+    The candidate is loaded in a background thread and must pass the parity and
+    warm-up check before its registry entry is pointed at it. Requests already
+    running keep their reference to the previous model, which is freed once the
+    last of them finishes.
+    
+    Args:
+        models_dir: Directory with the candidate's model artifacts
+        force: Swap even if the candidate has the live model's version
+        model_name: Registry entry to replace; the default model when None
+    
+    Returns:
+        Swap report
+    """
+    name = model_name or model_registry.default_name
+    
+    async with swap_lock:
+        if not readiness.is_ready():
+            raise ModelSwapError(f"Live model is not ready ({readiness.status})")
+        
+        try:
+            previous = model_registry.get(name)
+            candidate = model_registry.build(str(models_dir), load=False)
+            await asyncio.to_thread(candidate.load)
+            
+            if candidate.model_version == previous.model_version and not force:
+                return {"status": "unchanged", "model_version": previous.model_version}
+            
+            report = await asyncio.to_thread(
+                verify_candidate,
+                candidate,
+                probe_patients(candidate),
+                previous,
+                settings.MODEL_SWAP_MIN_AGREEMENT
+            )
+            if not report["passed"]:
+                raise ModelSwapError("Candidate model failed the parity check", report)
+            
+            await inference_executor.swap(name, candidate, dict(WARMUP_PATIENT))
+        except Exception:
+            swap_stats["failures"] += 1
+            raise
+        
+        weakref.finalize(previous, logger.info, f"Model {previous.model_version} released")
+        report = {"status": "swapped", "model_name": name, "previous_version": previous.model_version, **report}
+        swap_stats["swaps"] += 1
+        swap_stats["last"] = report
+        logger.info(f"Model {name} swapped: {previous.model_version} -> {candidate.model_version}")
+        return report
+
+
+# Swap in MODEL_WATCH_DIR whenever its files change, when enabled
+model_watcher = ModelWatcher(
+    Path(settings.MODEL_WATCH_DIR),
+    swap_model,
+    interval_seconds=settings.MODEL_WATCH_INTERVAL_SECONDS
+) if settings.MODEL_WATCH_ENABLED else None
+
+
+def get_risk_level(probability: float) -> str:
+    """Map a diabetes probability to its risk band"""
+    if probability < 0.3:
+        return "Low"
+    elif probability < 0.7:
+        return "Medium"
+    else:
+        return "High"
+
+
+def get_micro_batcher(model_name: str) -> Optional[MicroBatcher]:
+    """Micro-batcher for one model, or None when micro-batching is disabled"""
+    if not settings.MICRO_BATCH_ENABLED:
+        return None
+    micro_batcher = micro_batchers.get(model_name)
+    if micro_batcher is None:
+        micro_batcher = micro_batchers[model_name] = MicroBatcher(
+            functools.partial(inference_executor.predict_batch, model_name=model_name),
+            max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS
+        )
+    return micro_batcher
+
+
+def get_prediction_cache(model_name: str) -> Optional[PredictionCache]:
+    """Prediction cache for one model, or None when caching is disabled"""
+    if not settings.PREDICTION_CACHE_ENABLED:
+        return None
+    prediction_cache = prediction_caches.get(model_name)
+    if prediction_cache is None:
+        prediction_cache = prediction_caches[model_name] = PredictionCache(
+            max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+            max_bytes=settings.PREDICTION_CACHE_MAX_BYTES,
+            ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS
+        )
+    return prediction_cache
+
+
+def uses_cell_keys(service: ModelService) -> bool:
+    """Whether the prediction cache is keyed on decision cells for this model"""
+    return settings.PREDICTION_CACHE_KEY == "decision_cell" and service.decision_cells is not None
+
+
+async def score_patient(patient_data: Dict, model_name: str) -> Tuple[int, float, str]:
+    """Score one patient through the cache, micro-batcher and executor"""
+    service = model_registry.get(model_name)
+    prediction_cache = get_prediction_cache(model_name)
+    micro_batcher = get_micro_batcher(model_name)
+    key = None
+    if prediction_cache is not None:
+        # A single row keys faster inline than through a pool round trip
+        key = service.decision_cell_keys([patient_data])[0] if uses_cell_keys(service) else canonical_key(patient_data)
+        cached = prediction_cache.get(key, service.model_version)
+        if cached is not None:
+            note_path("cache", "hit")
+            note_scored(1, cached[2])
+            return cached
+        note_path("cache", "miss")
+    
+    if micro_batcher is not None:
+        result = await micro_batcher.predict(patient_data)
+    else:
+        result = await inference_executor.predict(patient_data, model_name)
+    note_scored(1, result[2])
+    
+    # Keys are model specific; skip results served by a model swapped in meanwhile
+    if key is not None and result[2] == service.model_version:
+        prediction_cache.put(key, result, service.model_version)
+    return result
+
+
+async def score_patients(patients: List[Dict], model_name: str) -> List[Tuple[int, float, str]]:
+    """Score a batch of patients, only sending cache misses to the model"""
+    prediction_cache = get_prediction_cache(model_name)
+    if prediction_cache is None:
+        results = await inference_executor.predict_batch(patients, model_name)
+        note_scored(len(patients), results[-1][2] if results else None)
+        return results
+    
+    service = model_registry.get(model_name)
+    features = None
+    if uses_cell_keys(service):
+        # Preprocessed in the pool; misses are scored from the same matrix
+        features, keys, model_version = await inference_executor.preprocess_cells(patients, model_name)
+    else:
+        keys, model_version = [canonical_key(patient) for patient in patients], service.model_version
+    results = [prediction_cache.get(key, model_version) for key in keys]
+    misses = [i for i, result in enumerate(results) if result is None]
+    note_path("cache", f"{len(patients) - len(misses)}/{len(patients)} hits")
+    
+    if misses:
+        scored = None
+        if features is not None:
+            try:
+                predictions, probabilities = await inference_executor.predict_features(
+                    features[misses], model_version, model_name
+                )
+                scored = [
+                    (int(prediction), float(probability), model_version)
+                    for prediction, probability in zip(predictions, probabilities)
+                ]
+            except StaleModelError:
+                # The model was swapped after preprocessing; score the raw rows
+                pass
+        if scored is None:
+            scored = await inference_executor.predict_batch([patients[i] for i in misses], model_name)
+        for i, result in zip(misses, scored):
+            results[i] = result
+            if result[2] == model_version:
+                prediction_cache.put(keys[i], result, model_version)
+    
+    note_scored(len(patients), results[-1][2] if results else None)
+    return results
+
+
+def require_model(model_name: str) -> str:
+    """Reject requests for models that are not in the registry with 404"""
+    if model_name not in model_registry.models:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown model '{model_name}'. Available models: {model_registry.names()}"
+        )
+    return model_name
+
+
+def route_model(
+    x_model: Optional[str] = Header(None),
+    x_routing_key: Optional[str] = Header(None)
+) -> str:
+    """Model for a /v2 request: the X-Model header, else the weighted A/B split"""
+    if x_model is not None:
+        return require_model(x_model)
+    return model_registry.choose(x_routing_key)
+
+
+async def submit_shadow(patients: List[Dict], results: List[Tuple], model_name: str):
+    """Queue a served request for shadow scoring (runs after the response is sent)"""
+    shadow_scorer.submit(patients, results, model_name)
+
+
+def schedule_shadow(
+    background_tasks: BackgroundTasks, patients: List[Dict], results: List[Tuple], model_name: str
+):
+    """Send a request to the shadow model once its response has gone out"""
+    if shadow_scorer is not None and model_name != settings.SHADOW_MODEL:
+        background_tasks.add_task(submit_shadow, patients, results, model_name)
+
+
+async def predict_one(
+    request: DiabetesPredictionRequest, model_name: str, background_tasks: BackgroundTasks
+) -> DiabetesPredictionResponse:
+    """Score a single-patient request with one model of the registry"""
+    try:
+        # Convert request to dictionary
+        patient_data = request.model_dump()
+        
+        # Make prediction
+        result = await score_patient(patient_data, model_name)
+        prediction, probability, model_version = result
+        schedule_shadow(background_tasks, [patient_data], [result], model_name)
+        
+        start = time.perf_counter()
+        response = DiabetesPredictionResponse(
+            prediction=prediction,
+            probability=round(probability, 4),
+            risk_level=get_risk_level(probability),
+            model_name=model_name,
+            model_version=model_version
+        )
+        record_stage("risk_banding", time.perf_counter() - start)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def parse_stream_line(line: bytes, model_name: str) -> Dict:
+    """Validate one NDJSON line against the single-prediction request schema and the model's categories"""
+    patient = DiabetesPredictionRequest.model_validate_json(line).model_dump()
+    model_registry.get(model_name).preprocessing_plan.check_categories(patient)
+    return patient
+
+
+def render_stream_result(result: Tuple, model_name: str) -> Dict:
+    """Output fields of one streamed prediction"""
+    prediction, probability, model_version = result
+    return {
+        "prediction": prediction,
+        "probability": round(probability, 4),
+        "risk_level": get_risk_level(probability),
+        "model_name": model_name,
+        "model_version": model_version
+    }
+
+
+def validate_columns(request: ColumnarBatchRequest) -> Dict[str, object]:
+    """
+    Check a columnar batch against the single-patient bounds with NumPy
+    
+    Args:
+        request: Parsed columnar batch
+    
+    Returns:
+        Mapping of feature name to its values, numeric columns as float64 arrays
+    
+    Raises:
+        HTTPException: 422 listing the offending rows of each field, or unequal
+            column lengths
+    """
+    columns = {name: getattr(request, name) for name in ColumnarBatchRequest.model_fields}
+    lengths = {name: len(values) for name, values in columns.items()}
+    if len(set(lengths.values())) > 1:
+        raise HTTPException(
+            status_code=422,
+            detail=[{
+                "loc": ["body"],
+                "msg": f"All feature arrays must have the same length, got {lengths}",
+                "type": "value_error"
+            }]
+        )
+    
+    for name in FIELD_BOUNDS:
+        columns[name] = np.asarray(columns[name], dtype=np.float64)
+    check_ranges(columns)
+    return columns
+
+
+def check_ranges(columns: Dict[str, np.ndarray], first_row: int = 0):
+    """Raise 422 listing, per field, the rows outside the single-patient bounds or not whole numbers"""
+    errors = range_errors(columns, first_row)
+    if errors:
+        raise HTTPException(
+            status_code=422,
+            detail=[{"loc": ["body", error.pop("field")], **error} for error in errors]
+        )
+
+
+def json_job_chunks(request: BatchPredictionRequest, model_name: str) -> Iterator[Tuple[int, Dict[str, List]]]:
+    """Split a validated JSON batch into job chunks, rejecting unknown categories"""
+    plan = model_registry.get(model_name).preprocessing_plan
+    patients = request.patients
+    for first_row in range(0, len(patients), settings.JOB_CHUNK_SIZE):
+        chunk = patients[first_row:first_row + settings.JOB_CHUNK_SIZE]
+        columns = {name: [getattr(patient, name) for patient in chunk] for name in FEATURE_ORDER}
+        plan.transform_columns(columns)
+        yield first_row, columns
+
+
+def csv_job_chunks(upload: BinaryIO, model_name: str) -> Iterator[Tuple[int, Dict[str, List]]]:
+    """Parse an uploaded CSV into job chunks, applying the same checks as the JSON endpoints"""
+    plan = model_registry.get(model_name).preprocessing_plan
+    for first_row, columns in read_chunks(upload, settings.JOB_CHUNK_SIZE):
+        check_ranges(columns, first_row)
+        plan.transform_columns(columns)
+        yield first_row, {name: values.tolist() for name, values in columns.items()}
+
+
+async def predict_many(
+    request: BatchPredictionRequest, model_name: str, background_tasks: BackgroundTasks
+) -> BatchPredictionResponse:
+    """Score a batch request with one model of the registry"""
+    try:
+        # Convert to dictionaries and score the whole batch at once
+        patients = [patient_data.model_dump() for patient_data in request.patients]
+        results = await score_patients(patients, model_name)
+        schedule_shadow(background_tasks, patients, results, model_name)
+        
+        start = time.perf_counter()
+        predictions = [
+            DiabetesPredictionResponse(
+                prediction=prediction,
+                probability=round(probability, 4),
+                risk_level=get_risk_level(probability),
+                model_name=model_name,
+                model_version=model_version
+            )
+            for prediction, probability, model_version in results
+        ]
+        record_stage("risk_banding", time.perf_counter() - start)
+        
+        return BatchPredictionResponse(predictions=predictions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 # API Endpoints
 @app.get("/", tags=["General"])
 async def root():
@@ -113,6 +704,7 @@ async def root():
 @app.get("/health", response_model=HealthResponse, tags=["General"])
 async def health_check():
     """Health check endpoint"""
+    model_service = model_registry.get()
     return {
         "status": "healthy",
         "model_loaded": model_service.is_model_loaded(),
@@ -120,8 +712,84 @@ async def health_check():
     }
 
 
-@app.post("/predict", response_model=DiabetesPredictionResponse, tags=["Prediction"])
-async def predict_diabetes(request: DiabetesPredictionRequest):
+@app.get("/health/live", tags=["General"])
+async def liveness():
+    """Liveness probe: the worker is up, whether or not the model is loaded"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["General"])
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before"""
+    state = readiness.get_stats()
+    if readiness.is_ready():
+        return state
+    headers = {"Retry-After": str(readiness.retry_after_seconds)} if state["status"] != "failed" else None
+    return JSONResponse(status_code=503, content=state, headers=headers)
+
+
+@app.get("/stats", tags=["General"])
+async def service_stats():
+    """Model load and swaps, per-model latency and throughput, micro-batching and cache counters"""
+    model_service = model_registry.get()
+    return {
+        "model_load": readiness.get_stats(),
+        "model_version": model_service.model_version,
+        "model_swaps": swap_stats,
+        "stages": model_service.get_stage_timings(),
+        "models": model_registry.get_stats(),
+        "shared_preprocessing_artifacts": model_registry.shared_artifact_count(),
+        "micro_batching": {
+            name: micro_batcher.get_stats() for name, micro_batcher in micro_batchers.items()
+        } if settings.MICRO_BATCH_ENABLED else None,
+        "prediction_cache": {
+            name: prediction_cache.get_stats() for name, prediction_cache in prediction_caches.items()
+        } if settings.PREDICTION_CACHE_ENABLED else None,
+        "jobs": await asyncio.to_thread(job_store.counts) if job_store is not None else None
+    }
+
+
+@app.get("/metrics", tags=["General"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-stage latency histograms of all workers in the Prometheus text format"""
+    if stage_histograms is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled; set METRICS_ENABLED=true")
+    return PlainTextResponse(
+        await asyncio.to_thread(stage_histograms.render),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/shadow/stats", tags=["General"])
+async def shadow_stats():
+    """Disagreement rate and probability deltas of the shadow model vs. the served models"""
+    if shadow_scorer is None:
+        return {"enabled": False, "shadow_model": None}
+    return {
+        "enabled": True,
+        "shadow_model": settings.SHADOW_MODEL,
+        **shadow_scorer.get_stats()
+    }
+
+
+@app.get("/diagnostics/memory", tags=["General"])
+async def memory_diagnostics():
+    """Unique vs shared memory of this worker, including the mapped model files"""
+    model_service = model_registry.get()
+    mapped_dir = model_service.models_dir / FOREST_MMAP_DIR if model_service.model_storage == "mmap" else None
+    return {
+        "model_storage": model_service.model_storage,
+        "memory": memory_usage(mapped_dir)
+    }
+
+
+@app.post(
+    "/predict",
+    response_model=DiabetesPredictionResponse,
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)]
+)
+async def predict_diabetes(request: DiabetesPredictionRequest, background_tasks: BackgroundTasks):
     """
     Predict diabetes risk for a single patient
     
@@ -134,70 +802,498 @@ async def predict_diabetes(request: DiabetesPredictionRequest):
     - **HbA1c_level**: Glycated hemoglobin level
     - **blood_glucose_level**: Blood glucose level
     """
+    return await predict_one(request, model_registry.default_name, background_tasks)
+
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)]
+)
+async def predict_diabetes_batch(request: BatchPredictionRequest, background_tasks: BackgroundTasks):
+    """
+    Predict diabetes risk for multiple patients in batch
+    
+    - **patients**: List of patient data dictionaries
+    """
+    return await predict_many(request, model_registry.default_name, background_tasks)
+
+
+@app.post(
+    "/predict/batch/columnar",
+    response_model=ColumnarBatchResponse,
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)]
+)
+async def predict_diabetes_batch_columnar(request: ColumnarBatchRequest):
+    """
+    Predict diabetes risk for a batch given as one array per feature
+    
+    Takes the fields of `/predict` as equal-length arrays and returns
+    `predictions`, `probabilities` and `risk_levels` arrays in the same order.
+    Ranges are checked per column with the bounds of `/predict`; no object is
+    built per patient.
+    """
+    columns = validate_columns(request)
+    model_name = model_registry.default_name
     try:
-        # Convert request to dictionary
-        patient_data = request.model_dump()
-        
-        # Make prediction
-        prediction, probability = model_service.predict(patient_data)
-        
-        # Determine risk level
-        if probability < 0.3:
-            risk_level = "Low"
-        elif probability < 0.7:
-            risk_level = "Medium"
-        else:
-            risk_level = "High"
-        
-        return DiabetesPredictionResponse(
-            prediction=prediction,
-            probability=round(probability, 4),
-            risk_level=risk_level
-        )
+        predictions, probabilities, model_version = await inference_executor.predict_columns(columns, model_name)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    note_scored(len(predictions), model_version)
+    
+    start = time.perf_counter()
+    response = ColumnarBatchResponse(
+        predictions=predictions.tolist(),
+        probabilities=[round(probability, 4) for probability in probabilities.tolist()],
+        risk_levels=risk_levels(probabilities).tolist(),
+        model_name=model_name,
+        model_version=model_version
+    )
+    record_stage("risk_banding", time.perf_counter() - start)
+    return response
 
 
-@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
-async def predict_diabetes_batch(request: BatchPredictionRequest):
+@app.post(
+    "/predict/binary",
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)],
+    response_class=Response,
+    responses={200: {"content": {BINARY_MEDIA_TYPE: {}}}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {BINARY_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}}
+        }
+    }
+)
+async def predict_diabetes_binary(request: Request):
     """
-    Predict diabetes risk for multiple patients in batch
+    Predict diabetes risk for a pre-encoded float matrix (see `binary_format`)
     
-    - **patients**: List of patient data dictionaries
+    The body is a 16-byte header plus a little-endian float32/float64 matrix of
+    8 columns in the training feature order, with categoricals label-encoded.
+    It is scored in place without decoding; the response packs float64
+    probabilities and uint8 labels, with the model in `X-Model-Name` and
+    `X-Model-Version`.
     """
+    if request.headers.get("content-type", "").split(";")[0].strip() != BINARY_MEDIA_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {BINARY_MEDIA_TYPE}")
+    
     try:
-        predictions = []
-        
-        for patient_data in request.patients:
-            # Convert to dictionary
-            data = patient_data.model_dump()
-            
-            # Make prediction
-            prediction, probability = model_service.predict(data)
-            
-            # Determine risk level
-            if probability < 0.3:
-                risk_level = "Low"
-            elif probability < 0.7:
-                risk_level = "Medium"
-            else:
-                risk_level = "High"
-            
-            predictions.append(
-                DiabetesPredictionResponse(
-                    prediction=prediction,
-                    probability=round(probability, 4),
-                    risk_level=risk_level
+        matrix = parse_matrix(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    check_ranges({name: matrix[:, j] for j, name in enumerate(FEATURE_ORDER)})
+    
+    model_name = model_registry.default_name
+    try:
+        predictions, probabilities, model_version = await inference_executor.predict_encoded(matrix, model_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    note_scored(len(predictions), model_version)
+    
+    return Response(
+        content=pack_results(predictions, probabilities),
+        media_type=BINARY_MEDIA_TYPE,
+        headers={"X-Model-Name": model_name, "X-Model-Version": str(model_version)}
+    )
+
+
+@app.post(
+    "/predict/stream",
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)],
+    response_class=DuplexStreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {NDJSON_MEDIA_TYPE: {"schema": {"$ref": "#/components/schemas/DiabetesPredictionRequest"}}}
+        }
+    }
+)
+async def predict_diabetes_stream(request: Request):
+    """
+    Predict diabetes risk for newline-delimited JSON patients, streaming the results
+    
+    Each request line is one patient object as accepted by `/predict`. Each
+    response line carries the input `line` number and either the prediction
+    fields or the line's validation `errors`. Lines are scored in chunks of
+    `STREAM_CHUNK_SIZE` while the body is still arriving, so memory use does
+    not grow with the input size.
+    """
+    model_name = model_registry.default_name
+    return DuplexStreamingResponse(
+        score_ndjson(
+            request.stream(),
+            functools.partial(parse_stream_line, model_name=model_name),
+            functools.partial(score_patients, model_name=model_name),
+            functools.partial(render_stream_result, model_name=model_name),
+            chunk_size=settings.STREAM_CHUNK_SIZE,
+            max_line_bytes=settings.STREAM_MAX_LINE_BYTES
+        ),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+@app.get("/v2/models", tags=["Prediction"])
+async def list_models():
+    """Models served side by side, with A/B weights, latency and throughput"""
+    return {
+        "default": model_registry.default_name,
+        "models": model_registry.get_stats()
+    }
+
+
+@app.post(
+    "/v2/predict",
+    response_model=DiabetesPredictionResponse,
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)]
+)
+async def predict_diabetes_v2(
+    request: DiabetesPredictionRequest,
+    background_tasks: BackgroundTasks,
+    model_name: str = Depends(route_model)
+):
+    """
+    Predict diabetes risk for a single patient with a routed model
+    
+    The model is taken from the `X-Model` header, or else picked by the weighted
+    A/B split (sticky per `X-Routing-Key` when given).
+    """
+    return await predict_one(request, model_name, background_tasks)
+
+
+@app.post(
+    "/v2/predict/batch",
+    response_model=BatchPredictionResponse,
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)]
+)
+async def predict_diabetes_batch_v2(
+    request: BatchPredictionRequest,
+    background_tasks: BackgroundTasks,
+    model_name: str = Depends(route_model)
+):
+    """Predict diabetes risk for multiple patients with a routed model (see `/v2/predict`)"""
+    return await predict_many(request, model_name, background_tasks)
+
+
+@app.post(
+    "/v2/models/{model_name}/predict",
+    response_model=DiabetesPredictionResponse,
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)]
+)
+async def predict_diabetes_with_model(
+    request: DiabetesPredictionRequest,
+    background_tasks: BackgroundTasks,
+    model_name: str = PathParam(..., description="Registry name of the model")
+):
+    """Predict diabetes risk for a single patient with the named model"""
+    return await predict_one(request, require_model(model_name), background_tasks)
+
+
+@app.post(
+    "/v2/models/{model_name}/predict/batch",
+    response_model=BatchPredictionResponse,
+    tags=["Prediction"],
+    dependencies=[Depends(require_ready)]
+)
+async def predict_diabetes_batch_with_model(
+    request: BatchPredictionRequest,
+    background_tasks: BackgroundTasks,
+    model_name: str = PathParam(..., description="Registry name of the model")
+):
+    """Predict diabetes risk for multiple patients with the named model"""
+    return await predict_many(request, require_model(model_name), background_tasks)
+
+
+@app.post(
+    "/jobs",
+    status_code=202,
+    tags=["Jobs"],
+    dependencies=[Depends(require_jobs), Depends(require_ready)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"$ref": "#/components/schemas/BatchPredictionRequest"}},
+                "text/csv": {"schema": {"type": "string"}}
+            }
+        }
+    }
+)
+async def submit_job(request: Request, model_name: str = Depends(route_model)):
+    """
+    Queue a batch for background scoring and return its job id
+    
+    The body is either a `/predict/batch` JSON document or a CSV file with a
+    header row naming the 8 input features (`Content-Type: text/csv`). The
+    input is validated up front, stored in chunks of `JOB_CHUNK_SIZE` rows and
+    scored while the client polls `GET /jobs/{job_id}`. Jobs survive restarts:
+    an unfinished job is picked up again once its lease expires. The model is
+    chosen like `/v2/predict`, from `X-Model` or the A/B split.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type == "application/json":
+            try:
+                batch = BatchPredictionRequest.model_validate_json(await request.body())
+            except ValidationError as e:
+                raise RequestValidationError(
+                    [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
                 )
+            job = await asyncio.to_thread(
+                job_store.create, model_name, "json", json_job_chunks(batch, model_name)
             )
-        
-        return BatchPredictionResponse(predictions=predictions)
+        elif content_type in ("text/csv", "application/csv"):
+            with tempfile.TemporaryFile() as upload:
+                buffer = bytearray()
+                async for data in request.stream():
+                    buffer += data
+                    if len(buffer) >= UPLOAD_SPOOL_BYTES:
+                        await asyncio.to_thread(upload.write, bytes(buffer))
+                        buffer.clear()
+                await asyncio.to_thread(upload.write, bytes(buffer))
+                upload.seek(0)
+                job = await asyncio.to_thread(
+                    job_store.create, model_name, "csv", csv_job_chunks(upload, model_name)
+                )
+        else:
+            raise HTTPException(status_code=415, detail="Content-Type must be application/json or text/csv")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    
+    job_runner.wake()
+    return JSONResponse(status_code=202, content=job, headers={"Location": f"/jobs/{job['id']}"})
+
+
+@app.get("/jobs/{job_id}", tags=["Jobs"], dependencies=[Depends(require_jobs)])
+async def get_job(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="First result row to return"),
+    limit: int = Query(1000, ge=1, le=settings.JOB_MAX_PAGE_SIZE, description="Results per page")
+):
+    """
+    Job status and progress, with one page of results
+    
+    Results are ordered by input `row` (0-based data row). `next_offset` is
+    set when the page is full; while the job is still running, poll again
+    with the same `offset` to pick up newly scored rows.
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    
+    rows = await asyncio.to_thread(job_store.results, job_id, offset, limit)
+    results = [
+        {
+            "row": row,
+            "prediction": prediction,
+            "probability": round(probability, 4),
+            "risk_level": get_risk_level(probability)
+        }
+        for row, prediction, probability in rows
+    ]
+    return {
+        **job,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": rows[-1][0] + 1 if len(rows) == limit else None,
+        "results": results
+    }
+
+
+@app.post("/jobs/{job_id}/cancel", tags=["Jobs"], dependencies=[Depends(require_jobs)])
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; rows scored so far stay available"""
+    job = await asyncio.to_thread(job_store.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    if job["status"] != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return job
+
+
+@app.delete("/jobs/{job_id}", status_code=204, tags=["Jobs"], dependencies=[Depends(require_jobs)])
+async def delete_job(job_id: str):
+    """Delete a job with its results, stopping it if it is still running"""
+    if not await asyncio.to_thread(job_store.delete, job_id):
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return Response(status_code=204)
+
+
+@app.get("/debug/profile", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def debug_profile(
+    seconds: float = Query(10.0, gt=0, le=settings.PROFILE_MAX_SECONDS, description="Profile duration"),
+    interval_ms: float = Query(settings.PROFILE_INTERVAL_MS, ge=1, le=1000, description="Time between samples"),
+    format: str = Query("collapsed", pattern="^(collapsed|summary)$", description="collapsed or summary"),
+    include_idle: bool = Query(False, description="Keep samples of threads waiting for work")
+):
+    """
+    Sample the stacks of this worker while it serves traffic
+    
+    Returns collapsed stacks (`thread;frame;frame... count`, outermost frame
+    first) ready for flamegraph.pl or speedscope, or with `format=summary` the
+    share of samples spent in routing, validation, preprocessing, sklearn, the
+    native forest engine and JSON encoding plus the hottest frames. Only one
+    profile runs per worker at a time; others get 409.
+    """
+    interval = interval_ms / 1000
+    try:
+        stacks, ticks = await asyncio.to_thread(profiler.run, seconds, interval, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if format == "summary":
+        return summarize(stacks, ticks, interval)
+    return PlainTextResponse(
+        collapsed(stacks),
+        headers={"X-Profile-Ticks": str(ticks), "X-Profile-Samples": str(sum(stacks.values()))}
+    )
+
+
+GROUP_BY_PATTERN = f"^({'|'.join(GROUP_BY)})$"
+
+
+@app.post("/admin/memory/tracing", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def start_memory_tracing(
+    frames: int = Query(settings.TRACEMALLOC_FRAMES, ge=1, le=100, description="Frames kept per allocation traceback")
+):
+    """
+    Start tracemalloc in this worker
+    
+    Every allocation is slower while tracing runs, so stop it when done.
+    Tracing that is already running keeps its frame limit.
+    """
+    return allocation_tracker.start(frames)
+
+
+@app.delete("/admin/memory/tracing", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def stop_memory_tracing():
+    """Stop tracemalloc in this worker and drop its snapshots"""
+    return await asyncio.to_thread(allocation_tracker.stop)
+
+
+@app.get("/admin/memory/snapshots", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def list_memory_snapshots():
+    """Tracing status, traced memory and the snapshots stored in this worker"""
+    return allocation_tracker.status()
+
+
+@app.post("/admin/memory/snapshots/{name}", status_code=201, tags=["Admin"], dependencies=[Depends(require_admin)])
+async def take_memory_snapshot(name: str = PathParam(..., pattern=r"^[\w.-]{1,64}$")):
+    """
+    Take a named tracemalloc snapshot of this worker
+    
+    Returns 409 when tracing is not running, the name is taken or
+    `MEMORY_MAX_SNAPSHOTS` snapshots are already stored.
+    """
+    try:
+        return await asyncio.to_thread(allocation_tracker.take, name)
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/admin/memory/snapshots/{name}", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def memory_snapshot_top(
+    name: str,
+    group_by: str = Query("module", pattern=GROUP_BY_PATTERN, description="module, package or line"),
+    limit: int = Query(20, ge=1, le=1000, description="Number of allocation sites returned")
+):
+    """
+    Largest allocation sites of a snapshot
+    
+    Sites are grouped by the module that allocated (`numpy.core._methods`),
+    its top-level package (`numpy`) or the source line (`module:lineno`).
+    """
+    try:
+        return await asyncio.to_thread(allocation_tracker.top, name, group_by, limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot '{name}'")
+
+
+@app.delete("/admin/memory/snapshots/{name}", status_code=204, tags=["Admin"], dependencies=[Depends(require_admin)])
+async def delete_memory_snapshot(name: str):
+    """Drop a snapshot"""
+    if not allocation_tracker.delete(name):
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot '{name}'")
+    return Response(status_code=204)
+
+
+@app.get("/admin/memory/diff", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def memory_snapshot_diff(
+    base: str = Query(..., description="Earlier snapshot"),
+    target: str = Query(..., description="Later snapshot"),
+    group_by: str = Query("module", pattern=GROUP_BY_PATTERN, description="module, package or line"),
+    limit: int = Query(20, ge=1, le=1000, description="Number of allocation sites returned")
+):
+    """
+    Memory allocated and freed between two snapshots, by allocation site
+    
+    Sites are ranked by the size of their change, growth or shrinkage;
+    `traced_bytes_diff` and `rss_bytes_diff` give the totals.
+    """
+    try:
+        return await asyncio.to_thread(allocation_tracker.diff, base, target, group_by, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot '{e.args[0]}'")
+
+
+@app.get("/admin/memory/footprint", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def model_memory_footprint():
+    """
+    Heap bytes held by each loaded model's estimator, scaler and encoders
+    
+    Sizes follow every object a component references, counting shared
+    objects once per model. Memory-mapped forests are mostly outside the heap;
+    `/diagnostics/memory` reports their mapped pages.
+    """
+    footprints = {}
+    for name in model_registry.names():
+        service = model_registry.get(name)
+        if service.is_model_loaded():
+            footprints[name] = {
+                "model_version": service.model_version,
+                "model_storage": service.model_storage,
+                "bytes": await asyncio.to_thread(model_footprint, service)
+            }
+        else:
+            footprints[name] = None
+    return {"pid": os.getpid(), "models": footprints}
+
+
+@app.post("/admin/model/reload", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def reload_model(request: ModelReloadRequest):
+    """
+    Hot-swap a model without dropping requests
+    
+    - **model_name**: Registry entry to replace; the default model when omitted
+    - **models_dir**: Directory with the new model artifacts; relative paths are
+      resolved against the project directory
+    - **force**: Swap even if the model version is unchanged
+    """
+    model_name = require_model(request.model_name or model_registry.default_name)
+    if request.models_dir:
+        models_dir = resolve_models_dir(request.models_dir)
+    else:
+        models_dir = model_registry.get(model_name).models_dir
+    
+    try:
+        return await swap_model(models_dir, force=request.force, model_name=model_name)
+    except ModelSwapError as e:
+        raise HTTPException(status_code=409, detail={"error": str(e), "report": e.report})
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Model swap failed: {str(e)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+"""
+Per-request stage timings and Prometheus histograms
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds; a final +Inf bucket is implied
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# (largest row count, label) of the batch-size buckets, smallest first
+BATCH_SIZE_BUCKETS = ((0, "0"), (1, "1"), (8, "2-8"), (64, "9-64"), (1000, "65-1000"), (10000, "1001-10000"))
+
+STAGE_METRIC = "diabetes_api_stage_duration_seconds"
+REQUEST_METRIC = "diabetes_api_request_duration_seconds"
+METRIC_HELP = {
+    STAGE_METRIC: "Time spent in each stage of a request",
+    REQUEST_METRIC: "Time from receiving a request to sending the last response byte",
+}
+
+# Labels of both metrics, in exposition order (stage metric adds "stage" first)
+LABELS = ("endpoint", "batch_size", "model_version")
+
+
+class RequestTimings:
+    """Stage durations and scoring details collected while serving one request"""
+
+    __slots__ = (
+        "stages", "markers", "rows", "model_version",
+        "handler_start", "endpoint_start", "endpoint_end", "handler_end",
+    )
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        # Name -> description of paths taken, e.g. cache hits; created on first use
+        self.markers: Optional[Dict[str, str]] = None
+        self.rows = 0
+        self.model_version: Optional[str] = None
+        self.handler_start = self.endpoint_start = self.endpoint_end = self.handler_end = 0.0
+
+    def add(self, stage: str, seconds: float):
+        """Add time to a stage; a stage timed several times is summed"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def mark(self, name: str, description: str):
+        """Note a path the request took, such as a cache hit"""
+        if self.markers is None:
+            self.markers = {}
+        self.markers[name] = description
+
+
+# Timings of the request being served, None outside of a timed request
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    """Attribute time spent in a stage to the current request, if it is timed"""
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def note_path(name: str, description: str):
+    """Note a path taken by the current request, if it is timed"""
+    timings = current_timings.get()
+    if timings is not None:
+        timings.mark(name, description)
+
+
+def note_scored(rows: int, model_version: Optional[str]):
+    """Record the rows scored for the current request and the model version that scored them"""
+    timings = current_timings.get()
+    if timings is not None:
+        timings.rows += rows
+        timings.model_version = model_version
+
+
+def batch_size_bucket(rows: int) -> str:
+    """Label of the batch-size bucket a row count falls into"""
+    for limit, label in BATCH_SIZE_BUCKETS:
+        if rows <= limit:
+            return label
+    return f"{BATCH_SIZE_BUCKETS[-1][0] + 1}+"
+
+
+class Histograms:
+    """
+    Latency histograms keyed by metric name and label values
+
+    Observations only touch this process's counters. With `directory` set,
+    every process also writes its counters to `<directory>/metrics_<pid>.json`
+    on `flush()`, and `render()` sums the files of all processes, so a scrape
+    reaching any uvicorn worker reports the totals of all of them.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        """
+        Initialize the histograms
+
+        Args:
+            directory: Directory shared by the worker processes, or None to
+                report this process only
+        """
+        self.directory = Path(directory) if directory else None
+        # (metric, label values) -> [per-bucket counts (not cumulative), sum of observations]
+        self._series: Dict[Tuple[str, Tuple[str, ...]], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric: str, labels: Tuple[str, ...], seconds: float):
+        """Add one observation to a series"""
+        key = (metric, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+            series[0][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            series[1] += seconds
+
+    def observe_request(self, endpoint: str, timings: RequestTimings, seconds: float):
+        """Record a finished request and each of its stages"""
+        labels = (endpoint, batch_size_bucket(timings.rows), timings.model_version or "")
+        self.observe(REQUEST_METRIC, labels, seconds)
+        for stage, stage_seconds in timings.stages.items():
+            self.observe(STAGE_METRIC, (stage, *labels), stage_seconds)
+
+    def snapshot(self) -> List[List]:
+        """This process's series as [metric, label values, bucket counts, sum]"""
+        with self._lock:
+            return [
+                [metric, list(labels), list(counts), total]
+                for (metric, labels), (counts, total) in self._series.items()
+            ]
+
+    def _path(self, pid: int) -> Path:
+        return self.directory / f"metrics_{pid}.json"
+
+    def remove_stale(self):
+        """Delete files left by worker processes that are no longer running"""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self.directory.glob("metrics_*.json"):
+            try:
+                os.kill(int(path.stem.split("_", 1)[1]), 0)
+            except ValueError:
+                continue
+            except ProcessLookupError:
+                path.unlink(missing_ok=True)
+            except PermissionError:
+                pass
+
+    def flush(self):
+        """Write this process's series to the shared directory"""
+        if self.directory is None:
+            return
+        path = self._path(os.getpid())
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    async def flush_periodically(self, interval: float):
+        """Flush every `interval` seconds until cancelled, and once more on the way out"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except OSError as e:
+                    logger.warning(f"Writing metrics failed: {str(e)}")
+        finally:
+            self.flush()
+
+    def collect(self) -> Dict[Tuple[str, Tuple[str, ...]], List]:
+        """Series of all worker processes, summed"""
+        snapshots = [self.snapshot()]
+        if self.directory is not None:
+            own = self._path(os.getpid())
+            for path in self.directory.glob("metrics_*.json"):
+                if path == own:
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable metrics file {path}: {str(e)}")
+
+        merged: Dict[Tuple[str, Tuple[str, ...]], List] = {}
+        for snapshot in snapshots:
+            for metric, labels, counts, total in snapshot:
+                key = (metric, tuple(labels))
+                series = merged.get(key)
+                if series is None:
+                    merged[key] = [list(counts), total]
+                else:
+                    series[0] = [a + b for a, b in zip(series[0], counts)]
+                    series[1] += total
+        return merged
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format"""
+        return render_histograms(self.collect())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _label_text(names: Iterable[str], values: Iterable[str]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def render_histograms(series: Dict[Tuple[str, Tuple[str, ...]], List]) -> str:
+    """
+    Format histogram series in the Prometheus text exposition format
+
+    Args:
+        series: (metric, label values) -> [per-bucket counts, sum]
+
+    Returns:
+        Exposition text, one HELP/TYPE block per metric
+    """
+    lines = []
+    bounds = [repr(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+    for metric in (STAGE_METRIC, REQUEST_METRIC):
+        names = (("stage",) if metric == STAGE_METRIC else ()) + LABELS
+        lines.append(f"# HELP {metric} {METRIC_HELP[metric]}")
+        lines.append(f"# TYPE {metric} histogram")
+        for (name, labels), (counts, total) in sorted(series.items()):
+            if name != metric:
+                continue
+            label_text = _label_text(names, labels)
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{label_text}}} {total!r}")
+            lines.append(f"{metric}_count{{{label_text}}} {cumulative}")
+    return "\n".join(lines) + "\n"
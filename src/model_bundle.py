@@ -0,0 +1,202 @@
+"""
+Compact, versioned, pickle-free model bundle
+
+A bundle is a single uncompressed `.npz` file holding the flattened forest as
+typed arrays plus a JSON manifest (stored as a uint8 array) with the label
+encoders, scaler, selected features and feature indices. Loading is one
+`np.load` and never unpickles anything.
+
+Layout (format version 1):
+    children     int32   (n_nodes, 2)  right/left child, leaves point at themselves
+    feature      uint8+  (n_nodes,)    split feature, smallest fitting unsigned type
+    threshold    float32 (n_nodes,)    split threshold rounded toward -inf
+    leaf_index   uint8+  (n_nodes,)    row of `leaf_table` for each node
+    leaf_table   float64 (n_unique, n_classes) deduplicated leaf distributions
+    roots        int32   (n_trees,)    root node of each tree
+    manifest     uint8   JSON document, including a SHA-256 over the arrays
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+from forest_engine import FlatForest
+
+BUNDLE_FORMAT = "diabetes-forest-bundle"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_ARRAYS = ("children", "feature", "threshold", "leaf_index", "leaf_table", "roots")
+
+
+def _float32_floor(values: np.ndarray) -> np.ndarray:
+    """
+    Largest float32 not greater than each float64 value
+
+    Trees compare float32 inputs against float64 thresholds. For a float32 `x`,
+    `x <= t` holds exactly when `x <= floor32(t)`, so storing thresholds
+    rounded toward -inf in float32 keeps every decision unchanged.
+    """
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def _checksum(arrays: Dict[str, np.ndarray]) -> str:
+    """SHA-256 over the bundle arrays in a fixed order"""
+    digest = hashlib.sha256()
+    for name in BUNDLE_ARRAYS:
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def save_bundle(
+    path: Union[str, Path],
+    forest: FlatForest,
+    label_encoders: Dict,
+    scaler,
+    selected_features,
+    feature_indices,
+    model_type: str,
+    model_version: str,
+) -> Dict:
+    """
+    Write a model bundle
+
+    Args:
+        path: Output .npz path
+        forest: Flattened forest over scaled inputs (float32 comparisons)
+        label_encoders: Mapping of feature name to fitted LabelEncoder
+        scaler: Fitted StandardScaler, or None
+        selected_features: Selected feature names
+        feature_indices: Indices of the selected features in training order
+        model_type: Name of the original model class
+        model_version: Version of the original model artifact
+
+    Returns:
+        The manifest written into the bundle
+    """
+    if forest.input_dtype != np.float32:
+        raise ValueError("Only forests over float32 inputs can be bundled")
+
+    # Deduplicate leaf distributions; internal nodes point at row 0
+    is_leaf = np.asarray(forest.is_leaf)
+    leaf_table, inverse = np.unique(forest.leaf_values[is_leaf], axis=0, return_inverse=True)
+    leaf_index = np.zeros(forest.n_nodes, dtype=np.min_scalar_type(max(len(leaf_table) - 1, 0)))
+    leaf_index[is_leaf] = inverse.ravel()
+
+    feature = np.where(is_leaf, 0, forest.feature)
+    arrays = {
+        "children": np.ascontiguousarray(forest.children, dtype=np.int32),
+        "feature": feature.astype(np.min_scalar_type(max(forest.n_features_in_ - 1, 0))),
+        "threshold": _float32_floor(np.where(is_leaf, 0.0, forest.threshold)),
+        "leaf_index": leaf_index,
+        "leaf_table": np.ascontiguousarray(leaf_table, dtype=np.float64),
+        "roots": np.asarray(forest.roots, dtype=np.int32),
+    }
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "checksum": _checksum(arrays),
+        "model_type": model_type,
+        "model_version": model_version,
+        "max_depth": forest.max_depth,
+        "n_features": forest.n_features_in_,
+        "classes": forest.classes_.tolist(),
+        "label_encoders": {
+            feature_name: [str(value) for value in encoder.classes_]
+            for feature_name, encoder in (label_encoders or {}).items()
+        },
+        "scaler": None if scaler is None else {
+            "mean": None if scaler.mean_ is None else scaler.mean_.tolist(),
+            "scale": None if scaler.scale_ is None else scaler.scale_.tolist(),
+            "with_mean": bool(scaler.with_mean),
+            "with_std": bool(scaler.with_std),
+        },
+        "selected_features": None if selected_features is None else list(selected_features),
+        "feature_indices": None if feature_indices is None else [int(i) for i in feature_indices],
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_bytes = np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8)
+    with open(path, "wb") as f:
+        np.savez(f, manifest=manifest_bytes, **arrays)
+    return manifest
+
+
+def load_bundle(path: Union[str, Path], verify: bool = True) -> Tuple[FlatForest, Dict]:
+    """
+    Load a model bundle
+
+    Args:
+        path: Bundle .npz path
+        verify: Check the array checksum against the manifest
+
+    Returns:
+        Tuple of (forest, manifest)
+    """
+    with np.load(path, allow_pickle=False) as data:
+        manifest = json.loads(data["manifest"].tobytes().decode("utf-8"))
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"Not a model bundle: {path}")
+        if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported bundle format version {manifest.get('format_version')} "
+                f"(expected {BUNDLE_FORMAT_VERSION})"
+            )
+        arrays = {name: data[name] for name in BUNDLE_ARRAYS}
+
+    if verify and _checksum(arrays) != manifest["checksum"]:
+        raise ValueError(f"Model bundle checksum mismatch: {path}")
+
+    forest = FlatForest(
+        children=arrays["children"],
+        feature=arrays["feature"],
+        threshold=arrays["threshold"],
+        leaf_values=arrays["leaf_table"],
+        roots=arrays["roots"],
+        max_depth=manifest["max_depth"],
+        classes=np.asarray(manifest["classes"]),
+        n_features=manifest["n_features"],
+        leaf_index=arrays["leaf_index"],
+    )
+    return forest, manifest
+
+
+def preprocessing_components(manifest: Dict) -> Dict:
+    """
+    Rebuild fitted preprocessing objects from a bundle manifest
+
+    Returns:
+        Dictionary with `label_encoders`, `scaler`, `selected_features` and
+        `feature_indices`, in the same shapes as the pickled artifacts
+    """
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    label_encoders = {}
+    for feature_name, classes in manifest["label_encoders"].items():
+        encoder = LabelEncoder()
+        encoder.classes_ = np.asarray(classes, dtype=object)
+        label_encoders[feature_name] = encoder
+
+    scaler = None
+    if manifest["scaler"] is not None:
+        params = manifest["scaler"]
+        scaler = StandardScaler(with_mean=params["with_mean"], with_std=params["with_std"])
+        scaler.mean_ = None if params["mean"] is None else np.asarray(params["mean"])
+        scaler.scale_ = None if params["scale"] is None else np.asarray(params["scale"])
+        scaler.var_ = None if scaler.scale_ is None else scaler.scale_ ** 2
+        n_features = len(params["mean"] or params["scale"] or [])
+        scaler.n_features_in_ = n_features
+
+    return {
+        "label_encoders": label_encoders,
+        "scaler": scaler,
+        "selected_features": manifest["selected_features"],
+        "feature_indices": manifest["feature_indices"],
+    }
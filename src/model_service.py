@@ -1,29 +1,92 @@
 """
 Model Service for loading and using the diabetes prediction model
 """
+import hashlib
+import json
 import os
+import random
+import threading
+import time
 import joblib
 import numpy as np
-import pandas as pd
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Sequence, Tuple, Optional
 import logging
 
+from forest_engine import DecisionCells, FlatForest, verify_folded
+from metrics import record_stage
+from model_bundle import load_bundle, preprocessing_components
+from preprocessing import PreprocessingPlan
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+INFERENCE_ENGINES = ("sklearn", "native", "folded")
+MODEL_STORAGES = ("pickle", "mmap", "bundle")
+
+# Directory (under models/) holding the memory-mappable forest export
+FOREST_MMAP_DIR = "forest_mmap"
+
+# File (under models/) holding the compact pickle-free model bundle
+FOREST_BUNDLE_FILE = "forest_bundle.npz"
+
+# Bundle manifest entries rebuilt into preprocessing components
+BUNDLE_COMPONENTS = ("label_encoders", "scaler", "selected_features", "feature_indices")
+
+# Guards get-or-load on shared artifact caches so concurrent loads unpickle an artifact once
+_shared_artifacts_lock = threading.Lock()
+
+
+def risk_levels(probabilities: np.ndarray) -> np.ndarray:
+    """Risk band of each probability: Low below 0.3, Medium below 0.7, else High"""
+    return np.where(probabilities < 0.3, "Low", np.where(probabilities < 0.7, "Medium", "High"))
+
+
 class ModelService:
     """Service class for loading and using the diabetes prediction model"""
     
-    def __init__(self, base_dir: Optional[str] = None):
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        inference_engine: str = "sklearn",
+        model_storage: str = "pickle",
+        load: bool = True,
+        models_dir: Optional[str] = None,
+        shared_artifacts: Optional[Dict] = None,
+    ):
         """
         Initialize the model service
         
         Args:
             base_dir: Base directory of the project. If None, will try to detect automatically.
+            inference_engine: "sklearn" to call the fitted model directly, "native"
+                to evaluate a flattened NumPy copy of the forest, or "folded" to
+                also fold the scaler into its thresholds and skip scaling
+            model_storage: "pickle" to unpickle best_diabetes_model.pkl, "mmap"
+                to memory-map the exported flat forest so worker processes share it,
+                or "bundle" to load the compact pickle-free model bundle
+            load: Load the model right away; when False, call `load()` later
+            models_dir: Directory holding the model artifacts; defaults to
+                `<base_dir>/models`
+            shared_artifacts: Content-addressed cache of preprocessing artifacts;
+                services given the same dictionary share identical components
         """
+        if inference_engine not in INFERENCE_ENGINES:
+            raise ValueError(
+                f"Unknown inference engine '{inference_engine}'. "
+                f"Allowed values: {list(INFERENCE_ENGINES)}"
+            )
+        if model_storage not in MODEL_STORAGES:
+            raise ValueError(
+                f"Unknown model storage '{model_storage}'. "
+                f"Allowed values: {list(MODEL_STORAGES)}"
+            )
+        if model_storage != "pickle" and inference_engine == "sklearn":
+            logger.warning(f"{model_storage} model storage needs a forest engine, using native")
+            inference_engine = "native"
+        
         if base_dir is None:
             # Try to detect base directory
             current_file = Path(__file__).resolve()
@@ -35,7 +98,7 @@ class ModelService:
                 base_dir = str(current_file.parent)
         
         self.base_dir = Path(base_dir)
-        self.models_dir = self.base_dir / "models"
+        self.models_dir = Path(models_dir) if models_dir else self.base_dir / "models"
         
         self.model = None
         self.scaler = None
@@ -43,55 +106,99 @@ class ModelService:
         self.selected_features = None
         self.feature_indices = None
         self.model_type = None
+        self.model_version = None
+        self.preprocessing_plan = None
+        self.inference_engine = inference_engine
+        self.model_storage = model_storage
+        self.estimator = None
+        self.fold_report = None
+        self.decision_cells = None
+        self.load_seconds = None
+        self.shared_artifacts = shared_artifacts
+        
+        # Per-stage timing counters: stage -> [calls, total seconds]
+        self._stage_timings: Dict[str, List[float]] = {}
+        self._timings_lock = threading.Lock()
         
         # Load model and preprocessing components
+        if load:
+            self.load()
+    
+    def load(self):
+        """Load the model and preprocessing components, recording the duration"""
+        start = time.perf_counter()
         self._load_model()
+        self.load_seconds = time.perf_counter() - start
+        logger.info(f"Model loaded in {self.load_seconds:.2f}s")
     
     def _load_model(self):
         """Load the model and all preprocessing components"""
         try:
-            # Load model
-            model_path = self.models_dir / "best_diabetes_model.pkl"
-            if not model_path.exists():
-                raise FileNotFoundError(f"Model file not found: {model_path}")
-            
-            self.model = joblib.load(model_path)
-            logger.info(f"Model loaded from {model_path}")
-            
-            # Get model type
-            self.model_type = type(self.model).__name__
-            
-            # Load scaler
-            scaler_path = self.models_dir / "scaler.pkl"
-            if scaler_path.exists():
-                self.scaler = joblib.load(scaler_path)
-                logger.info(f"Scaler loaded from {scaler_path}")
+            forest = None
+            if self.model_storage == "bundle":
+                # Forest and preprocessing components from one pickle-free file
+                bundle_path = self.models_dir / FOREST_BUNDLE_FILE
+                if not bundle_path.exists():
+                    raise FileNotFoundError(
+                        f"Model bundle not found: {bundle_path}. "
+                        f"Create it with: python src/export_model.py --format bundle"
+                    )
+                
+                forest, manifest = load_bundle(bundle_path)
+                logger.info(f"Model bundle loaded from {bundle_path}")
+                
+                self.model_type = manifest["model_type"]
+                self.model_version = manifest["model_version"]
+                components = self._shared_artifact(
+                    ("bundle", json.dumps({key: manifest[key] for key in BUNDLE_COMPONENTS}, sort_keys=True)),
+                    lambda: preprocessing_components(manifest),
+                )
+                self.label_encoders = components["label_encoders"]
+                self.scaler = components["scaler"]
+                self.selected_features = components["selected_features"]
+                self.feature_indices = components["feature_indices"]
+            elif self.model_storage == "mmap":
+                # Map the exported forest arrays instead of unpickling the model
+                forest_dir = self.models_dir / FOREST_MMAP_DIR
+                if not (forest_dir / "forest.json").exists():
+                    raise FileNotFoundError(
+                        f"Memory-mapped forest not found: {forest_dir}. "
+                        f"Create it with: python src/export_model.py --format mmap"
+                    )
+                
+                forest, metadata = FlatForest.load(forest_dir, mmap_mode="r")
+                logger.info(f"Forest memory-mapped from {forest_dir}")
+                
+                self.model_type = metadata.get("model_type", "RandomForestClassifier")
+                self.model_version = metadata.get("model_version")
+                self._load_preprocessing_components()
             else:
-                logger.warning(f"Scaler file not found: {scaler_path}")
+                # Load model
+                model_path = self.models_dir / "best_diabetes_model.pkl"
+                if not model_path.exists():
+                    raise FileNotFoundError(f"Model file not found: {model_path}")
+                
+                self.model = joblib.load(model_path)
+                logger.info(f"Model loaded from {model_path}")
+                
+                # Get model type
+                self.model_type = type(self.model).__name__
+                
+                # Identify the exact model artifact that serves predictions
+                self.model_version = self._file_digest(model_path)
+                self._load_preprocessing_components()
+            logger.info(f"Model version: {self.model_version}")
             
-            # Load label encoders
-            encoders_path = self.models_dir / "label_encoders.pkl"
-            if encoders_path.exists():
-                self.label_encoders = joblib.load(encoders_path)
-                logger.info(f"Label encoders loaded from {encoders_path}")
-            else:
-                logger.warning(f"Label encoders file not found: {encoders_path}")
-            
-            # Load selected features
-            features_path = self.models_dir / "selected_features.pkl"
-            if features_path.exists():
-                self.selected_features = joblib.load(features_path)
-                logger.info(f"Selected features loaded: {self.selected_features}")
-            else:
-                logger.warning(f"Selected features file not found: {features_path}")
+            # Compile the preprocessing components into a fused plan
+            self.preprocessing_plan = PreprocessingPlan(
+                label_encoders=self.label_encoders,
+                scaler=self.scaler,
+                feature_indices=self.feature_indices,
+                selected_features=self.selected_features,
+            )
             
-            # Load feature indices
-            indices_path = self.models_dir / "feature_indices.pkl"
-            if indices_path.exists():
-                self.feature_indices = joblib.load(indices_path)
-                logger.info(f"Feature indices loaded")
-            else:
-                logger.warning(f"Feature indices file not found: {indices_path}")
+            # Pick the object used for inference
+            self._build_estimator(forest)
             
             logger.info("Model service initialized successfully")
             
@@ -99,9 +206,120 @@ class ModelService:
             logger.error(f"Error loading model: {str(e)}")
             raise
     
+    def _load_preprocessing_components(self):
+        """Load the pickled scaler, label encoders and feature selection"""
+        # Load scaler
+        scaler_path = self.models_dir / "scaler.pkl"
+        if scaler_path.exists():
+            self.scaler = self._load_artifact(scaler_path)
+            logger.info(f"Scaler loaded from {scaler_path}")
+        else:
+            logger.warning(f"Scaler file not found: {scaler_path}")
+        
+        # Load label encoders
+        encoders_path = self.models_dir / "label_encoders.pkl"
+        if encoders_path.exists():
+            self.label_encoders = self._load_artifact(encoders_path)
+            logger.info(f"Label encoders loaded from {encoders_path}")
+        else:
+            logger.warning(f"Label encoders file not found: {encoders_path}")
+        
+        # Load selected features
+        features_path = self.models_dir / "selected_features.pkl"
+        if features_path.exists():
+            self.selected_features = self._load_artifact(features_path)
+            logger.info(f"Selected features loaded: {self.selected_features}")
+        else:
+            logger.warning(f"Selected features file not found: {features_path}")
+        
+        # Load feature indices
+        indices_path = self.models_dir / "feature_indices.pkl"
+        if indices_path.exists():
+            self.feature_indices = self._load_artifact(indices_path)
+            logger.info(f"Feature indices loaded")
+        else:
+            logger.warning(f"Feature indices file not found: {indices_path}")
+    
+    def _shared_artifact(self, key, load):
+        """Return the shared artifact stored under `key`, loading it on first use"""
+        if self.shared_artifacts is None:
+            return load()
+        with _shared_artifacts_lock:
+            artifact = self.shared_artifacts.get(key)
+            if artifact is None:
+                artifact = self.shared_artifacts[key] = load()
+        return artifact
+    
+    def _load_artifact(self, path: Path):
+        """Unpickle a preprocessing artifact, reusing an identical one already loaded"""
+        if self.shared_artifacts is None:
+            return joblib.load(path)
+        key = ("file", hashlib.sha256(path.read_bytes()).hexdigest())
+        return self._shared_artifact(key, lambda: joblib.load(path))
+    
+    @staticmethod
+    def _file_digest(path: Path) -> str:
+        """Short SHA-256 digest of a file, used as the model version"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()[:12]
+    
+    def _build_estimator(self, forest: Optional[FlatForest] = None):
+        """
+        Set up the inference engine selected for this service
+        
+        Args:
+            forest: Already loaded flat forest (mmap or bundle storage);
+                flattened from the sklearn model when None
+        """
+        self.estimator = self.model
+        self.fold_report = None
+        self.decision_cells = None
+        
+        if forest is None:
+            try:
+                forest = FlatForest.from_sklearn(self.model)
+            except ValueError as e:
+                if self.inference_engine != "sklearn":
+                    logger.warning(f"{self.inference_engine} engine unavailable, using sklearn: {str(e)}")
+                    self.inference_engine = "sklearn"
+                return
+        
+        if self.inference_engine == "sklearn":
+            # Only the split thresholds are kept, for decision-cell cache keys
+            self.decision_cells = DecisionCells.from_forest(forest)
+            return
+        
+        if self.inference_engine == "folded":
+            plan = self.preprocessing_plan
+            folded = forest.fold_scaler(plan.means, plan.scales)
+            self.fold_report = verify_folded(forest, folded, plan.means, plan.scales)
+            if not self.fold_report.exact:
+                logger.error(
+                    f"Scaler folding is not exact for {len(self.fold_report.violations)} "
+                    f"thresholds, using native engine on scaled inputs"
+                )
+                self.inference_engine = "native"
+            else:
+                logger.info(f"Scaler folded into {self.fold_report.thresholds_checked} thresholds")
+                forest = folded
+                # Folded trees compare raw values, so preprocessing skips scaling
+                self.preprocessing_plan = PreprocessingPlan(
+                    label_encoders=self.label_encoders,
+                    scaler=None,
+                    feature_indices=self.feature_indices,
+                    selected_features=self.selected_features,
+                )
+        
+        self.estimator = forest
+        self.decision_cells = DecisionCells.from_forest(forest)
+        logger.info(f"{self.inference_engine} forest engine enabled ({forest.n_nodes} nodes)")
+    
     def is_model_loaded(self) -> bool:
         """Check if model is loaded"""
-        return self.model is not None
+        return self.estimator is not None
     
     def get_model_type(self) -> Optional[str]:
         """Get the type of the loaded model"""
@@ -117,56 +335,22 @@ class ModelService:
         Returns:
             Preprocessed feature array ready for model prediction
         """
-        # Create DataFrame from input
-        df = pd.DataFrame([patient_data])
-        
-        # Encode categorical variables
-        if self.label_encoders:
-            for col, encoder in self.label_encoders.items():
-                if col in df.columns:
-                    # Check if value is in encoder classes
-                    if df[col].iloc[0] in encoder.classes_:
-                        df[col] = encoder.transform([df[col].iloc[0]])
-                    else:
-                        # Handle unknown values - use most common class or raise error
-                        raise ValueError(
-                            f"Unknown value '{df[col].iloc[0]}' for feature '{col}'. "
-                            f"Allowed values: {list(encoder.classes_)}"
-                        )
-        
-        # Get all feature names in the order they were used during training
-        # Based on the notebook, the features are: gender, age, hypertension, heart_disease, 
-        # smoking_history, bmi, HbA1c_level, blood_glucose_level
-        feature_order = [
-            'gender', 'age', 'hypertension', 'heart_disease', 
-            'smoking_history', 'bmi', 'HbA1c_level', 'blood_glucose_level'
-        ]
-        
-        # Reorder columns to match training order
-        df = df[feature_order]
-        
-        # Convert to numpy array
-        features_array = df.values
-        
-        # Scale features
-        if self.scaler:
-            features_array = self.scaler.transform(features_array)
+        return self.preprocessing_plan.transform(patient_data)
+    
+    def _preprocess_batch(self, patients: List[Dict]) -> np.ndarray:
+        """
+        Preprocess a batch of patients as whole columns
         
-        # Select features based on correlation analysis
-        if self.feature_indices is not None:
-            features_array = features_array[:, self.feature_indices]
-        elif self.selected_features is not None:
-            # If feature_indices not available, select by feature names
-            # This is a fallback - ideally feature_indices should be used
-            selected_array = []
-            for feature in self.selected_features:
-                if feature in feature_order:
-                    idx = feature_order.index(feature)
-                    selected_array.append(features_array[:, idx])
-            if selected_array:
-                features_array = np.column_stack(selected_array)
+        Produces exactly the same rows as calling `_preprocess_input` on each
+        patient, but encodes, scales and selects features once for the batch.
         
-        return features_array
+        Args:
+            patients: List of dictionaries containing patient features
+            
+        Returns:
+            Preprocessed feature matrix with one row per patient
+        """
+        return self.preprocessing_plan.transform_batch(patients)
     
     def predict(self, patient_data: Dict) -> Tuple[int, float]:
         """
@@ -192,18 +376,411 @@ class ModelService:
             raise RuntimeError("Model is not loaded")
         
         # Preprocess input
+        start = time.perf_counter()
         features = self._preprocess_input(patient_data)
+        self._record_stage("preprocess", time.perf_counter() - start)
+        
+        predictions, probabilities = self._infer(features)
+        
+        return int(predictions[0]), float(probabilities[0])
+    
+    def predict_batch(self, patients: List[Dict]) -> List[Tuple[int, float]]:
+        """
+        Make predictions for a batch of patients with a single model call
+        
+        Args:
+            patients: List of dictionaries with the same fields as `predict`
+        
+        Returns:
+            List of (prediction, probability) tuples in input order, identical
+            to calling `predict` on each patient
+        """
+        if not self.is_model_loaded():
+            raise RuntimeError("Model is not loaded")
+        
+        if not patients:
+            return []
+        
+        # Preprocess the whole batch at once
+        start = time.perf_counter()
+        features = self._preprocess_batch(patients)
+        self._record_stage("preprocess", time.perf_counter() - start)
+        
+        predictions, probabilities = self._infer(features)
+        
+        return [
+            (int(prediction), float(probability))
+            for prediction, probability in zip(predictions, probabilities)
+        ]
+    
+    def predict_columns(self, columns: Dict[str, Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Make predictions for a batch given as one sequence per feature
+        
+        Skips building a dictionary per patient; results are identical to
+        `predict_batch` on the same rows.
         
-        # Make prediction
-        prediction = self.model.predict(features)[0]
+        Args:
+            columns: Mapping of each field of `predict` to its values, all of
+                equal length
+        
+        Returns:
+            Tuple of (predictions, probabilities) arrays in input order
+        """
+        if not self.is_model_loaded():
+            raise RuntimeError("Model is not loaded")
+        
+        start = time.perf_counter()
+        features = self.preprocessing_plan.transform_columns(columns)
+        self._record_stage("preprocess", time.perf_counter() - start)
+        
+        if len(features) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        return self._infer(features)
+    
+    def predict_encoded(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Make predictions for a matrix of already label-encoded features
+        
+        Args:
+            matrix: (rows, 8) float matrix in the training feature order, with
+                categorical columns holding encoder codes
+        
+        Returns:
+            Tuple of (predictions, probabilities) arrays in input order
+        """
+        if not self.is_model_loaded():
+            raise RuntimeError("Model is not loaded")
+        
+        start = time.perf_counter()
+        features = self.preprocessing_plan.transform_encoded(matrix)
+        self._record_stage("preprocess", time.perf_counter() - start)
+        
+        if len(features) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        return self._infer(features)
+    
+    def _infer(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run the model once and derive labels and class-1 probabilities
+        
+        The ensemble is evaluated a single time through `predict_proba`; labels
+        use the same `classes_.take(argmax)` rule as sklearn's `predict`, so ties
+        resolve to the first class exactly as before.
+        
+        Args:
+            features: Preprocessed feature matrix
+            
+        Returns:
+            Tuple of (predictions, probabilities) arrays, one entry per row
+        """
+        start = time.perf_counter()
         
-        # Get prediction probability
-        if hasattr(self.model, 'predict_proba'):
-            probabilities = self.model.predict_proba(features)[0]
-            probability = probabilities[1]  # Probability of class 1 (diabetes)
+        if hasattr(self.estimator, 'predict_proba'):
+            probabilities = self.estimator.predict_proba(features)
+            predictions = self.estimator.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+            positive = probabilities[:, 1]  # Probability of class 1 (diabetes)
         else:
             # If model doesn't have predict_proba, use prediction as probability estimate
-            probability = float(prediction)
+            predictions = self.estimator.predict(features)
+            positive = predictions.astype(np.float64)
+        
+        self._record_stage("inference", time.perf_counter() - start)
+        
+        return predictions, positive
+    
+    def decision_cell_keys(self, patients: List[Dict]) -> List[Tuple[int, ...]]:
+        """
+        Map patients to prediction-equivalent decision-cell keys
+        
+        Patients with the same key reach the same leaf in every tree, so they
+        are guaranteed to get the same prediction and probability.
+        
+        Args:
+            patients: List of dictionaries containing patient features
+            
+        Returns:
+            One hashable key per patient, in input order
+        """
+        return self.preprocess_cells(patients)[1]
+    
+    def preprocess_cells(self, patients: List[Dict]) -> Tuple[np.ndarray, List[Tuple[int, ...]]]:
+        """
+        Preprocess a batch and map it to decision-cell keys
+        
+        The feature matrix can be scored with `predict_features`, so cache
+        misses are not preprocessed a second time.
+        
+        Args:
+            patients: List of dictionaries containing patient features
+            
+        Returns:
+            Tuple of (preprocessed feature matrix, one key per patient)
+        """
+        if self.decision_cells is None:
+            raise RuntimeError("Decision cells are only available for tree ensembles")
+        
+        start = time.perf_counter()
+        features = self._preprocess_batch(patients)
+        self._record_stage("preprocess", time.perf_counter() - start)
+        
+        return features, self.decision_cells.keys(features)
+    
+    def predict_features(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Make predictions for rows already preprocessed by this service
+        
+        Args:
+            features: Feature matrix from `preprocess_cells` (or a row subset of it)
+        
+        Returns:
+            Tuple of (predictions, probabilities) arrays in input order
+        """
+        if not self.is_model_loaded():
+            raise RuntimeError("Model is not loaded")
+        
+        if len(features) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        
+        return self._infer(features)
+    
+    def _record_stage(self, stage: str, seconds: float):
+        """Add one timed call to the counters for a stage and to the current request's timings"""
+        with self._timings_lock:
+            counter = self._stage_timings.setdefault(stage, [0, 0.0])
+            counter[0] += 1
+            counter[1] += seconds
+        record_stage(stage, seconds)
+    
+    def get_stage_timings(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get cumulative per-stage timing counters
+        
+        Returns:
+            Dictionary mapping stage name to call count, total and mean milliseconds
+        """
+        with self._timings_lock:
+            snapshot = {stage: list(counter) for stage, counter in self._stage_timings.items()}
         
-        return int(prediction), float(probability)
+        return {
+            stage: {
+                "count": int(calls),
+                "total_ms": total * 1000,
+                "mean_ms": (total * 1000 / calls) if calls else 0.0,
+            }
+            for stage, (calls, total) in snapshot.items()
+        }
+
 
+class ModelRegistry:
+    """
+    Several named model services served side by side
+    
+    Each entry is a versioned model directory with its own encoders, scaler and
+    feature indices. Identical preprocessing artifacts are loaded once and
+    shared between entries. Requests are routed to an entry by name or by a
+    weighted A/B split, and per-model latency and throughput are recorded.
+    """
+    
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        inference_engine: str = "sklearn",
+        model_storage: str = "pickle",
+        default_name: str = "default",
+    ):
+        """
+        Initialize an empty registry
+        
+        Args:
+            base_dir: Base directory of the project, passed to every service
+            inference_engine: Inference engine used by every service
+            model_storage: Model storage used by every service
+            default_name: Entry served when a request names no model
+        """
+        self.base_dir = base_dir
+        self.inference_engine = inference_engine
+        self.model_storage = model_storage
+        self.default_name = default_name
+        
+        self.models: Dict[str, ModelService] = {}
+        self.weights: Dict[str, float] = {}
+        self.shared_artifacts: Dict = {}
+        
+        # Per-model usage: name -> [calls, rows, total seconds, max seconds]
+        self._usage: Dict[str, List[float]] = {}
+        self._registered_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_specs(cls, specs: List[Tuple[str, Optional[str], str, str, str]], default_name: str) -> "ModelRegistry":
+        """
+        Build and load a registry from `specs()` of another registry
+        
+        Used by worker processes to load the same models as the API process.
+        """
+        registry = cls(default_name=default_name)
+        for name, base_dir, models_dir, inference_engine, model_storage in specs:
+            registry.register(name, ModelService(
+                base_dir=base_dir,
+                inference_engine=inference_engine,
+                model_storage=model_storage,
+                models_dir=models_dir,
+                shared_artifacts=registry.shared_artifacts,
+            ))
+        return registry
+    
+    def build(self, models_dir: Optional[str] = None, load: bool = True) -> ModelService:
+        """
+        Create a service that shares this registry's preprocessing artifacts
+        
+        Args:
+            models_dir: Directory with the model artifacts; defaults to `<base_dir>/models`
+            load: Load the model right away
+        
+        Returns:
+            The new, unregistered ModelService
+        """
+        return ModelService(
+            base_dir=self.base_dir,
+            inference_engine=self.inference_engine,
+            model_storage=self.model_storage,
+            load=load,
+            models_dir=models_dir,
+            shared_artifacts=self.shared_artifacts,
+        )
+    
+    def register(self, name: str, service: ModelService, weight: float = 0.0):
+        """Add (or replace) a named service with its A/B routing weight"""
+        with self._lock:
+            self.models[name] = service
+            self.weights[name] = weight
+            self._usage.setdefault(name, [0, 0, 0.0, 0.0])
+            self._registered_at.setdefault(name, time.monotonic())
+    
+    def replace(self, name: str, service: ModelService):
+        """Atomically point `name` at a new service; callers holding the old one keep it"""
+        with self._lock:
+            if name not in self.models:
+                raise KeyError(name)
+            self.models[name] = service
+    
+    def set_weights(self, weights: Dict[str, float]):
+        """
+        Set the A/B routing weights
+        
+        Args:
+            weights: Relative weight per model name; unnamed models get 0
+        """
+        unknown = set(weights) - set(self.models)
+        if unknown:
+            raise ValueError(f"Unknown models in routing weights: {sorted(unknown)}")
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Routing weights must not be negative")
+        with self._lock:
+            self.weights = {name: float(weights.get(name, 0.0)) for name in self.models}
+    
+    def get(self, name: Optional[str] = None) -> ModelService:
+        """Service registered under `name` (the default model when None)"""
+        name = name or self.default_name
+        try:
+            return self.models[name]
+        except KeyError:
+            raise KeyError(f"Unknown model '{name}'. Available models: {sorted(self.models)}") from None
+    
+    def names(self) -> List[str]:
+        """Registered model names"""
+        return list(self.models)
+    
+    def choose(self, routing_key: Optional[str] = None) -> str:
+        """
+        Pick a model for a request by weighted A/B split
+        
+        Args:
+            routing_key: Optional stable key (e.g. a user id); the same key
+                always gets the same model while the weights are unchanged
+        
+        Returns:
+            Model name; the default model when no weight is set
+        """
+        total = sum(self.weights.values())
+        if total <= 0:
+            return self.default_name
+        
+        if routing_key is None:
+            point = random.random() * total
+        else:
+            digest = hashlib.sha256(routing_key.encode("utf-8")).digest()
+            point = int.from_bytes(digest[:8], "big") / 2 ** 64 * total
+        
+        for name, weight in self.weights.items():
+            if point < weight:
+                return name
+            point -= weight
+        return name
+    
+    def load_all(self):
+        """Load every registered service that is not loaded yet"""
+        for service in list(self.models.values()):
+            if not service.is_model_loaded():
+                service.load()
+    
+    def specs(self, replace: Optional[Dict[str, ModelService]] = None) -> List[Tuple[str, Optional[str], str, str, str]]:
+        """
+        Constructor arguments of every registered service
+        
+        Args:
+            replace: Services to describe instead of the registered ones, by name
+        """
+        services = dict(self.models, **(replace or {}))
+        return [
+            (name, str(service.base_dir), str(service.models_dir), self.inference_engine, self.model_storage)
+            for name, service in services.items()
+        ]
+    
+    def record(self, name: str, rows: int, seconds: float):
+        """Add one scoring call of `rows` patients to a model's usage counters"""
+        with self._lock:
+            usage = self._usage.setdefault(name, [0, 0, 0.0, 0.0])
+            usage[0] += 1
+            usage[1] += rows
+            usage[2] += seconds
+            usage[3] = max(usage[3], seconds)
+    
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        Get per-model routing weight, latency and throughput
+        
+        Returns:
+            Dictionary mapping model name to its version, weight, call and row
+            counts, mean/max call latency in milliseconds, rows per second since
+            registration and per-stage timings
+        """
+        now = time.monotonic()
+        with self._lock:
+            usage = {name: list(counter) for name, counter in self._usage.items()}
+            registered_at = dict(self._registered_at)
+        
+        stats = {}
+        for name, service in self.models.items():
+            calls, rows, total, longest = usage.get(name, [0, 0, 0.0, 0.0])
+            elapsed = now - registered_at.get(name, now)
+            stats[name] = {
+                "model_version": service.model_version,
+                "model_type": service.model_type,
+                "models_dir": str(service.models_dir),
+                "weight": self.weights.get(name, 0.0),
+                "calls": int(calls),
+                "rows": int(rows),
+                "mean_latency_ms": (total * 1000 / calls) if calls else 0.0,
+                "max_latency_ms": longest * 1000,
+                "rows_per_second": (rows / elapsed) if elapsed > 0 else 0.0,
+                "stages": service.get_stage_timings(),
+            }
+        return stats
+    
+    def shared_artifact_count(self) -> int:
+        """Number of distinct preprocessing artifacts held for all models"""
+        return len(self.shared_artifacts)
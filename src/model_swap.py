@@ -0,0 +1,187 @@
+"""
+Zero-downtime model hot-swap: candidate checks and model directory watching
+"""
+import asyncio
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numeric input bounds accepted by the request schema
+PROBE_RANGES = {
+    'age': (0.0, 120.0),
+    'bmi': (10.0, 100.0),
+    'HbA1c_level': (3.5, 10.0),
+    'blood_glucose_level': (80.0, 300.0),
+}
+
+
+class ModelSwapError(Exception):
+    """A candidate model was rejected; the live model keeps serving"""
+
+    def __init__(self, message: str, report: Optional[Dict] = None):
+        super().__init__(message)
+        self.report = report or {}
+
+
+def probe_patients(model_service, n: int = 64, seed: int = 0) -> List[Dict]:
+    """
+    Deterministic in-range patients used to check a candidate model
+
+    Categorical values cycle through the classes known to the candidate's
+    label encoders; numeric values are drawn uniformly within the schema bounds.
+
+    Args:
+        model_service: Loaded candidate ModelService
+        n: Number of patients
+        seed: Random seed
+
+    Returns:
+        List of patient dictionaries
+    """
+    rng = np.random.RandomState(seed)
+    genders = list(model_service.label_encoders['gender'].classes_)
+    smoking = list(model_service.label_encoders['smoking_history'].classes_)
+
+    patients = []
+    for i in range(n):
+        patient = {
+            'gender': str(genders[i % len(genders)]),
+            'hypertension': int(rng.randint(2)),
+            'heart_disease': int(rng.randint(2)),
+            'smoking_history': str(smoking[i % len(smoking)]),
+        }
+        for feature, (low, high) in PROBE_RANGES.items():
+            patient[feature] = round(float(rng.uniform(low, high)), 2)
+        patients.append(patient)
+    return patients
+
+
+def verify_candidate(
+    candidate,
+    patients: List[Dict],
+    live=None,
+    min_agreement: float = 0.0,
+) -> Dict:
+    """
+    Parity and warm-up check of a candidate model before it goes live
+
+    The candidate scores `patients` once as a batch and once row by row; both
+    paths must agree exactly and return valid probabilities. This also warms
+    up its inference path. When the live model is given, the share of
+    matching predictions is reported and must reach `min_agreement`.
+
+    Args:
+        candidate: Loaded candidate ModelService
+        patients: Probe patients, e.g. from `probe_patients`
+        live: ModelService currently serving, if any
+        min_agreement: Minimum fraction of probes where both models agree
+
+    Returns:
+        Report dictionary; `passed` tells whether the candidate may be swapped in
+    """
+    start = time.perf_counter()
+    batch = candidate.predict_batch(patients)
+    single = [candidate.predict(patient) for patient in patients]
+    warmup_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(batch, single) if a != b)
+    invalid = sum(
+        1 for _, probability in batch
+        if not (math.isfinite(probability) and 0.0 <= probability <= 1.0)
+    )
+
+    agreement = None
+    max_probability_delta = None
+    if live is not None and live.is_model_loaded():
+        reference = live.predict_batch(patients)
+        agreement = sum(1 for a, b in zip(batch, reference) if a[0] == b[0]) / len(patients)
+        max_probability_delta = max(abs(a[1] - b[1]) for a, b in zip(batch, reference))
+
+    passed = (
+        mismatches == 0
+        and invalid == 0
+        and (agreement is None or agreement >= min_agreement)
+    )
+    return {
+        "model_version": candidate.model_version,
+        "models_dir": str(candidate.models_dir),
+        "probes": len(patients),
+        "batch_mismatches": mismatches,
+        "invalid_probabilities": invalid,
+        "agreement": agreement,
+        "max_probability_delta": max_probability_delta,
+        "min_agreement": min_agreement,
+        "warmup_seconds": warmup_seconds,
+        "passed": passed,
+    }
+
+
+def directory_fingerprint(directory: Path) -> Tuple:
+    """Name, size and modification time of every file below `directory`"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return ()
+    entries = []
+    for path in directory.rglob("*"):
+        if path.is_file():
+            stat = path.stat()
+            entries.append((str(path.relative_to(directory)), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(entries))
+
+
+class ModelWatcher:
+    """
+    Poll a model directory and trigger a hot-swap when its files change
+
+    A change is acted on only once the directory has looked the same for two
+    consecutive polls, so a model that is still being copied in is not loaded
+    half-written. A failed swap is not retried until the files change again.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        on_change: Callable[[Path], Awaitable],
+        interval_seconds: float = 5.0,
+    ):
+        """
+        Initialize the watcher
+
+        Args:
+            directory: Model directory to watch
+            on_change: Coroutine function called with `directory` after a change
+            interval_seconds: Time between polls
+        """
+        self.directory = Path(directory)
+        self.on_change = on_change
+        self.interval = interval_seconds
+
+    async def run(self):
+        """Poll until cancelled"""
+        last = await asyncio.to_thread(directory_fingerprint, self.directory)
+        pending = None
+        logger.info(f"Watching {self.directory} for model changes every {self.interval:g}s")
+
+        while True:
+            await asyncio.sleep(self.interval)
+            current = await asyncio.to_thread(directory_fingerprint, self.directory)
+            if current == last:
+                pending = None
+                continue
+            if current != pending:
+                # Still changing; wait for it to settle
+                pending = current
+                continue
+
+            last, pending = current, None
+            logger.info(f"Model files changed in {self.directory}, swapping")
+            try:
+                await self.on_change(self.directory)
+            except Exception:
+                logger.exception(f"Model swap from {self.directory} failed; keeping the live model")
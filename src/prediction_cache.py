@@ -0,0 +1,180 @@
+"""
+Bounded LRU/TTL cache for prediction results
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from preprocessing import FEATURE_ORDER
+
+# Canonical Python type of each input field, in training order
+FIELD_TYPES = {
+    'gender': str,
+    'age': float,
+    'hypertension': int,
+    'heart_disease': int,
+    'smoking_history': str,
+    'bmi': float,
+    'HbA1c_level': float,
+    'blood_glucose_level': float,
+}
+
+
+def canonical_key(patient_data: Dict) -> Tuple:
+    """
+    Normalize a patient's 8 input fields into a hashable tuple
+
+    Values are coerced to their canonical type, so e.g. `age=45` and
+    `age=45.0` share an entry.
+
+    Args:
+        patient_data: Dictionary containing patient features
+
+    Returns:
+        Tuple of field values in training order
+    """
+    return tuple(FIELD_TYPES[feature](patient_data[feature]) for feature in FEATURE_ORDER)
+
+
+def _entry_size(key: Hashable, value: Tuple) -> int:
+    """Approximate bytes held by one cache entry"""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(item) for item in key)
+    size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of (prediction, probability, model_version) results
+
+    Entries are bounded by count and by an approximate byte budget, and can
+    optionally expire after a TTL. The cache is tied to one model version: as
+    soon as it is used with a different version, every entry is dropped, so a
+    reloaded model never serves results computed by the previous one.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 0):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached results
+            max_bytes: Approximate memory budget for keys and values
+            ttl_seconds: Entry lifetime in seconds; 0 disables expiry
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+
+        # key -> (value, size, expires_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, float, str], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._model_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, model_version: str):
+        """Drop all entries when the model version changes (lock held)"""
+        if model_version != self._model_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._model_version = model_version
+
+    def get(self, key: Hashable, model_version: str) -> Optional[Tuple[int, float, str]]:
+        """
+        Look up a cached result
+
+        Args:
+            key: Cache key for the patient (e.g. from `canonical_key`)
+            model_version: Version of the model that would serve the request
+
+        Returns:
+            Cached (prediction, probability, model_version), or None on a miss
+        """
+        with self._lock:
+            self._check_version(model_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Tuple[int, float, str], model_version: str):
+        """
+        Store a result, evicting least recently used entries if over budget
+
+        Args:
+            key: Cache key for the patient
+            value: (prediction, probability, model_version) to cache
+            model_version: Version of the model that produced the result
+        """
+        size = _entry_size(key, value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            self._check_version(model_version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with hit/miss/eviction counters, hit rate and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "model_version": self._model_version,
+            }
@@ -0,0 +1,257 @@
+"""
+Precompiled preprocessing plan for the diabetes prediction model
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Feature order used during training (see notebook): gender, age, hypertension,
+# heart_disease, smoking_history, bmi, HbA1c_level, blood_glucose_level
+FEATURE_ORDER = [
+    'gender', 'age', 'hypertension', 'heart_disease',
+    'smoking_history', 'bmi', 'HbA1c_level', 'blood_glucose_level'
+]
+
+# Numeric flags that only take the values 0 and 1
+BINARY_FEATURES = ['hypertension', 'heart_disease']
+
+
+class PreprocessingPlan:
+    """
+    Encode, scale and select patient features without pandas or sklearn calls
+
+    The plan is compiled once from the fitted label encoders, scaler and feature
+    indices. Categorical values are resolved through plain dict lookups and
+    `(x - mean) / scale` is only evaluated for the selected output columns, using
+    the same float64 operations as `StandardScaler.transform`, so the result is
+    bit-for-bit identical to the original DataFrame-based pipeline.
+    """
+
+    def __init__(
+        self,
+        label_encoders: Optional[Dict] = None,
+        scaler=None,
+        feature_indices: Optional[Sequence[int]] = None,
+        selected_features: Optional[Sequence[str]] = None,
+    ):
+        """
+        Compile the plan from fitted preprocessing components
+
+        Args:
+            label_encoders: Mapping of feature name to fitted LabelEncoder
+            scaler: Fitted StandardScaler over FEATURE_ORDER, or None
+            feature_indices: Indices into FEATURE_ORDER kept for the model
+            selected_features: Feature names kept for the model (fallback)
+        """
+        # Lookup tables in encoder order, so validation errors match the
+        # order in which encoders were applied during training
+        self.lookups = []
+        self.sorted_classes = {}
+        for feature, encoder in (label_encoders or {}).items():
+            classes = list(encoder.classes_)
+            table = {value: float(code) for code, value in enumerate(classes)}
+            self.lookups.append((feature, table, classes))
+
+            # Sorted classes and their codes for vectorized lookups of whole columns
+            order = np.argsort(np.asarray(classes))
+            self.sorted_classes[feature] = (np.asarray(classes)[order], order.astype(np.float64))
+
+        # Subtracting 0.0 and dividing by 1.0 are exact, so disabled scaling
+        # steps can share the same arithmetic
+        means = np.zeros(len(FEATURE_ORDER), dtype=np.float64)
+        scales = np.ones(len(FEATURE_ORDER), dtype=np.float64)
+        if scaler is not None:
+            if scaler.with_mean:
+                means = np.asarray(scaler.mean_, dtype=np.float64)
+            if scaler.with_std:
+                scales = np.asarray(scaler.scale_, dtype=np.float64)
+
+        self.source_indices = self._resolve_indices(feature_indices, selected_features)
+        self.columns = [
+            (FEATURE_ORDER[idx], float(means[idx]), float(scales[idx]))
+            for idx in self.source_indices
+        ]
+        self.n_features = len(self.columns)
+        self.means = np.array([mean for _, mean, _ in self.columns], dtype=np.float64)
+        self.scales = np.array([scale for _, _, scale in self.columns], dtype=np.float64)
+
+    @staticmethod
+    def _resolve_indices(
+        feature_indices: Optional[Sequence[int]],
+        selected_features: Optional[Sequence[str]],
+    ) -> List[int]:
+        """Work out which training columns are fed to the model, in order"""
+        if feature_indices is not None:
+            return [int(idx) for idx in feature_indices]
+        if selected_features is not None:
+            # If feature_indices not available, select by feature names
+            indices = [FEATURE_ORDER.index(f) for f in selected_features if f in FEATURE_ORDER]
+            if indices:
+                return indices
+        return list(range(len(FEATURE_ORDER)))
+
+    def _encode(self, patient_data: Dict) -> Dict[str, float]:
+        """Map categorical values to their encoded codes"""
+        codes = {}
+        for feature, table, classes in self.lookups:
+            if feature in patient_data:
+                value = patient_data[feature]
+                code = table.get(value)
+                if code is None:
+                    raise ValueError(
+                        f"Unknown value '{value}' for feature '{feature}'. "
+                        f"Allowed values: {classes}"
+                    )
+                codes[feature] = code
+        return codes
+
+    def check_categories(self, patient_data: Dict):
+        """
+        Check that every categorical value is a known encoder class
+
+        Raises:
+            ValueError: A value the encoders have not seen, as `transform` would
+        """
+        self._encode(patient_data)
+
+    def write_row(self, patient_data: Dict, out: np.ndarray):
+        """
+        Fill a preallocated float64 row with the model-ready features
+
+        Args:
+            patient_data: Dictionary containing patient features
+            out: 1-D float64 array of length `n_features`
+        """
+        codes = self._encode(patient_data)
+        for j, (feature, mean, scale) in enumerate(self.columns):
+            value = codes[feature] if feature in codes else float(patient_data[feature])
+            out[j] = (value - mean) / scale
+
+    def transform(self, patient_data: Dict) -> np.ndarray:
+        """
+        Preprocess a single patient into a (1, n_features) matrix
+
+        Args:
+            patient_data: Dictionary containing patient features
+
+        Returns:
+            Preprocessed feature array ready for model prediction
+        """
+        row = np.empty((1, self.n_features), dtype=np.float64)
+        self.write_row(patient_data, row[0])
+        return row
+
+    def transform_batch(self, patients: List[Dict]) -> np.ndarray:
+        """
+        Preprocess many patients column by column
+
+        Args:
+            patients: List of dictionaries containing patient features
+
+        Returns:
+            Preprocessed feature matrix with one row per patient
+        """
+        encoded = {}
+        for feature, table, classes in self.lookups:
+            codes = np.empty(len(patients), dtype=np.float64)
+            for i, patient in enumerate(patients):
+                value = patient[feature]
+                code = table.get(value)
+                if code is None:
+                    raise ValueError(
+                        f"Unknown value '{value}' for feature '{feature}'. "
+                        f"Allowed values: {classes}"
+                    )
+                codes[i] = code
+            encoded[feature] = codes
+
+        features_array = np.empty((len(patients), self.n_features), dtype=np.float64)
+        for j, (feature, mean, scale) in enumerate(self.columns):
+            if feature in encoded:
+                column = encoded[feature]
+            else:
+                column = np.fromiter(
+                    (patient[feature] for patient in patients),
+                    dtype=np.float64,
+                    count=len(patients),
+                )
+            features_array[:, j] = (column - mean) / scale
+
+        return features_array
+
+    def transform_columns(self, columns: Dict[str, Sequence]) -> np.ndarray:
+        """
+        Preprocess a batch given as one sequence per feature
+
+        Categorical columns are encoded with a binary search over the sorted
+        encoder classes instead of per-value dict lookups; the result is
+        identical to `transform_batch` on the same rows.
+
+        Args:
+            columns: Mapping of feature name to its values, all of equal length
+
+        Returns:
+            Preprocessed feature matrix with one row per patient
+        """
+        encoded = {}
+        for feature, table, classes in self.lookups:
+            values = np.asarray(columns[feature])
+            sorted_classes, codes = self.sorted_classes[feature]
+            positions = np.searchsorted(sorted_classes, values).clip(max=len(sorted_classes) - 1)
+            unknown = sorted_classes[positions] != values
+            if unknown.any():
+                value = values[np.argmax(unknown)]
+                raise ValueError(
+                    f"Unknown value '{value}' for feature '{feature}'. "
+                    f"Allowed values: {classes}"
+                )
+            encoded[feature] = codes[positions]
+
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        features_array = np.empty((n_rows, self.n_features), dtype=np.float64)
+        for j, (feature, mean, scale) in enumerate(self.columns):
+            if feature in encoded:
+                column = encoded[feature]
+            else:
+                column = np.asarray(columns[feature], dtype=np.float64)
+            features_array[:, j] = (column - mean) / scale
+
+        return features_array
+
+    def transform_encoded(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Scale and select features of an already label-encoded matrix
+
+        Args:
+            matrix: (rows, 8) matrix in FEATURE_ORDER with categorical columns
+                holding encoder codes
+
+        Returns:
+            Preprocessed float64 feature matrix with one row per patient
+
+        Raises:
+            ValueError: Non-finite values, binary flags other than 0/1, or
+                codes that are not encoder classes
+        """
+        if matrix.ndim != 2 or matrix.shape[1] != len(FEATURE_ORDER):
+            raise ValueError(f"Expected a (rows, {len(FEATURE_ORDER)}) matrix in the order {FEATURE_ORDER}")
+        if not np.isfinite(matrix).all():
+            raise ValueError("Matrix contains NaN or infinite values")
+
+        for feature in BINARY_FEATURES:
+            flags = matrix[:, FEATURE_ORDER.index(feature)]
+            invalid = (flags != 0) & (flags != 1)
+            if invalid.any():
+                raise ValueError(f"Invalid value {flags[np.argmax(invalid)]:g} for feature '{feature}'. Expected 0 or 1")
+
+        for feature, table, classes in self.lookups:
+            codes = matrix[:, FEATURE_ORDER.index(feature)]
+            invalid = (codes < 0) | (codes >= len(classes)) | (codes != np.floor(codes))
+            if invalid.any():
+                raise ValueError(
+                    f"Invalid code {codes[np.argmax(invalid)]:g} for feature '{feature}'. "
+                    f"Expected 0-{len(classes) - 1} for {classes}"
+                )
+
+        selected = matrix[:, self.source_indices].astype(np.float64)
+        return (selected - self.means) / self.scales
@@ -0,0 +1,186 @@
+"""
+Low-overhead stack-sampling profiler for a live worker
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Innermost frames of threads that are waiting rather than working
+IDLE_FRAMES = frozenset({
+    "selectors:EpollSelector.select",
+    "selectors:KqueueSelector.select",
+    "selectors:PollSelector.select",
+    "selectors:SelectSelector.select",
+    "threading:Condition.wait",
+    "threading:Event.wait",
+    "threading:Thread._wait_for_tstate_lock",
+    "queue:Queue.get",
+    "concurrent.futures.thread:_worker",
+    "asyncio.queues:Queue.get",
+})
+
+# (category, frame prefixes); a sample belongs to the category of its
+# innermost frame that matches, checking categories in this order
+CATEGORIES = (
+    ("preprocess", ("model_service:ModelService._preprocess", "preprocessing:")),
+    ("sklearn", ("sklearn.",)),
+    ("forest_engine", ("forest_engine:",)),
+    ("json_encoding", (
+        "json.encoder:", "fastapi.encoders:", "fastapi.routing:serialize_response",
+        "starlette.responses:JSONResponse.render",
+    )),
+    ("validation", (
+        "json.decoder:", "pydantic.", "pydantic_core.", "fastapi._compat",
+        "fastapi.dependencies.utils:request_body_to_args",
+    )),
+    ("endpoint", ("main:",)),
+    ("routing", ("fastapi.", "starlette.", "uvicorn.", "request_timing:")),
+)
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+def _frame_name(frame) -> str:
+    """`module:qualified function` of a stack frame"""
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def _stack(frame) -> List[str]:
+    """Frame names of a stack, outermost first"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def categorize(stack: Tuple[str, ...]) -> str:
+    """Category of a sampled stack (thread name first), or "other" """
+    for name in reversed(stack):
+        for category, prefixes in CATEGORIES:
+            if name.startswith(prefixes):
+                return category
+    return "other"
+
+
+class SamplingProfiler:
+    """
+    Sample the Python stacks of all threads of this process
+
+    The calling thread wakes every `interval` seconds and records the stack of
+    every other thread via `sys._current_frames()`, so the profiled code runs
+    unmodified; the cost is the sampler briefly holding the GIL at each tick.
+    The interpreter's switch interval is left alone, so a tick can be taken up
+    to one switch interval (`sys.getswitchinterval()`, 5 ms by default) late
+    while another thread runs Python code. Only one profile runs at a time.
+    """
+
+    def __init__(self, max_seconds: float = 60.0):
+        """
+        Initialize the profiler
+
+        Args:
+            max_seconds: Longest profile accepted
+        """
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, interval: float = 0.01, include_idle: bool = False) -> Tuple[Counter, int]:
+        """
+        Sample stacks for `seconds` (blocking the calling thread)
+
+        Args:
+            seconds: Profile duration, at most `max_seconds`
+            interval: Time between samples
+            include_idle: Keep samples of threads waiting for work
+
+        Returns:
+            (samples per stack, number of ticks); each stack is a tuple of the
+            thread name followed by frame names, outermost first
+
+        Raises:
+            ProfilerBusy: Another profile is running
+            ValueError: Duration or interval out of range
+        """
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"Profile duration must be between 0 and {self.max_seconds} seconds")
+        if interval <= 0:
+            raise ValueError("Sampling interval must be positive")
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running in this worker")
+
+        try:
+            own = threading.get_ident()
+            stacks: Counter = Counter()
+            ticks = 0
+            deadline = time.perf_counter() + seconds
+            next_tick = time.perf_counter()
+            while next_tick < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = _stack(frame)
+                    if not include_idle and stack and stack[-1] in IDLE_FRAMES:
+                        continue
+                    stacks[(names.get(ident, str(ident)), *stack)] += 1
+                ticks += 1
+                next_tick += interval
+                time.sleep(max(0.0, next_tick - time.perf_counter()))
+            return stacks, ticks
+        finally:
+            self._lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    """Stacks in the collapsed format of flamegraph.pl / speedscope, one `frame;frame;... count` per line"""
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+def summarize(stacks: Counter, ticks: int, interval: float, top: int = 20) -> Dict:
+    """
+    Split samples by category and list the hottest frames
+
+    Args:
+        stacks: Samples per stack from `SamplingProfiler.run`
+        ticks: Number of sampling ticks
+        interval: Time between ticks in seconds
+        top: Number of frames to list
+
+    Returns:
+        Sample counts and shares per category, and the frames most often at
+        the top of a stack (self time) and anywhere in it (total time)
+    """
+    total = sum(stacks.values())
+    categories: Counter = Counter()
+    self_time: Counter = Counter()
+    total_time: Counter = Counter()
+    for stack, count in stacks.items():
+        categories[categorize(stack)] += count
+        self_time[stack[-1]] += count
+        for name in set(stack[1:]):
+            total_time[name] += count
+
+    def share(count: int) -> Optional[float]:
+        return round(count / total, 4) if total else None
+
+    return {
+        "ticks": ticks,
+        "interval_ms": interval * 1000,
+        "samples": total,
+        "categories": {
+            category: {"samples": count, "share": share(count)}
+            for category, count in categories.most_common()
+        },
+        "top_self": [
+            {"frame": name, "samples": count, "share": share(count)} for name, count in self_time.most_common(top)
+        ],
+        "top_total": [
+            {"frame": name, "samples": count, "share": share(count)} for name, count in total_time.most_common(top)
+        ],
+    }
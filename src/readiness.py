@@ -0,0 +1,73 @@
+"""
+Readiness tracking for background model loading
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+# Lifecycle states reported by /health/ready
+READINESS_STATES = ("loading", "warming_up", "ready", "failed")
+
+
+class ModelReadiness:
+    """
+    Track the background load and warm-up of the model
+
+    The API starts serving before the model is available: liveness succeeds at
+    once, while readiness and the prediction routes wait for `mark_ready()`.
+    Load and warm-up durations are kept for the metrics endpoints.
+    """
+
+    def __init__(self, retry_after_seconds: int = 5):
+        """
+        Initialize the tracker
+
+        Args:
+            retry_after_seconds: `Retry-After` hint sent while not ready
+        """
+        self.retry_after_seconds = retry_after_seconds
+        self.status = "loading"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def mark_loaded(self, load_seconds: float):
+        """Model is loaded; warm-up prediction is next"""
+        with self._lock:
+            self.status = "warming_up"
+            self.load_seconds = load_seconds
+
+    def mark_ready(self, warmup_seconds: float):
+        """Warm-up prediction finished; start serving predictions"""
+        with self._lock:
+            self.status = "ready"
+            self.warmup_seconds = warmup_seconds
+
+    def mark_failed(self, error: str):
+        """Loading or warm-up failed; the worker will never become ready"""
+        with self._lock:
+            self.status = "failed"
+            self.error = error
+
+    def is_ready(self) -> bool:
+        """Whether predictions can be served"""
+        return self.status == "ready"
+
+    def get_stats(self) -> Dict:
+        """
+        Get the readiness state and load metrics
+
+        Returns:
+            Dictionary with status, error, load/warm-up durations and time since
+            startup
+        """
+        with self._lock:
+            return {
+                "status": self.status,
+                "error": self.error,
+                "load_seconds": self.load_seconds,
+                "warmup_seconds": self.warmup_seconds,
+                "uptime_seconds": time.monotonic() - self._started,
+            }
@@ -0,0 +1,139 @@
+"""
+ASGI middleware and route class that time each request stage
+"""
+import functools
+import inspect
+import time
+from typing import Callable, Optional
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics import Histograms, RequestTimings, current_timings
+
+
+# Stages listed first in Server-Timing, in request order; others follow
+STAGE_ORDER = ("queue_wait", "parse", "preprocess", "inference", "risk_banding", "serialization")
+
+
+def server_timing_header(timings: RequestTimings, total_seconds: float) -> bytes:
+    """
+    Format a request's timings as a `Server-Timing` header value
+
+    Stages become `name;dur=<ms>`, markers such as cache hits become
+    `name;desc="..."`, and `total` covers the request up to the response start.
+    """
+    stages = timings.stages
+    names = [stage for stage in STAGE_ORDER if stage in stages]
+    names += [stage for stage in stages if stage not in STAGE_ORDER]
+    entries = [f"{stage};dur={stages[stage] * 1000:.3f}" for stage in names]
+    if timings.markers:
+        entries += [f'{name};desc="{description}"' for name, description in timings.markers.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.3f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Wrap an endpoint to record when it starts and returns"""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            timings = current_timings.get()
+            if timings is None:
+                return await endpoint(*args, **kwargs)
+            timings.endpoint_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timings.endpoint_end = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            timings = current_timings.get()
+            if timings is None:
+                return endpoint(*args, **kwargs)
+            timings.endpoint_start = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                timings.endpoint_end = time.perf_counter()
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that splits a request into parse, endpoint and serialization time
+
+    `parse` covers reading the body and validating it and the other
+    parameters, up to the endpoint call; `serialization` covers validating and
+    encoding the returned value into a response.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            timings = current_timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.handler_start = time.perf_counter()
+            response = await handler(request)
+            timings.handler_end = time.perf_counter()
+            if timings.endpoint_start:
+                timings.add("parse", timings.endpoint_start - timings.handler_start)
+                timings.add("serialization", timings.handler_end - timings.endpoint_end)
+            return response
+
+        return timed_handler
+
+
+class StageTimingMiddleware:
+    """
+    Time the stages of each HTTP request
+
+    Each request gets a `RequestTimings` in `current_timings`, which the route
+    class, the executor, the micro-batcher, the model service and the
+    endpoints add to. With `server_timing`, the stages completed before the
+    response starts are sent back in a `Server-Timing` header. With
+    `histograms`, once the last response byte has been sent, the request and
+    its stages are recorded, labelled by route path, batch-size bucket and
+    model version; requests that match no route are not recorded.
+    """
+
+    def __init__(self, app: ASGIApp, histograms: Optional[Histograms] = None, server_timing: bool = False):
+        self.app = app
+        self.histograms = histograms
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_timed(message: Message) -> None:
+            if self.server_timing and message["type"] == "http.response.start":
+                header = server_timing_header(timings, time.perf_counter() - start)
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", header)]
+            await send(message)
+            if (
+                self.histograms is not None
+                and message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+            ):
+                route = scope.get("route")
+                if route is not None:
+                    self.histograms.observe_request(route.path, timings, time.perf_counter() - start)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            current_timings.reset(token)
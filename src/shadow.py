@@ -0,0 +1,246 @@
+"""
+Shadow scoring of a candidate model off the request path
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the absolute probability delta histogram
+DELTA_BUCKETS = (0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _lower_thread_priority():
+    """Run the shadow thread at the lowest CPU priority where supported (Linux)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+class ShadowStats:
+    """Running disagreement and probability-delta aggregates for one primary model"""
+
+    def __init__(self):
+        self.rows = 0
+        self.disagreements = 0
+        self.delta_total = 0.0
+        self.delta_max = 0.0
+        self.delta_counts = [0] * len(DELTA_BUCKETS)
+        self.shadow_versions = set()
+
+    def add(self, primary: Tuple, shadow: Tuple, shadow_version: Optional[str]):
+        """Compare one primary (prediction, probability, ...) with the shadow result"""
+        delta = abs(primary[1] - shadow[1])
+        self.rows += 1
+        self.disagreements += int(primary[0] != shadow[0])
+        self.delta_total += delta
+        self.delta_max = max(self.delta_max, delta)
+        for i, bound in enumerate(DELTA_BUCKETS):
+            if delta <= bound:
+                self.delta_counts[i] += 1
+                break
+        self.shadow_versions.add(shadow_version)
+
+    def to_dict(self) -> Dict:
+        """Aggregates with a cumulative delta histogram keyed by upper bound"""
+        histogram = {}
+        cumulative = 0
+        for bound, count in zip(DELTA_BUCKETS, self.delta_counts):
+            cumulative += count
+            histogram[f"le_{bound:g}"] = cumulative
+        return {
+            "rows": self.rows,
+            "disagreements": self.disagreements,
+            "disagreement_rate": (self.disagreements / self.rows) if self.rows else 0.0,
+            "mean_probability_delta": (self.delta_total / self.rows) if self.rows else 0.0,
+            "max_probability_delta": self.delta_max,
+            "probability_delta_histogram": histogram,
+            "shadow_versions": sorted(v for v in self.shadow_versions if v is not None),
+        }
+
+
+class ShadowScorer:
+    """
+    Score live traffic with a candidate model without touching the response
+
+    `submit()` only puts the request on a bounded queue and returns; when the
+    queue is full the work is dropped and counted. A single background worker
+    merges queued requests into batches of up to `max_batch_rows` patients and
+    scores them on a dedicated low-priority thread, separate from the inference
+    executor, then aggregates how often and by how much the candidate disagrees
+    with the model that served each request.
+
+    Shadow work only starts while `is_busy()` is false, so it fills idle time
+    instead of competing with served requests for CPU; under sustained load the
+    queue fills up and shadow work is dropped rather than slowing the primary
+    path.
+    """
+
+    def __init__(
+        self,
+        score_batch: Callable[[List[Dict]], Tuple[List[Tuple[int, float]], Optional[str]]],
+        max_queue: int = 1000,
+        max_batch_rows: int = 64,
+        sample_rate: float = 1.0,
+        is_busy: Optional[Callable[[], bool]] = None,
+        idle_poll_ms: float = 2.0,
+    ):
+        """
+        Initialize the shadow scorer
+
+        Args:
+            score_batch: Blocking function scoring patients with the candidate,
+                returning (results, candidate model version)
+            max_queue: Requests waiting for shadow scoring before new ones are dropped
+            max_batch_rows: Largest number of patients scored in one call
+            sample_rate: Fraction of requests sent to the shadow model
+            is_busy: Returns True while primary inference is running; shadow
+                batches wait until it returns False
+            idle_poll_ms: How often a waiting batch rechecks `is_busy`
+        """
+        self.score_batch = score_batch
+        self.max_queue = max_queue
+        self.max_batch_rows = max(1, max_batch_rows)
+        self.sample_rate = sample_rate
+        self.is_busy = is_busy
+        self.idle_poll = max(0.0, idle_poll_ms) / 1000
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shadow", initializer=_lower_thread_priority
+        )
+        self._lock = threading.Lock()
+
+        self.by_model: Dict[str, ShadowStats] = {}
+        self.submitted = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.errors = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.deferrals = 0
+
+    def _ensure_started(self):
+        """Start the worker on the running loop (restarting if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = loop.create_task(self._run())
+
+    def submit(self, patients: List[Dict], primary_results: List[Tuple], primary_model: str) -> bool:
+        """
+        Queue a served request for shadow scoring
+
+        Must be called on the event loop; never blocks.
+
+        Args:
+            patients: Patients of the request
+            primary_results: (prediction, probability, ...) returned to the client
+            primary_model: Name of the model that served the request
+
+        Returns:
+            Whether the request was queued
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((patients, primary_results, primary_model))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    async def stop(self):
+        """Stop the worker and discard queued work"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._thread.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self):
+        """Take queued requests, score them in batches and record the comparison"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            # Yield to served requests; the queue absorbs (or drops) work meanwhile
+            if self.is_busy is not None and self.is_busy():
+                self.deferrals += 1
+                while self.is_busy():
+                    await asyncio.sleep(self.idle_poll)
+
+            rows = len(batch[0][0])
+            while rows < self.max_batch_rows and not self._queue.empty():
+                item = self._queue.get_nowait()
+                batch.append(item)
+                rows += len(item[0])
+
+            patients = [patient for item in batch for patient in item[0]]
+            start = time.perf_counter()
+            try:
+                results, shadow_version = await loop.run_in_executor(self._thread, self.score_batch, patients)
+            except Exception as e:
+                self.errors += len(batch)
+                logger.warning(f"Shadow scoring of {len(patients)} patients failed: {str(e)}")
+                continue
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+            self.batches += 1
+            self._record(batch, results, shadow_version)
+
+    def _record(self, batch: List[Tuple], results: List[Tuple], shadow_version: Optional[str]):
+        """Fold one scored batch into the per-model aggregates"""
+        offset = 0
+        with self._lock:
+            for patients, primary_results, primary_model in batch:
+                stats = self.by_model.setdefault(primary_model, ShadowStats())
+                for primary, shadow in zip(primary_results, results[offset:offset + len(patients)]):
+                    stats.add(primary, shadow, shadow_version)
+                offset += len(patients)
+
+    def queue_depth(self) -> int:
+        """Number of requests waiting for shadow scoring"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def get_stats(self) -> Dict:
+        """
+        Get shadow scoring metrics
+
+        Returns:
+            Dictionary with queue and drop counters and, per primary model, the
+            disagreement rate and probability-delta statistics
+        """
+        with self._lock:
+            by_model = {name: stats.to_dict() for name, stats in self.by_model.items()}
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_queue": self.max_queue,
+            "sample_rate": self.sample_rate,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "errors": self.errors,
+            "batches": self.batches,
+            "deferrals": self.deferrals,
+            "busy_seconds": self.busy_seconds,
+            "by_model": by_model,
+        }
@@ -0,0 +1,202 @@
+"""
+Chunked scoring of newline-delimited JSON with bounded memory
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is read
+
+    Starlette's StreamingResponse reads `receive` itself to watch for client
+    disconnects (on ASGI servers before spec 2.4, such as uvicorn), which
+    swallows request body chunks the generator has not read yet. Here the
+    generator alone reads the request; a disconnect surfaces from
+    `Request.stream()` as ClientDisconnect.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a byte stream into numbered lines
+
+    Only the current line is buffered. A line longer than `max_line_bytes` is
+    discarded as it arrives and yielded as None.
+
+    Args:
+        chunks: Request body chunks
+        max_line_bytes: Longest accepted line
+
+    Yields:
+        (1-based line number, line bytes or None if too long)
+    """
+    buffer = bytearray()
+    overflow = False
+    line_number = 0
+
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if not overflow:
+                buffer += chunk[start:] if end < 0 else chunk[start:end]
+                if len(buffer) > max_line_bytes:
+                    overflow = True
+                    buffer.clear()
+            if end < 0:
+                break
+            line_number += 1
+            yield line_number, None if overflow else bytes(buffer)
+            buffer.clear()
+            overflow = False
+            start = end + 1
+
+    if buffer or overflow:
+        yield line_number + 1, None if overflow else bytes(buffer)
+
+
+def line_errors(error: Exception) -> List[Dict]:
+    """Validation errors of one line as [{"field", "message"}]"""
+    if isinstance(error, ValidationError):
+        return [
+            {"field": ".".join(str(part) for part in e["loc"]), "message": e["msg"]}
+            for e in error.errors(include_url=False)
+        ]
+    return [{"field": "", "message": str(error)}]
+
+
+async def _parsed_chunks(
+    lines: AsyncIterator[Tuple[int, Optional[bytes]]],
+    parse: Callable[[bytes], Dict],
+    chunk_size: int,
+    max_line_bytes: int,
+) -> AsyncIterator[List[Tuple[int, Optional[Dict], Optional[List[Dict]]]]]:
+    """Group parsed lines into chunks of (line number, patient, errors)"""
+    chunk = []
+    async for line_number, line in lines:
+        if line is None:
+            chunk.append((line_number, None, [{"field": "", "message": f"Line longer than {max_line_bytes} bytes"}]))
+        elif line.strip():
+            try:
+                chunk.append((line_number, parse(line), None))
+            except ValueError as e:
+                chunk.append((line_number, None, line_errors(e)))
+        else:
+            continue
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _score_isolating(
+    patients: List[Dict],
+    score: Callable[[List[Dict]], Awaitable[List[Tuple]]],
+) -> List[Union[Tuple, ValueError]]:
+    """
+    Score patients, isolating rows the model rejects
+
+    When the batch fails with ValueError (e.g. an unknown category), it is
+    split in halves and retried, so each bad row ends up as its own error
+    and the others are still scored.
+    """
+    try:
+        return await score(patients)
+    except ValueError as e:
+        if len(patients) == 1:
+            return [e]
+        middle = len(patients) // 2
+        return await _score_isolating(patients[:middle], score) + await _score_isolating(patients[middle:], score)
+
+
+async def _render_chunk(
+    chunk: List[Tuple[int, Optional[Dict], Optional[List[Dict]]]],
+    scoring: Optional[asyncio.Future],
+    render: Callable[[Tuple], Dict],
+) -> bytes:
+    """Output lines of one chunk, in input order"""
+    results = iter(await scoring) if scoring is not None else iter(())
+    out = []
+    for line_number, patient, errors in chunk:
+        if patient is None:
+            out.append({"line": line_number, "errors": errors})
+            continue
+        result = next(results)
+        if isinstance(result, ValueError):
+            out.append({"line": line_number, "errors": line_errors(result)})
+        else:
+            out.append({"line": line_number, **render(result)})
+    return "".join(json.dumps(item) + "\n" for item in out).encode()
+
+
+async def score_ndjson(
+    chunks: AsyncIterator[bytes],
+    parse: Callable[[bytes], Dict],
+    score: Callable[[List[Dict]], Awaitable[List[Tuple]]],
+    render: Callable[[Tuple], Dict],
+    chunk_size: int = 2000,
+    max_line_bytes: int = 16384,
+) -> AsyncIterator[bytes]:
+    """
+    Score an NDJSON body chunk by chunk and yield NDJSON results
+
+    Valid lines are scored `chunk_size` at a time with one vectorized model
+    call; invalid lines, and lines the model rejects with ValueError, get an
+    inline `{"line", "errors"}` entry instead. The
+    next chunk is parsed while the previous one is scored, so at most two
+    chunks are held at once whatever the input size. The body is only read
+    as fast as results are consumed, so a slow client slows the upload
+    instead of growing buffers. Any other scoring failure ends the stream
+    with an `{"error"}` line, since the status has already been sent.
+
+    Args:
+        chunks: Request body chunks
+        parse: Validates one line and returns the patient dictionary; raises ValueError
+        score: Scores a list of patients
+        render: Turns one result into its output fields
+        chunk_size: Lines per model call
+        max_line_bytes: Longest accepted line
+
+    Yields:
+        NDJSON-encoded results, one chunk at a time
+    """
+    pending = None
+    try:
+        async for chunk in _parsed_chunks(ndjson_lines(chunks, max_line_bytes), parse, chunk_size, max_line_bytes):
+            patients = [patient for _, patient, _ in chunk if patient is not None]
+            scoring = asyncio.ensure_future(_score_isolating(patients, score)) if patients else None
+            if pending is not None:
+                yield await _render_chunk(*pending, render)
+            pending = (chunk, scoring)
+        if pending is not None:
+            yield await _render_chunk(*pending, render)
+            pending = None
+    except ClientDisconnect:
+        logger.info("Client disconnected during NDJSON scoring")
+    except Exception as e:
+        logger.warning(f"NDJSON scoring stopped: {str(e)}")
+        yield (json.dumps({"error": str(e)}) + "\n").encode()
+    finally:
+        if pending is not None and pending[1] is not None:
+            pending[1].cancel()
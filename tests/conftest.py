@@ -0,0 +1,87 @@
+"""
+Shared fixtures: the shipped model, the training dataset and the API app
+"""
+import contextlib
+import importlib
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_service import ModelService
+from preprocessing import FEATURE_ORDER
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / "data" / "diabetes_data.csv"
+
+
+@pytest.fixture(scope="session")
+def data() -> pd.DataFrame:
+    """Patient features of the full dataset, without the label"""
+    return pd.read_csv(DATA_PATH).drop(columns=["diabetes"])
+
+
+@pytest.fixture(scope="session")
+def patients(data):
+    """The dataset as /predict-style patient dictionaries"""
+    return data.to_dict("records")
+
+
+@pytest.fixture(scope="session")
+def service() -> ModelService:
+    """Model service with the shipped model on the sklearn engine"""
+    return ModelService(base_dir=str(BASE_DIR))
+
+
+@pytest.fixture(scope="session")
+def encoded(service, data) -> np.ndarray:
+    """The dataset label-encoded, as an (n, 8) float matrix in FEATURE_ORDER"""
+    df = data.copy()
+    for col, encoder in service.label_encoders.items():
+        df[col] = encoder.transform(df[col])
+    return df[FEATURE_ORDER].to_numpy(dtype=np.float64)
+
+
+@pytest.fixture(scope="session")
+def scaled_features(service, encoded) -> np.ndarray:
+    """Model inputs from the original DataFrame pipeline: label-encode, scale, select"""
+    return service.scaler.transform(encoded)[:, service.feature_indices]
+
+
+@contextlib.contextmanager
+def _running_api(**overrides):
+    """TestClient of a freshly imported `main` app with settings overridden, once it is ready"""
+    from fastapi.testclient import TestClient
+    from config import settings
+
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in overrides.items():
+            patch.setattr(settings, name, value)
+        # main reads its settings at import time
+        sys.modules.pop("main", None)
+        main = importlib.import_module("main")
+        try:
+            with TestClient(main.app) as client:
+                deadline = time.monotonic() + 60
+                while client.get("/health/ready").status_code != 200:
+                    assert time.monotonic() < deadline, "API did not become ready"
+                    time.sleep(0.05)
+                yield client
+        finally:
+            sys.modules.pop("main", None)
+
+
+@pytest.fixture(scope="session")
+def running_api():
+    """Context manager factory: `with running_api(METRICS_ENABLED=True) as client`"""
+    return _running_api
+
+
+@pytest.fixture(scope="session")
+def api_client(running_api):
+    """TestClient of the app with default settings"""
+    with running_api() as client:
+        yield client
@@ -0,0 +1,68 @@
+"""
+Concurrent single-patient calls are merged into batches and fanned back out
+"""
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class FakeModel:
+    """predict_batch stand-in recording the batches it scores"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def predict_batch(self, patients):
+        self.batches.append([patient["id"] for patient in patients])
+        if any(patient.get("bad") for patient in patients):
+            raise ValueError("bad patient")
+        await asyncio.sleep(0)
+        return [(patient["id"] % 2, patient["id"] / 100, "v1") for patient in patients]
+
+
+def run_concurrently(batcher, patients):
+    async def main():
+        try:
+            return await asyncio.gather(*(batcher.predict(patient) for patient in patients), return_exceptions=True)
+        finally:
+            await batcher.stop()
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_share_one_batch():
+    model = FakeModel()
+    batcher = MicroBatcher(model.predict_batch, max_batch_size=64, max_wait_ms=50)
+    results = run_concurrently(batcher, [{"id": i} for i in range(10)])
+
+    assert model.batches == [list(range(10))]
+    assert results == [(i % 2, i / 100, "v1") for i in range(10)]
+    stats = batcher.get_stats()
+    assert (stats["batches"], stats["requests"], stats["mean_batch_size"]) == (1, 10, 10.0)
+
+
+def test_batches_are_capped_at_max_batch_size():
+    model = FakeModel()
+    batcher = MicroBatcher(model.predict_batch, max_batch_size=4, max_wait_ms=50)
+    results = run_concurrently(batcher, [{"id": i} for i in range(10)])
+
+    assert model.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert [result[1] for result in results] == [i / 100 for i in range(10)]
+
+
+def test_bad_patient_only_fails_its_own_caller():
+    model = FakeModel()
+    batcher = MicroBatcher(model.predict_batch, max_batch_size=64, max_wait_ms=50)
+    patients = [{"id": i, "bad": i == 2} for i in range(4)]
+    results = run_concurrently(batcher, patients)
+
+    # One failed batch call, then one call per patient
+    assert model.batches == [[0, 1, 2, 3], [0], [1], [2], [3]]
+    assert isinstance(results[2], ValueError)
+    assert [results[i] for i in (0, 1, 3)] == [(0, 0.0, "v1"), (1, 0.01, "v1"), (1, 0.03, "v1")]
+
+
+def test_max_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        MicroBatcher(FakeModel().predict_batch, max_batch_size=0)
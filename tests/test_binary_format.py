@@ -0,0 +1,84 @@
+"""
+DPM1/DPR1 wire format and the /predict/binary endpoint
+"""
+import numpy as np
+import pytest
+
+from binary_format import (
+    BINARY_MEDIA_TYPE, HEADER_SIZE, pack_matrix, pack_results, parse_matrix, unpack_results
+)
+from preprocessing import FEATURE_ORDER
+
+HEADERS = {"Content-Type": BINARY_MEDIA_TYPE}
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_matrix_round_trip(encoded, dtype):
+    matrix = encoded[:100].astype(dtype)
+    parsed = parse_matrix(pack_matrix(matrix))
+    assert parsed.dtype == dtype and parsed.shape == (100, len(FEATURE_ORDER))
+    np.testing.assert_array_equal(parsed, matrix)
+
+
+def test_results_round_trip():
+    predictions = np.array([0, 1, 1, 0])
+    probabilities = np.array([0.01, 0.75, 0.5, 0.123456789])
+    body = pack_results(predictions, probabilities)
+    assert body[:4] == b"DPR1" and len(body) == HEADER_SIZE + 4 * 9
+    unpacked_predictions, unpacked_probabilities = unpack_results(body)
+    np.testing.assert_array_equal(unpacked_predictions, predictions)
+    np.testing.assert_array_equal(unpacked_probabilities, probabilities)
+
+
+@pytest.mark.parametrize("length, message", [
+    (HEADER_SIZE - 5, "shorter than the 16-byte header"),
+    (HEADER_SIZE + 3, "expected 208 for 3 rows"),
+    (-1, "expected 208 for 3 rows"),
+])
+def test_truncated_body_is_rejected(encoded, length, message):
+    body = pack_matrix(encoded[:3])
+    with pytest.raises(ValueError, match=message):
+        parse_matrix(body[:length])
+
+
+def test_bad_magic_is_rejected(encoded):
+    with pytest.raises(ValueError, match="Bad magic"):
+        parse_matrix(b"XXXX" + pack_matrix(encoded[:3])[4:])
+
+
+def test_endpoint_matches_batch_scoring(api_client, service, patients, encoded):
+    response = api_client.post("/predict/binary", content=pack_matrix(encoded[:500]), headers=HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == BINARY_MEDIA_TYPE
+    assert response.headers["x-model-version"] == service.model_version
+
+    predictions, probabilities = unpack_results(response.content)
+    expected_predictions, expected_probabilities = zip(*service.predict_batch(patients[:500]))
+    np.testing.assert_array_equal(predictions, expected_predictions)
+    np.testing.assert_array_equal(probabilities, expected_probabilities)
+
+
+def test_endpoint_rejects_truncated_payload(api_client, encoded):
+    body = pack_matrix(encoded[:10])[:-8]
+    response = api_client.post("/predict/binary", content=body, headers=HEADERS)
+    assert response.status_code == 400
+    assert "expected" in response.json()["detail"]
+
+
+def test_endpoint_rejects_non_integral_flags(api_client, encoded):
+    matrix = encoded[:10].copy()
+    matrix[6, FEATURE_ORDER.index("hypertension")] = 0.5
+    matrix[[2, 8], FEATURE_ORDER.index("age")] = 150
+    response = api_client.post("/predict/binary", content=pack_matrix(matrix), headers=HEADERS)
+
+    assert response.status_code == 422
+    errors = {tuple(error["loc"]): error for error in response.json()["detail"]}
+    assert errors[("body", "hypertension")]["type"] == "int_from_float"
+    assert (errors[("body", "hypertension")]["rows"], errors[("body", "hypertension")]["count"]) == ([6], 1)
+    assert errors[("body", "age")]["type"] == "range_error"
+    assert errors[("body", "age")]["rows"] == [2, 8]
+
+
+def test_endpoint_requires_its_media_type(api_client, encoded):
+    response = api_client.post("/predict/binary", content=pack_matrix(encoded[:2]))
+    assert response.status_code == 415
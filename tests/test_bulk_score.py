@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import bulk_score
+from bulk_score import score_files
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = BASE_DIR / "data" / "diabetes_data.csv"
+SERVICE_KWARGS = {"base_dir": str(BASE_DIR)}
+
+
+@pytest.fixture
+def sample_csv(tmp_path) -> Path:
+    path = tmp_path / "patients.csv"
+    pd.read_csv(DATA_PATH, nrows=50).to_csv(path, index=False)
+    return path
+
+
+def test_scores_every_row(sample_csv, tmp_path):
+    output = tmp_path / "out.csv"
+    summary = score_files([sample_csv], output, "csv", SERVICE_KWARGS, chunk_size=20)
+    assert summary["rows"] == 50
+    assert pd.read_csv(output)["row"].tolist() == list(range(50))
+
+
+def test_out_of_range_rows_fail_the_chunk(sample_csv, tmp_path):
+    frame = pd.read_csv(sample_csv)
+    frame.loc[3, "age"] = 500
+    frame.loc[7, "hypertension"] = 2
+    frame.to_csv(sample_csv, index=False)
+    with pytest.raises(ValueError, match=r"invalid 'age' in 1 data row\(s\), e.g. \[3\].*invalid 'hypertension'"):
+        score_files([sample_csv], tmp_path / "out.csv", "csv", SERVICE_KWARGS, chunk_size=20)
+
+
+def crash_after_first_chunk(monkeypatch, sample_csv, output):
+    """Run until the second chunk is written, leaving the first chunk's checkpoint behind"""
+    write = bulk_score.OutputWriter.write
+
+    def write_once(self, frame):
+        if self.checkpoint.state["chunks_done"]:
+            raise RuntimeError("crash")
+        write(self, frame)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(bulk_score.OutputWriter, "write", write_once)
+        with pytest.raises(RuntimeError):
+            score_files([sample_csv], output, "csv", SERVICE_KWARGS, chunk_size=20)
+
+
+def test_resume_continues_after_the_checkpoint(sample_csv, tmp_path, monkeypatch):
+    output = tmp_path / "out.csv"
+    crash_after_first_chunk(monkeypatch, sample_csv, output)
+    summary = score_files([sample_csv], output, "csv", SERVICE_KWARGS, chunk_size=20, resume=True)
+    assert summary["resumed"] and summary["rows"] == 30
+    assert pd.read_csv(output)["row"].tolist() == list(range(50))
+
+
+def test_resume_without_output_is_rejected(sample_csv, tmp_path, monkeypatch):
+    output = tmp_path / "out.csv"
+    crash_after_first_chunk(monkeypatch, sample_csv, output)
+    output.unlink()
+    with pytest.raises(ValueError, match="missing or shorter than checkpoint"):
+        score_files([sample_csv], output, "csv", SERVICE_KWARGS, chunk_size=20, resume=True)
+    assert not output.exists()
@@ -0,0 +1,28 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from csv_input import read_chunks
+from preprocessing import FEATURE_ORDER
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "diabetes_data.csv"
+
+
+def test_chunks_cover_the_file_in_order(data):
+    chunks = list(read_chunks(DATA_PATH, chunk_size=30000, skip_rows=5))
+    assert [first_row for first_row, _ in chunks] == [5, 30005, 60005, 90005]
+    ages = np.concatenate([columns["age"] for _, columns in chunks])
+    np.testing.assert_array_equal(ages, data["age"].to_numpy()[5:])
+    assert list(chunks[0][1]) == FEATURE_ORDER
+
+
+def test_missing_value_reports_the_row():
+    upload = io.BytesIO(
+        b"gender,age,hypertension,heart_disease,smoking_history,bmi,HbA1c_level,blood_glucose_level\n"
+        b"Female,80,0,1,never,25.19,6.6,140\n"
+        b"Male,54,0,0,,27.32,6.6,80\n"
+    )
+    with pytest.raises(ValueError, match="missing 'smoking_history' in data row 1"):
+        list(read_chunks(upload, chunk_size=10))
@@ -0,0 +1,65 @@
+"""
+Flat, scaler-folded and decision-cell views of the forest must agree exactly with sklearn
+"""
+import numpy as np
+import pytest
+
+from forest_engine import DecisionCells, FlatForest, check_parity, verify_folded
+
+
+@pytest.fixture(scope="module")
+def forest(service) -> FlatForest:
+    return FlatForest.from_sklearn(service.model)
+
+
+@pytest.fixture(scope="module")
+def expected(service, scaled_features) -> np.ndarray:
+    return service.model.predict_proba(scaled_features)
+
+
+def test_flat_forest_matches_sklearn(service, forest, scaled_features, expected):
+    np.testing.assert_array_equal(forest.predict_proba(scaled_features), expected)
+    np.testing.assert_array_equal(forest.predict(scaled_features), service.model.predict(scaled_features))
+    assert check_parity(service.model, forest, scaled_features) == (0, 0.0)
+
+
+def test_saved_forest_matches_sklearn(forest, scaled_features, expected, tmp_path):
+    forest.save(tmp_path)
+    loaded, _ = FlatForest.load(tmp_path)
+    np.testing.assert_array_equal(loaded.predict_proba(scaled_features), expected)
+
+
+def test_folded_forest_on_raw_inputs_matches_sklearn(service, forest, encoded, expected):
+    plan = service.preprocessing_plan
+    folded = forest.fold_scaler(plan.means, plan.scales)
+    assert verify_folded(forest, folded, plan.means, plan.scales).exact
+
+    raw = encoded[:, service.feature_indices]
+    np.testing.assert_array_equal(folded.predict_proba(raw), expected)
+
+
+def test_decision_cells_are_prediction_equivalent(forest, scaled_features, expected):
+    cells = DecisionCells.from_forest(forest)
+    keys = cells.keys(scaled_features)
+
+    first_row = {}
+    for row, key in enumerate(keys):
+        first_row.setdefault(key, row)
+    representative = np.array([first_row[key] for key in keys])
+    assert len(first_row) < len(keys)
+    np.testing.assert_array_equal(expected, expected[representative])
+
+
+def test_decision_cells_separate_values_either_side_of_a_split(forest):
+    cells = DecisionCells.from_forest(forest)
+    edges = cells.thresholds[0]
+    threshold = edges[len(edges) // 2]
+    # Largest float32 input that goes left at this split, and the next one up
+    left = np.float32(threshold)
+    if left > threshold:
+        left = np.nextafter(left, np.float32(-np.inf))
+    right = np.nextafter(left, np.float32(np.inf))
+    X = np.zeros((2, forest.n_features_in_), dtype=np.float32)
+    X[0, 0], X[1, 0] = left, right
+    first, second = cells.keys(X)
+    assert first != second
@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+import pytest
+
+from jobs import JobStore
+
+
+@pytest.fixture
+def store(tmp_path) -> JobStore:
+    store = JobStore(tmp_path / "jobs.db")
+    store.init()
+    return store
+
+
+def chunks(rows: int, chunk_size: int):
+    for first_row in range(0, rows, chunk_size):
+        yield first_row, {"age": list(range(first_row, min(rows, first_row + chunk_size)))}
+
+
+def score(columns):
+    n = len(columns["age"])
+    return np.zeros(n, dtype=np.int64), np.full(n, 0.25)
+
+
+def test_job_lifecycle(store):
+    job = store.create("default", "json", chunks(5, 2))
+    assert (job["status"], job["total_rows"]) == ("queued", 5)
+
+    claimed = store.claim(lease_seconds=30)
+    assert claimed["id"] == job["id"] and claimed["total_chunks"] == 3
+    assert store.claim(lease_seconds=30) is None
+
+    for chunk in range(3):
+        first_row, columns = store.load_chunk(job["id"], chunk)
+        assert store.save_chunk(job["id"], chunk, first_row, *score(columns), "v1") == "running"
+    store.finish(job["id"], "succeeded")
+
+    job = store.get(job["id"])
+    assert (job["status"], job["processed_rows"], job["model_versions"]) == ("succeeded", 5, ["v1"])
+    assert store.results(job["id"], offset=3, limit=10) == [(3, 0, 0.25), (4, 0, 0.25)]
+    assert store.load_chunk(job["id"], 2) is None
+
+
+def test_expired_lease_is_reclaimed_and_the_old_worker_superseded(store):
+    job = store.create("default", "json", chunks(4, 2))
+    store.claim(lease_seconds=30)
+    first_row, columns = store.load_chunk(job["id"], 0)
+    store.save_chunk(job["id"], 0, first_row, *score(columns), "v1")
+
+    # The lease is still held
+    assert store.claim(lease_seconds=30) is None
+    time.sleep(0.01)
+    reclaimed = store.claim(lease_seconds=0.001)
+    assert reclaimed["id"] == job["id"] and reclaimed["chunks_done"] == 1
+
+    # Both workers finish chunk 1; only the first save counts
+    first_row, columns = store.load_chunk(job["id"], 1)
+    assert store.save_chunk(job["id"], 1, first_row, *score(columns), "v1") == "running"
+    assert store.save_chunk(job["id"], 1, first_row, *score(columns), "v1") == "superseded"
+    assert store.get(job["id"])["processed_rows"] == 4
+
+
+def test_failed_upload_leaves_no_job(store):
+    def failing():
+        yield from chunks(4, 2)
+        raise ValueError("bad row")
+
+    with pytest.raises(ValueError):
+        store.create("default", "csv", failing())
+    assert store.counts() == dict.fromkeys(store.counts(), 0)
+    assert store.claim(lease_seconds=30) is None
+
+
+def test_purge_keeps_the_newest_finished_jobs(store):
+    ids = []
+    for _ in range(3):
+        job = store.create("default", "json", chunks(1, 1))
+        store.claim(lease_seconds=30)
+        store.finish(job["id"], "succeeded")
+        ids.append(job["id"])
+    assert store.purge(retention_seconds=3600, max_finished=1) == 2
+    assert [store.get(job_id) is not None for job_id in ids] == [False, False, True]
+    assert store.purge(retention_seconds=0, max_finished=10) == 1
@@ -0,0 +1,88 @@
+"""
+Stage histograms: Prometheus exposition on /metrics and aggregation across workers
+"""
+import json
+import os
+import re
+
+import pytest
+
+from metrics import LATENCY_BUCKETS, REQUEST_METRIC, STAGE_METRIC, Histograms, RequestTimings
+
+PATIENT = {
+    "gender": "Female", "age": 45.0, "hypertension": 0, "heart_disease": 0,
+    "smoking_history": "never", "bmi": 25.5, "HbA1c_level": 5.7, "blood_glucose_level": 140,
+}
+
+
+def sample(text: str, metric: str, **labels) -> float:
+    """Value of the one exposition line of `metric` carrying `labels`"""
+    values = [
+        float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith(metric + "{") and all(f'{name}="{value}"' in line for name, value in labels.items())
+    ]
+    assert len(values) == 1, f"{metric} {labels}: {values}"
+    return values[0]
+
+
+@pytest.fixture(scope="module")
+def client(running_api):
+    with running_api(METRICS_ENABLED=True) as client:
+        yield client
+
+
+def test_metrics_exposition_counts_requests_and_stages(client):
+    for _ in range(3):
+        assert client.post("/predict", json=PATIENT).status_code == 200
+    assert client.post("/predict/batch", json={"patients": [PATIENT] * 5}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert f"# TYPE {REQUEST_METRIC} histogram" in text
+    assert f"# TYPE {STAGE_METRIC} histogram" in text
+
+    assert sample(text, REQUEST_METRIC + "_count", endpoint="/predict", batch_size="1") == 3
+    assert sample(text, REQUEST_METRIC + "_count", endpoint="/predict/batch", batch_size="2-8") == 1
+    for stage in ("parse", "preprocess", "inference", "serialization"):
+        assert sample(text, STAGE_METRIC + "_count", stage=stage, endpoint="/predict", batch_size="1") == 3
+    # Buckets are cumulative and end with +Inf == count
+    assert sample(
+        text, REQUEST_METRIC + "_bucket", endpoint="/predict", batch_size="1", le="+Inf"
+    ) == 3
+    assert re.search(rf'{REQUEST_METRIC}_bucket{{endpoint="/predict",batch_size="1",model_version="\w+",le="0.0001"}}', text)
+
+
+def test_metrics_disabled(running_api):
+    with running_api(METRICS_ENABLED=False, SERVER_TIMING_ENABLED=False) as client:
+        assert client.get("/metrics").status_code == 404
+        assert "server-timing" not in client.post("/predict", json=PATIENT).headers
+
+
+def test_workers_are_summed_through_the_shared_directory(tmp_path):
+    timings = RequestTimings()
+    timings.add("inference", 0.002)
+    timings.rows, timings.model_version = 1, "v1"
+
+    # A live worker (files are named by pid; the parent process stands in for it)
+    worker = Histograms(tmp_path)
+    worker.observe_request("/predict", timings, 0.003)
+    worker.flush()
+    (tmp_path / f"metrics_{os.getpid()}.json").rename(tmp_path / f"metrics_{os.getppid()}.json")
+    # A worker that has exited since its last flush
+    exited = [[REQUEST_METRIC, ["/predict", "1", "v1"], [0] * 6 + [2] + [0] * (len(LATENCY_BUCKETS) - 6), 0.014]]
+    (tmp_path / "metrics_999999999.json").write_text(json.dumps(exited))
+
+    # The worker answering the scrape
+    reader = Histograms(tmp_path)
+    reader.observe_request("/predict", timings, 0.001)
+    text = reader.render()
+    labels = {"endpoint": "/predict", "batch_size": "1", "model_version": "v1"}
+    assert sample(text, REQUEST_METRIC + "_count", **labels) == 4
+    assert sample(text, REQUEST_METRIC + "_sum", **labels) == pytest.approx(0.018)
+    assert sample(text, STAGE_METRIC + "_count", stage="inference", **labels) == 2
+
+    # Files of exited workers are dropped
+    reader.remove_stale()
+    assert sample(reader.render(), REQUEST_METRIC + "_count", **labels) == 2
@@ -0,0 +1,46 @@
+"""
+A model bundle must score exactly like the pickled model, and reject tampered arrays
+"""
+import numpy as np
+import pytest
+
+from export_model import export_bundle
+from model_bundle import BUNDLE_ARRAYS, load_bundle
+from model_service import FOREST_BUNDLE_FILE, ModelService
+
+
+@pytest.fixture(scope="module")
+def bundle_path(service, tmp_path_factory):
+    path = tmp_path_factory.mktemp("bundle") / FOREST_BUNDLE_FILE
+    export_bundle(service, path)
+    return path
+
+
+def test_bundle_forest_matches_pickle(service, bundle_path, scaled_features):
+    forest, manifest = load_bundle(bundle_path)
+    assert manifest["model_version"] == service.model_version
+    np.testing.assert_array_equal(
+        forest.predict_proba(scaled_features), service.model.predict_proba(scaled_features)
+    )
+
+
+def test_bundle_service_matches_pickle_service(service, bundle_path, patients):
+    # The bundle directory holds nothing else, so no pickle can be read
+    bundled = ModelService(models_dir=str(bundle_path.parent), inference_engine="native", model_storage="bundle")
+    assert bundled.model_version == service.model_version
+    sample = patients[:5000]
+    assert bundled.predict_batch(sample) == service.predict_batch(sample)
+
+
+def test_flipped_byte_fails_the_checksum(bundle_path, tmp_path):
+    with np.load(bundle_path, allow_pickle=False) as data:
+        arrays = {name: data[name].copy() for name in (*BUNDLE_ARRAYS, "manifest")}
+    threshold = arrays["threshold"].view(np.uint8)
+    threshold[len(threshold) // 2] ^= 0x01
+    tampered = tmp_path / FOREST_BUNDLE_FILE
+    with open(tampered, "wb") as f:
+        np.savez(f, **arrays)
+
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        load_bundle(tampered)
+    load_bundle(tampered, verify=False)
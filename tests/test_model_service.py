@@ -0,0 +1,51 @@
+"""
+Batch scoring must match row-by-row scoring and the sklearn model
+"""
+import numpy as np
+import pytest
+
+from model_service import ModelRegistry
+
+
+def test_predict_batch_matches_predict(service, patients):
+    sample = [patients[i] for i in np.random.default_rng(0).choice(len(patients), 200, replace=False)]
+    assert service.predict_batch(sample) == [service.predict(patient) for patient in sample]
+
+
+def test_predict_batch_matches_sklearn(service, patients, scaled_features):
+    predictions, probabilities = zip(*service.predict_batch(patients))
+    np.testing.assert_array_equal(probabilities, service.model.predict_proba(scaled_features)[:, 1])
+    np.testing.assert_array_equal(predictions, service.model.predict(scaled_features))
+
+
+def test_predict_batch_of_nothing(service):
+    assert service.predict_batch([]) == []
+
+
+def test_preprocess_cells_features_score_like_predict_batch(service, patients, scaled_features):
+    sample = patients[:5000]
+    features, keys = service.preprocess_cells(sample)
+    np.testing.assert_array_equal(features, scaled_features[:5000])
+    assert keys == service.decision_cell_keys(sample)
+
+    predictions, probabilities = service.predict_features(features[::7])
+    expected = service.predict_batch(sample[::7])
+    assert list(zip(predictions.tolist(), probabilities.tolist())) == expected
+
+
+def test_registry_register_updates_weight():
+    registry = ModelRegistry()
+    registry.register("a", registry.build(load=False), weight=1.0)
+    registry.register("a", registry.build(load=False), weight=3.0)
+    assert registry.weights["a"] == 3.0
+
+
+def test_registry_replace_keeps_weight():
+    registry = ModelRegistry()
+    registry.register("a", registry.build(load=False), weight=2.0)
+    replacement = registry.build(load=False)
+    registry.replace("a", replacement)
+    assert registry.get("a") is replacement
+    assert registry.weights["a"] == 2.0
+    with pytest.raises(KeyError):
+        registry.replace("b", replacement)
@@ -0,0 +1,75 @@
+"""
+LRU eviction under the byte budget, TTL expiry and model-version invalidation
+"""
+import prediction_cache
+from prediction_cache import PredictionCache, _entry_size, canonical_key
+
+
+def key(i: int):
+    return ("Female", float(i), 0, 0, "never", 25.0, 5.5, 140.0)
+
+
+def value(i: int, version: str = "v1"):
+    return (i % 2, i / 100, version)
+
+
+def test_byte_budget_evicts_least_recently_used():
+    entry = _entry_size(key(0), value(0))
+    cache = PredictionCache(max_entries=100, max_bytes=3 * entry + entry // 2)
+    for i in range(3):
+        cache.put(key(i), value(i), "v1")
+    assert cache.get(key(0), "v1") == value(0)
+
+    # Over budget: key 1 is now the least recently used
+    cache.put(key(3), value(3), "v1")
+    assert cache.get(key(1), "v1") is None
+    assert [cache.get(key(i), "v1") for i in (0, 2, 3)] == [value(0), value(2), value(3)]
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["evictions"]) == (3, 1)
+    assert stats["bytes"] <= cache.max_bytes
+
+
+def test_entry_count_limit():
+    cache = PredictionCache(max_entries=2)
+    for i in range(3):
+        cache.put(key(i), value(i), "v1")
+    assert cache.get(key(0), "v1") is None
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(ttl_seconds=10)
+    cache.put(key(0), value(0), "v1")
+
+    now[0] += 9.9
+    assert cache.get(key(0), "v1") == value(0)
+    now[0] += 0.1
+    assert cache.get(key(0), "v1") is None
+    stats = cache.get_stats()
+    assert (stats["expirations"], stats["entries"], stats["bytes"]) == (1, 0, 0)
+
+
+def test_model_version_change_drops_every_entry():
+    cache = PredictionCache()
+    for i in range(5):
+        cache.put(key(i), value(i), "v1")
+
+    # A swapped-in model never sees the old model's results
+    assert cache.get(key(0), "v2") is None
+    assert cache.get_stats()["invalidations"] == 1
+    assert cache.get_stats()["entries"] == 0
+
+    cache.put(key(0), value(0, "v2"), "v2")
+    assert cache.get(key(0), "v2") == value(0, "v2")
+    # A late result from the old model also resets the cache rather than mixing versions
+    cache.put(key(1), value(1), "v1")
+    assert cache.get(key(0), "v1") is None
+    assert cache.get(key(1), "v1") == value(1)
+
+
+def test_canonical_key_coerces_numeric_types():
+    patient = {"gender": "Male", "age": 45, "hypertension": 1.0, "heart_disease": 0, "smoking_history": "never",
+               "bmi": 27, "HbA1c_level": 6.1, "blood_glucose_level": 140}
+    assert canonical_key(patient) == canonical_key({**patient, "age": 45.0, "hypertension": 1, "bmi": 27.0})
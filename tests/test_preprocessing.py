@@ -0,0 +1,43 @@
+"""
+PreprocessingPlan must reproduce the original pandas/sklearn pipeline bit for bit
+"""
+import numpy as np
+import pytest
+
+from preprocessing import FEATURE_ORDER
+
+
+def test_transform_batch_matches_reference(service, patients, scaled_features):
+    np.testing.assert_array_equal(service.preprocessing_plan.transform_batch(patients), scaled_features)
+
+
+def test_transform_matches_reference_per_row(service, patients, scaled_features):
+    rows = np.random.default_rng(0).choice(len(patients), 2000, replace=False)
+    plan = service.preprocessing_plan
+    actual = np.vstack([plan.transform(patients[i]) for i in rows])
+    np.testing.assert_array_equal(actual, scaled_features[rows])
+
+
+def test_transform_columns_matches_reference(service, data, scaled_features):
+    columns = {name: data[name].tolist() for name in FEATURE_ORDER}
+    np.testing.assert_array_equal(service.preprocessing_plan.transform_columns(columns), scaled_features)
+
+
+def test_transform_encoded_matches_reference(service, encoded, scaled_features):
+    np.testing.assert_array_equal(service.preprocessing_plan.transform_encoded(encoded), scaled_features)
+
+
+def test_unknown_category_is_rejected(service, patients):
+    patient = {**patients[0], "gender": "Unknown"}
+    plan = service.preprocessing_plan
+    with pytest.raises(ValueError, match="Unknown value 'Unknown' for feature 'gender'"):
+        plan.transform(patient)
+    with pytest.raises(ValueError, match="Unknown value 'Unknown' for feature 'gender'"):
+        plan.transform_batch([patients[1], patient])
+
+
+def test_fractional_binary_flag_is_rejected(service, encoded):
+    matrix = encoded[:4].copy()
+    matrix[2, FEATURE_ORDER.index("hypertension")] = 0.5
+    with pytest.raises(ValueError, match="Invalid value 0.5 for feature 'hypertension'"):
+        service.preprocessing_plan.transform_encoded(matrix)
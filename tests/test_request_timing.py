@@ -0,0 +1,63 @@
+"""
+Server-Timing header: stage breakdown of a single request
+"""
+import re
+
+import pytest
+
+from metrics import RequestTimings
+from request_timing import server_timing_header
+
+PATIENT = {
+    "gender": "Male", "age": 61.0, "hypertension": 1, "heart_disease": 0,
+    "smoking_history": "former", "bmi": 31.2, "HbA1c_level": 6.8, "blood_glucose_level": 200,
+}
+
+ENTRY = re.compile(r'^(\w+);(dur=\d+\.\d{3}|desc="[^"]*")$')
+
+
+def entries(header: str) -> dict:
+    parsed = {}
+    for entry in header.split(", "):
+        match = ENTRY.match(entry)
+        assert match, f"malformed Server-Timing entry {entry!r}"
+        parsed[match.group(1)] = match.group(2)
+    return parsed
+
+
+@pytest.fixture(scope="module")
+def client(running_api):
+    with running_api(SERVER_TIMING_ENABLED=True, PREDICTION_CACHE_ENABLED=True) as client:
+        yield client
+
+
+def test_header_lists_stages_in_request_order(client):
+    response = client.post("/predict", json=PATIENT)
+    assert response.status_code == 200
+    timings = entries(response.headers["server-timing"])
+
+    stages = [name for name in timings if timings[name].startswith("dur=")]
+    assert stages == ["queue_wait", "parse", "preprocess", "inference", "risk_banding", "serialization", "total"]
+    assert timings["cache"] == 'desc="miss"'
+    total = float(timings["total"][4:])
+    assert sum(float(timings[name][4:]) for name in stages[:-1]) <= total
+
+
+def test_cache_hit_is_marked_and_skips_the_model(client):
+    client.post("/predict", json={**PATIENT, "age": 62.0})
+    timings = entries(client.post("/predict", json={**PATIENT, "age": 62.0}).headers["server-timing"])
+    assert timings["cache"] == 'desc="hit"'
+    assert "inference" not in timings
+
+
+def test_server_timing_header_format():
+    timings = RequestTimings()
+    timings.add("custom", 0.0005)
+    timings.add("inference", 0.004)
+    timings.add("parse", 0.001)
+    timings.add("parse", 0.0002)
+    timings.mark("batch", "coalesced 6")
+    header = server_timing_header(timings, 0.0123).decode("latin-1")
+    assert header == (
+        'parse;dur=1.200, inference;dur=4.000, custom;dur=0.500, batch;desc="coalesced 6", total;dur=12.300'
+    )
@@ -0,0 +1,62 @@
+"""
+NDJSON scoring reports bad lines inline and keeps scoring the rest
+"""
+import asyncio
+import json
+
+from streaming import score_ndjson
+
+
+async def body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def parse(line: bytes):
+    patient = json.loads(line)
+    if "age" not in patient:
+        raise ValueError("age is required")
+    return patient
+
+
+async def score(patients):
+    """Stand-in model that rejects an unknown category for the whole batch, like predict_batch"""
+    for patient in patients:
+        if patient.get("gender") == "Unknown":
+            raise ValueError("Unknown value 'Unknown' for feature 'gender'")
+    return [(1, patient["age"] / 100, "v1") for patient in patients]
+
+
+def render(result):
+    prediction, probability, version = result
+    return {"prediction": prediction, "probability": probability}
+
+
+def run(*lines: bytes, chunk_size: int = 10):
+    async def collect():
+        return b"".join([
+            part async for part in score_ndjson(body(b"\n".join(lines) + b"\n"), parse, score, render, chunk_size)
+        ])
+    return [json.loads(line) for line in asyncio.run(collect()).splitlines()]
+
+
+def test_rows_rejected_by_the_model_are_reported_inline():
+    out = run(
+        b'{"age": 10, "gender": "Female"}',
+        b'{"age": 20, "gender": "Unknown"}',
+        b'{"gender": "Male"}',
+        b'{"age": 40, "gender": "Male"}',
+        b'{"age": 50, "gender": "Unknown"}',
+    )
+    assert [item["line"] for item in out] == [1, 2, 3, 4, 5]
+    assert out[0]["probability"] == 0.1
+    assert "Unknown value" in out[1]["errors"][0]["message"]
+    assert out[2]["errors"] == [{"field": "", "message": "age is required"}]
+    assert out[3]["probability"] == 0.4
+    assert "Unknown value" in out[4]["errors"][0]["message"]
+    assert not any("error" in item for item in out)
+
+
+def test_valid_stream_is_scored_in_chunks():
+    out = run(*[json.dumps({"age": age}).encode() for age in range(25)], chunk_size=4)
+    assert [item["probability"] for item in out] == [age / 100 for age in range(25)]